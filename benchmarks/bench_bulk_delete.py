@@ -0,0 +1,85 @@
+#! /usr/bin/env python
+"""
+Compares the time needed to delete rows of the multiple inheritance view of
+test/multiple_inheritance.yaml, row by row with the delete trigger, set-based with the
+delete_many function, and by purging the subtypes or the whole hierarchy.
+
+    python benchmarks/bench_bulk_delete.py --pg-service pirogue_test --rows 100000
+
+The test tables of test/demo_data.sql are used, load them beforehand.
+Each delete runs in a transaction which is rolled back.
+"""
+
+import argparse
+import time
+
+import psycopg
+import yaml
+
+from pirogue import MultipleInheritance
+
+VIEW = "pirogue_test.vw_bench_animal"
+
+IDS = "ARRAY(SELECT aid FROM pirogue_test.animal WHERE name ^@ 'bench ')"
+
+DELETES = {
+    "trigger": f"DELETE FROM {VIEW} WHERE aid = ANY({IDS})",
+    "delete_many": f"SELECT pirogue_test.fn_vw_bench_animal_delete_many({IDS})",
+    "purge": (
+        "SELECT pirogue_test.fn_vw_bench_animal_purge('cat'), "
+        "pirogue_test.fn_vw_bench_animal_purge('dog')"
+    ),
+    # with the other rows of the tables
+    "purge all": "SELECT pirogue_test.fn_vw_bench_animal_purge()",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-p", "--pg-service", default="pirogue_test")
+    parser.add_argument("-n", "--rows", type=int, default=100000)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'delete':<12} {'rows':>10} {'time':>10} {'rows/s':>10}")
+    with psycopg.connect(f"service={args.pg_service}") as conn:
+        definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        definition["view_name"] = "vw_bench_animal"
+        definition["type_name"] = "bench_animal_type"
+        definition["bulk_delete"] = True
+        MultipleInheritance(definition=definition, connection=conn, drop=True).create()
+        # cats and dogs, the other rows of the tables are deleted by the purge
+        conn.execute(
+            f"INSERT INTO {VIEW} (bench_animal_type, name, year, eye_color) "
+            "SELECT ((ARRAY['cat', 'dog'])[mod(i, 2) + 1])::pirogue_test.bench_animal_type,"
+            " 'bench ' || i, 2000, 'black' FROM generate_series(1, %s) i",
+            (args.rows,),
+        )
+        conn.commit()
+        # the references to the master table are checked when it is deleted from
+        conn.execute("CREATE INDEX IF NOT EXISTS bench_cat_cid ON pirogue_test.cat (cid)")
+        conn.execute("CREATE INDEX IF NOT EXISTS bench_dog_did ON pirogue_test.dog (did)")
+        conn.execute("ANALYZE pirogue_test.animal, pirogue_test.cat, pirogue_test.dog")
+        conn.commit()
+
+        for label, sql in DELETES.items():
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                conn.execute(sql)
+                timings.append(time.perf_counter() - start)
+                conn.rollback()
+            best = min(timings)
+            print(f"{label:<12} {args.rows:>10} {best * 1000:>8.0f}ms {args.rows / best:>10.0f}")
+
+        conn.execute(f"SELECT pirogue_test.fn_vw_bench_animal_delete_many({IDS})")
+        conn.execute("DROP FUNCTION pirogue_test.fn_vw_bench_animal_delete_many(int4[])")
+        conn.execute("DROP FUNCTION pirogue_test.fn_vw_bench_animal_purge")
+        conn.execute(f"DROP VIEW {VIEW}")
+        conn.execute("DROP TYPE pirogue_test.bench_animal_type")
+        conn.execute("DROP INDEX pirogue_test.bench_cat_cid, pirogue_test.bench_dog_did")
+        conn.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#! /usr/bin/env python
+"""
+Compares the time needed to insert rows through the multiple inheritance view of
+test/multiple_inheritance.yaml, row by row with the insert trigger and set-based with the
+bulk insert function.
+
+    python benchmarks/bench_bulk_insert.py --pg-service pirogue_test --rows 100000
+
+The test tables of test/demo_data.sql are used, load them beforehand.
+Each insert runs in a transaction which is rolled back.
+"""
+
+import argparse
+import time
+
+import psycopg
+import yaml
+
+from pirogue import MultipleInheritance
+
+VIEW = "pirogue_test.vw_bench_animal"
+
+# cats, dogs and parent only animals
+ROWS = (
+    f"SELECT jsonb_populate_record(NULL::{VIEW}, jsonb_build_object("
+    "'bench_animal_type', (ARRAY['cat', 'dog', 'animal'])[mod(i, 3) + 1], "
+    "'name', 'animal ' || i, 'year', 2000, 'eye_color', 'black')) "
+    "FROM generate_series(1, %s) i"
+)
+
+INSERTS = {
+    "trigger": f"INSERT INTO {VIEW} SELECT (r).* FROM ({ROWS}) AS s(r)",
+    "bulk": f"SELECT count(*) FROM pirogue_test.fn_vw_bench_animal_bulk_insert(ARRAY({ROWS}))",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-p", "--pg-service", default="pirogue_test")
+    parser.add_argument("-n", "--rows", type=int, default=100000)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'insert':<8} {'rows':>10} {'time':>10} {'rows/s':>10}")
+    with psycopg.connect(f"service={args.pg_service}") as conn:
+        definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        definition["view_name"] = "vw_bench_animal"
+        definition["type_name"] = "bench_animal_type"
+        definition["bulk_insert"] = True
+        MultipleInheritance(definition=definition, connection=conn, drop=True).create()
+
+        for label, sql in INSERTS.items():
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                conn.execute(sql, (args.rows,))
+                timings.append(time.perf_counter() - start)
+                conn.rollback()
+            best = min(timings)
+            print(f"{label:<8} {args.rows:>10} {best * 1000:>8.0f}ms {args.rows / best:>10.0f}")
+
+        conn.execute(f"DROP FUNCTION pirogue_test.fn_vw_bench_animal_bulk_insert({VIEW}[])")
+        conn.execute(f"DROP VIEW {VIEW}")
+        conn.execute("DROP TYPE pirogue_test.bench_animal_type")
+        conn.commit()
+
+
+if __name__ == "__main__":
+    main()
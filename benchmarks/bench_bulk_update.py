@@ -0,0 +1,89 @@
+#! /usr/bin/env python
+"""
+Compares the time needed to update rows through the multiple inheritance view of
+test/multiple_inheritance.yaml, row by row with the update trigger and set-based with the
+bulk update function.
+
+    python benchmarks/bench_bulk_update.py --pg-service pirogue_test --rows 100000
+
+The test tables of test/demo_data.sql are used, load them beforehand.
+Each update runs in a transaction which is rolled back.
+"""
+
+import argparse
+import time
+
+import psycopg
+import yaml
+
+from pirogue import MultipleInheritance
+
+VIEW = "pirogue_test.vw_bench_animal"
+
+# the rows with a new name and eye color
+ROWS = (
+    f"SELECT jsonb_populate_record(v, jsonb_build_object("
+    "'name', upper(v.name), 'eye_color', 'green')) "
+    f"FROM {VIEW} v"
+)
+
+UPDATES = {
+    "trigger": (
+        f"UPDATE {VIEW} v SET name = (s.r).name, eye_color = (s.r).eye_color "
+        f"FROM ({ROWS}) AS s(r) WHERE v.aid = (s.r).aid"
+    ),
+    "bulk": f"SELECT count(*) FROM pirogue_test.fn_vw_bench_animal_bulk_update(ARRAY({ROWS}))",
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-p", "--pg-service", default="pirogue_test")
+    parser.add_argument("-n", "--rows", type=int, default=100000)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'update':<8} {'rows':>10} {'time':>10} {'rows/s':>10}")
+    with psycopg.connect(f"service={args.pg_service}") as conn:
+        definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        definition["view_name"] = "vw_bench_animal"
+        definition["type_name"] = "bench_animal_type"
+        definition["bulk_update"] = True
+        MultipleInheritance(definition=definition, connection=conn, drop=True).create()
+        # cats, dogs and parent only animals
+        conn.execute(
+            f"INSERT INTO {VIEW} (bench_animal_type, name, year, eye_color) "
+            "SELECT ((ARRAY['cat', 'dog', 'animal'])[mod(i, 3) + 1])::pirogue_test.bench_animal_type,"
+            " 'animal ' || i, 2000, 'black' FROM generate_series(1, %s) i",
+            (args.rows,),
+        )
+        conn.commit()
+        conn.execute("ANALYZE pirogue_test.animal, pirogue_test.cat, pirogue_test.dog")
+        conn.commit()
+
+        for label, sql in UPDATES.items():
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                conn.execute(sql)
+                timings.append(time.perf_counter() - start)
+                conn.rollback()
+            best = min(timings)
+            print(f"{label:<8} {args.rows:>10} {best * 1000:>8.0f}ms {args.rows / best:>10.0f}")
+
+        conn.execute(
+            f"DROP FUNCTION pirogue_test.fn_vw_bench_animal_bulk_update({VIEW}[], boolean)"
+        )
+        conn.execute(f"DROP VIEW {VIEW}")
+        conn.execute("DROP TYPE pirogue_test.bench_animal_type")
+        conn.execute(
+            "WITH a AS (SELECT aid FROM pirogue_test.animal WHERE name ^@ 'animal '), "
+            "c AS (DELETE FROM pirogue_test.cat WHERE cid IN (SELECT aid FROM a)), "
+            "d AS (DELETE FROM pirogue_test.dog WHERE did IN (SELECT aid FROM a)) "
+            "DELETE FROM pirogue_test.animal WHERE aid IN (SELECT aid FROM a)"
+        )
+        conn.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#! /usr/bin/env python
+"""
+Compares the time needed to load rows in the multiple inheritance view of
+test/multiple_inheritance.yaml, with executemany inserts through the insert trigger
+and with copy_from, from rows generated on the fly and from a binary COPY file.
+
+    python benchmarks/bench_copy.py --pg-service pirogue_test --rows 100000
+
+The test tables of test/demo_data.sql are used, load them beforehand.
+Each load runs in a transaction which is rolled back.
+"""
+
+import argparse
+import io
+import time
+
+import psycopg
+import yaml
+
+from pirogue import MultipleInheritance
+
+VIEW = "pirogue_test.vw_bench_animal"
+
+COLUMNS = ["bench_animal_type", "name", "year", "eye_color"]
+
+
+def rows(count: int):
+    """
+    Yields cats, dogs and parent only animals
+    """
+    for i in range(count):
+        yield (("cat", "dog", "animal")[i % 3], f"animal {i}", 2000, "black")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-p", "--pg-service", default="pirogue_test")
+    parser.add_argument("-n", "--rows", type=int, default=100000)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'load':<12} {'rows':>10} {'time':>10} {'rows/s':>10}")
+    with psycopg.connect(f"service={args.pg_service}") as conn:
+        definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        definition["view_name"] = "vw_bench_animal"
+        definition["type_name"] = "bench_animal_type"
+        multiple_inheritance = MultipleInheritance(
+            definition=definition, connection=conn, drop=True
+        )
+        multiple_inheritance.create()
+
+        # the binary file is written from the generated rows
+        multiple_inheritance.copy_from(rows(args.rows), columns=COLUMNS, commit=False)
+        data = io.BytesIO()
+        with conn.cursor().copy(
+            f"COPY (SELECT {', '.join(COLUMNS)} FROM {VIEW}) TO STDOUT (FORMAT binary)"
+        ) as copy:
+            for chunk in copy:
+                data.write(chunk)
+        conn.rollback()
+
+        def executemany():
+            conn.cursor().executemany(
+                f"INSERT INTO {VIEW} ({', '.join(COLUMNS)}) VALUES (%s, %s, %s, %s)",
+                rows(args.rows),
+            )
+
+        def copy_rows():
+            multiple_inheritance.copy_from(rows(args.rows), columns=COLUMNS, commit=False)
+
+        def copy_file():
+            data.seek(0)
+            multiple_inheritance.copy_from(data, columns=COLUMNS, commit=False)
+
+        loads = {"executemany": executemany, "copy rows": copy_rows, "copy file": copy_file}
+        for label, load in loads.items():
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                load()
+                timings.append(time.perf_counter() - start)
+                conn.rollback()
+            best = min(timings)
+            print(f"{label:<12} {args.rows:>10} {best * 1000:>8.0f}ms {args.rows / best:>10.0f}")
+
+        conn.execute(f"DROP VIEW {VIEW}")
+        conn.execute("DROP TYPE pirogue_test.bench_animal_type")
+        conn.commit()
+
+
+if __name__ == "__main__":
+    main()
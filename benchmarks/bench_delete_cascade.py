@@ -0,0 +1,100 @@
+#! /usr/bin/env python
+"""
+Compares the time needed to delete rows through the delete trigger of the multiple
+inheritance view of test/multiple_inheritance.yaml, when the references of the subtype
+tables to the master table do not cascade, when they cascade but the trigger was generated
+before (and deletes the subtype rows explicitly), and when the trigger relies on the cascade.
+
+    python benchmarks/bench_delete_cascade.py --pg-service pirogue_test --rows 100000
+
+The test tables of test/demo_data.sql are used, load them beforehand.
+Each delete runs in a transaction which is rolled back.
+"""
+
+import argparse
+import time
+
+import psycopg
+import yaml
+
+from pirogue import MultipleInheritance
+
+VIEW = "pirogue_test.vw_bench_animal"
+
+REFERENCES = {"cat": "cid", "dog": "did", "aardvark": "aid", "eagle": "fk_animal"}
+
+
+def set_on_delete(conn: psycopg.Connection, action: str):
+    """
+    Replaces the references of the subtype tables to the master table
+    """
+    for table, column in REFERENCES.items():
+        conn.execute(
+            f"ALTER TABLE pirogue_test.{table} DROP CONSTRAINT {table}_{column}_fkey, "
+            f"ADD CONSTRAINT {table}_{column}_fkey FOREIGN KEY ({column}) "
+            f"REFERENCES pirogue_test.animal (aid) ON DELETE {action}"
+        )
+    conn.commit()
+
+
+def create_view(conn: psycopg.Connection):
+    definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+    definition["view_name"] = "vw_bench_animal"
+    definition["type_name"] = "bench_animal_type"
+    MultipleInheritance(definition=definition, connection=conn, drop=True).create()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-p", "--pg-service", default="pirogue_test")
+    parser.add_argument("-n", "--rows", type=int, default=100000)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'references':<20} {'rows':>10} {'time':>10} {'us/row':>10}")
+    with psycopg.connect(f"service={args.pg_service}") as conn:
+        create_view(conn)
+        # cats and dogs
+        conn.execute(
+            f"INSERT INTO {VIEW} (bench_animal_type, name, year, eye_color) "
+            "SELECT ((ARRAY['cat', 'dog'])[mod(i, 2) + 1])::pirogue_test.bench_animal_type,"
+            " 'bench ' || i, 2000, 'black' FROM generate_series(1, %s) i",
+            (args.rows,),
+        )
+        conn.commit()
+        # the subtype rows are looked up by their reference
+        conn.execute("CREATE INDEX IF NOT EXISTS bench_cat_cid ON pirogue_test.cat (cid)")
+        conn.execute("CREATE INDEX IF NOT EXISTS bench_dog_did ON pirogue_test.dog (did)")
+        conn.execute("ANALYZE pirogue_test.animal, pirogue_test.cat, pirogue_test.dog")
+        conn.commit()
+
+        def delete(label: str):
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                conn.execute(f"DELETE FROM {VIEW} WHERE name ^@ 'bench '")
+                timings.append(time.perf_counter() - start)
+                conn.rollback()
+            best = min(timings)
+            print(
+                f"{label:<20} {args.rows:>10} {best * 1000:>8.0f}ms "
+                f"{best / args.rows * 1e6:>10.1f}"
+            )
+
+        delete("no action")
+        set_on_delete(conn, "CASCADE")
+        # the trigger still deletes the subtype rows explicitly
+        delete("cascade, explicit")
+        create_view(conn)
+        delete("cascade")
+
+        conn.execute(f"DELETE FROM {VIEW} WHERE name ^@ 'bench '")
+        conn.execute(f"DROP VIEW {VIEW}")
+        conn.execute("DROP TYPE pirogue_test.bench_animal_type")
+        conn.execute("DROP INDEX pirogue_test.bench_cat_cid, pirogue_test.bench_dog_did")
+        conn.commit()
+        set_on_delete(conn, "NO ACTION")
+
+
+if __name__ == "__main__":
+    main()
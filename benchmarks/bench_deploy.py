@@ -0,0 +1,62 @@
+#! /usr/bin/env python
+"""
+Compares the round trips and the wall time needed to deploy the multiple inheritance
+view of test/multiple_inheritance.yaml (with create_joins) when the statements are
+executed one by one and when they are sent as a single batch.
+
+    python benchmarks/bench_deploy.py --pg-service pirogue_test --repeat 20 --rtt 20
+
+The test tables of test/demo_data.sql are used, load them beforehand.
+The measures are taken against the local server, --rtt estimates the wall time
+against a remote server with the given round trip time (in milliseconds).
+"""
+
+import argparse
+import time
+
+import psycopg
+import yaml
+
+from pirogue import MultipleInheritance
+from pirogue.catalog import SchemaCatalog
+from pirogue.instrumentation import STATEMENT, Profile
+
+
+def deploy(conn: psycopg.Connection, catalog: SchemaCatalog, batch: bool):
+    definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+    definition["view_name"] = "vw_bench_animal"
+    MultipleInheritance(
+        definition=definition, connection=conn, catalog=catalog, create_joins=True, drop=True
+    ).create(commit=False, batch=batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-p", "--pg-service", default="pirogue_test")
+    parser.add_argument("-r", "--repeat", type=int, default=20)
+    parser.add_argument("--rtt", type=float, default=20.0)
+    args = parser.parse_args()
+
+    print(f"{'execution':<12} {'round trips':>12} {'local time':>12} {'estimated remote':>18}")
+    with psycopg.connect(f"service={args.pg_service}") as conn:
+        # the metadata is loaded once, only the deployment is measured
+        catalog = SchemaCatalog(conn)
+        for label, batch in (("one by one", False), ("batch", True)):
+            timings = []
+            for _ in range(args.repeat):
+                with Profile() as profile:
+                    start = time.perf_counter()
+                    deploy(conn, catalog, batch)
+                    timings.append(time.perf_counter() - start)
+                conn.rollback()
+            # the transaction is started by a BEGIN round trip
+            round_trips = profile.count(STATEMENT) + 1
+            local = min(timings) * 1000
+            print(
+                f"{label:<12} {round_trips:>12} {local:>10.1f}ms "
+                f"{local + round_trips * args.rtt:>16.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#! /usr/bin/env python
+"""
+Compares the time needed to export the multiple inheritance view of
+test/multiple_inheritance.yaml, with one COPY of the view and with the parallel dump
+of its types over several connections.
+
+    python benchmarks/bench_dump.py --pg-service pirogue_test --rows 1000000
+
+The test tables of test/demo_data.sql are used, load them beforehand.
+The rows are deleted at the end.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import psycopg
+import yaml
+
+from pirogue import MultipleInheritance
+from pirogue.dump import dump
+
+VIEW = "pirogue_test.vw_bench_animal"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-p", "--pg-service", default="pirogue_test")
+    parser.add_argument("-n", "--rows", type=int, default=1000000)
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args()
+    conninfo = f"service={args.pg_service}"
+
+    print(f"{'dump':<12} {'rows':>10} {'time':>10} {'rows/s':>10}")
+    with psycopg.connect(conninfo) as conn, tempfile.TemporaryDirectory() as directory:
+        definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        definition["view_name"] = "vw_bench_animal"
+        definition["type_name"] = "bench_animal_type"
+        multiple_inheritance = MultipleInheritance(
+            definition=definition, connection=conn, drop=True
+        )
+        multiple_inheritance.create()
+        # cats, dogs, aardvarks and parent only animals
+        conn.execute(
+            f"INSERT INTO {VIEW} (bench_animal_type, name, year, eye_color) "
+            "SELECT ((ARRAY['cat', 'dog', 'aardvark', 'animal'])[mod(i, 4) + 1])"
+            "::pirogue_test.bench_animal_type, 'bench ' || i, 2000, 'black' "
+            "FROM generate_series(1, %s) i",
+            (args.rows,),
+        )
+        conn.commit()
+        # the references to the master table are checked when the rows are deleted at the end
+        conn.execute("CREATE INDEX IF NOT EXISTS bench_cat_cid ON pirogue_test.cat (cid)")
+        conn.execute("CREATE INDEX IF NOT EXISTS bench_dog_did ON pirogue_test.dog (did)")
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS bench_aardvark_aid ON pirogue_test.aardvark (aid)"
+        )
+        conn.execute(
+            "ANALYZE pirogue_test.animal, pirogue_test.cat, pirogue_test.dog, pirogue_test.aardvark"
+        )
+        conn.commit()
+        path = os.path.join(directory, "dump.bin")
+
+        def copy_view():
+            with (
+                open(path, "wb") as f,
+                conn.cursor().copy(
+                    f"COPY (SELECT * FROM {VIEW}) TO STDOUT (FORMAT binary)"
+                ) as copy,
+            ):
+                for data in copy:
+                    f.write(data)
+            conn.rollback()
+
+        dumps = {"copy view": copy_view}
+        for jobs in (1, 2, 4):
+            dumps[f"dump {jobs} jobs"] = lambda jobs=jobs: dump(
+                multiple_inheritance, conninfo, path, jobs=jobs
+            )
+        for label, run in dumps.items():
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                run()
+                timings.append(time.perf_counter() - start)
+            best = min(timings)
+            print(f"{label:<12} {args.rows:>10} {best * 1000:>8.0f}ms {args.rows / best:>10.0f}")
+
+        conn.execute(f"DROP VIEW {VIEW}")
+        conn.execute("DROP TYPE pirogue_test.bench_animal_type")
+        conn.execute(
+            "WITH a AS (SELECT aid FROM pirogue_test.animal WHERE name ^@ 'bench '), "
+            "c AS (DELETE FROM pirogue_test.cat WHERE cid IN (SELECT aid FROM a)), "
+            "d AS (DELETE FROM pirogue_test.dog WHERE did IN (SELECT aid FROM a)), "
+            "aa AS (DELETE FROM pirogue_test.aardvark WHERE aid IN (SELECT aid FROM a)) "
+            "DELETE FROM pirogue_test.animal WHERE aid IN (SELECT aid FROM a)"
+        )
+        conn.execute(
+            "DROP INDEX pirogue_test.bench_cat_cid, pirogue_test.bench_dog_did, "
+            "pirogue_test.bench_aardvark_aid"
+        )
+        conn.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#! /usr/bin/env python
+"""
+Measures the time and peak memory needed to generate the SQL code of multiple
+inheritance views (with create_joins) for synthetic hierarchies of growing size.
+
+    python benchmarks/bench_generation.py --sizes 10x50 50x100 50x400
+
+Each size is given as JOINSxCOLUMNS: the number of subtypes and the number of columns
+of the parent and of each subtype. The metadata comes from an in-memory catalog,
+no database is required.
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from pirogue import MultipleInheritance
+from pirogue.catalog import SchemaCatalog
+
+
+def synthetic_catalog(joins: int, columns: int) -> SchemaCatalog:
+    """
+    Returns a catalog with a parent table and `joins` subtypes of `columns` columns each
+    """
+    tables = [
+        {
+            "schema_name": "bench",
+            "table_name": "parent",
+            "columns": ["id"] + [f"p_col_{c}" for c in range(columns)],
+            "column_types": {},
+            "defaults": {"id": "nextval('bench.parent_id_seq'::regclass)"},
+            "pkey": "id",
+            "foreign_keys": [],
+            "geometry_types": None,
+        }
+    ]
+    for j in range(joins):
+        tables.append(
+            {
+                "schema_name": "bench",
+                "table_name": f"child_{j}",
+                "columns": ["id", "merged"] + [f"c{j}_col_{c}" for c in range(columns)],
+                "column_types": {},
+                "defaults": {},
+                "pkey": "id",
+                "foreign_keys": [["id", "bench", "parent", "id"]],
+                "geometry_types": None,
+            }
+        )
+    return SchemaCatalog.from_dict({"tables": tables})
+
+
+def definition(joins: int) -> dict:
+    return {
+        "table": "bench.parent",
+        "merge_columns": ["merged"],
+        "joins": {
+            f"child_{j}": {"table": f"bench.child_{j}", "prefix": f"c{j}_"} for j in range(joins)
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "-s", "--sizes", nargs="+", default=["10x50", "50x100", "50x400", "100x400"]
+    )
+    parser.add_argument("-r", "--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'joins x columns':<16} {'SQL size':>10} {'time':>10} {'peak memory':>12}")
+    for size in args.sizes:
+        joins, columns = (int(n) for n in size.split("x"))
+        catalog = synthetic_catalog(joins, columns)
+
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            sql = MultipleInheritance(
+                definition=definition(joins), catalog=catalog, create_joins=True
+            ).sql()
+            timings.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        MultipleInheritance(definition=definition(joins), catalog=catalog, create_joins=True).sql()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        print(
+            f"{size:<16} {len(sql) / 1e6:8.2f}MB {min(timings) * 1000:8.1f}ms "
+            f"{peak / 1e6:10.1f}MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#! /usr/bin/env python
+"""
+Compares the pg_catalog based introspection of pirogue.information_schema
+with the former information_schema based queries on a catalog with many tables.
+
+    python benchmarks/bench_introspection.py --pg-service pirogue_test --tables 3000
+
+A schema "pirogue_bench" is created (and dropped at the end) in the database.
+"""
+
+import argparse
+import time
+
+import psycopg
+
+from pirogue.information_schema import columns, primary_key, reference_columns
+
+SCHEMA = "pirogue_bench"
+
+LEGACY_PRIMARY_KEY = (
+    "SELECT c.column_name"
+    " FROM information_schema.key_column_usage AS c "
+    " LEFT JOIN information_schema.table_constraints AS t"
+    " ON t.constraint_name = c.constraint_name"
+    " WHERE t.table_name = '{t}'"
+    " AND t.table_schema = '{s}'"
+    " AND t.constraint_type = 'PRIMARY KEY'"
+)
+
+LEGACY_REFERENCE_COLUMNS = (
+    "SELECT kcu.column_name, ccu.column_name AS foreign_column_name "
+    "FROM information_schema.table_constraints AS tc "
+    "JOIN information_schema.key_column_usage AS kcu "
+    "ON tc.constraint_name = kcu.constraint_name "
+    "AND tc.table_schema = kcu.table_schema "
+    "JOIN information_schema.constraint_column_usage AS ccu "
+    "ON ccu.constraint_name = tc.constraint_name "
+    "AND ccu.table_schema = tc.table_schema "
+    "WHERE tc.constraint_type = 'FOREIGN KEY' "
+    "AND tc.table_name='{t}' "
+    "AND tc.table_schema='{s}' "
+    "AND ccu.table_name = '{ft}' "
+    "AND ccu.table_schema = '{s}';"
+)
+
+LEGACY_VIEW_COLUMNS = """
+    SELECT c.column_name
+        FROM information_schema.tables t
+            LEFT JOIN information_schema.columns c
+                      ON t.table_schema = c.table_schema
+                      AND t.table_name = c.table_name
+        WHERE table_type = 'VIEW'
+              AND t.table_schema = '{s}'
+              AND t.table_name = '{t}'
+        ORDER BY ordinal_position"""
+
+
+def teardown(conn: psycopg.Connection):
+    # drop in chunks to stay below max_locks_per_transaction
+    while True:
+        with conn.cursor() as cur:
+            cur.execute(
+                "SELECT string_agg(format('%%I.%%I', schemaname, tablename), ', ') "
+                "FROM (SELECT schemaname, tablename FROM pg_tables "
+                "WHERE schemaname = %s AND tablename <> 'parent' LIMIT 100) t",
+                (SCHEMA,),
+            )
+            tables = cur.fetchone()[0]
+        if not tables:
+            break
+        conn.execute(f"DROP TABLE {tables} CASCADE;")
+        conn.commit()
+    conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE;")
+    conn.commit()
+
+
+def setup(conn: psycopg.Connection, tables: int):
+    teardown(conn)
+    statements = [
+        f"CREATE SCHEMA {SCHEMA};",
+        f"CREATE TABLE {SCHEMA}.parent (id integer PRIMARY KEY, name text);",
+    ]
+    for i in range(tables):
+        statements.append(
+            f"CREATE TABLE {SCHEMA}.child_{i} ("
+            f"id integer PRIMARY KEY REFERENCES {SCHEMA}.parent, a text, b integer);"
+        )
+        if i % 10 == 0:
+            statements.append(
+                f"CREATE VIEW {SCHEMA}.vw_child_{i} AS SELECT * FROM {SCHEMA}.child_{i};"
+            )
+    conn.execute("\n".join(statements))
+    conn.commit()
+
+
+def timeit(label: str, calls: int, func):
+    start = time.perf_counter()
+    for i in range(calls):
+        func(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed * 1000 / calls:8.2f} ms/call")
+    return elapsed
+
+
+def fetch(conn: psycopg.Connection, sql: str):
+    with conn.cursor() as cur:
+        cur.execute(sql)
+        return cur.fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-p", "--pg-service", default="pirogue_test")
+    parser.add_argument("-t", "--tables", type=int, default=3000)
+    parser.add_argument("-c", "--calls", type=int, default=50)
+    args = parser.parse_args()
+
+    conn = psycopg.connect(f"service={args.pg_service}")
+    print(f"creating {args.tables} tables…")
+    setup(conn, args.tables)
+
+    def table(i):
+        return f"child_{(i * 37) % args.tables}"
+
+    def view(i):
+        return f"vw_child_{(i * 370) % args.tables // 10 * 10}"
+
+    for name, legacy, current in (
+        (
+            "primary_key",
+            lambda i: fetch(conn, LEGACY_PRIMARY_KEY.format(s=SCHEMA, t=table(i))),
+            lambda i: primary_key(conn, SCHEMA, table(i)),
+        ),
+        (
+            "reference_columns",
+            lambda i: fetch(
+                conn, LEGACY_REFERENCE_COLUMNS.format(s=SCHEMA, t=table(i), ft="parent")
+            ),
+            lambda i: reference_columns(
+                conn,
+                SCHEMA,
+                table(i),
+                foreign_table_schema=SCHEMA,
+                foreign_table_name="parent",
+            ),
+        ),
+        (
+            "columns (view)",
+            lambda i: fetch(conn, LEGACY_VIEW_COLUMNS.format(s=SCHEMA, t=view(i))),
+            lambda i: columns(conn, SCHEMA, view(i), "view"),
+        ),
+    ):
+        before = timeit(f"{name} information_schema", args.calls, legacy)
+        after = timeit(f"{name} pg_catalog", args.calls, current)
+        print(f"{name:<40} {before / after:8.1f} x faster")
+
+    teardown(conn)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
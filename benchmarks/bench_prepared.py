@@ -0,0 +1,87 @@
+#! /usr/bin/env python
+"""
+Measures the per-call latency of the pirogue.information_schema lookups, which run
+as prepared statements with bound parameters, against the same queries formatted
+as literal SQL, which the server has to parse and plan on every call.
+
+    python benchmarks/bench_prepared.py --pg-service pirogue_test --calls 500
+
+The test tables of test/demo_data.sql are used, load them beforehand.
+"""
+
+import argparse
+import time
+
+import psycopg
+
+from pirogue.information_schema import (
+    columns,
+    default_value,
+    primary_key,
+    reference_columns,
+)
+
+TABLES = ["animal", "cat", "dog", "aardvark", "eagle"]
+
+
+def literal(conn: psycopg.Connection, func):
+    """
+    Runs func with client-side parameter binding, i.e. literal SQL without preparing
+    """
+    conn.cursor_factory = psycopg.ClientCursor
+    try:
+        return func()
+    finally:
+        conn.cursor_factory = psycopg.Cursor
+
+
+def run(conn: psycopg.Connection, calls: int):
+    for i in range(calls):
+        table = TABLES[i % len(TABLES)]
+        kind = i % 4
+        if kind == 0:
+            try:
+                primary_key(conn, "pirogue_test", table)
+            except Exception:
+                pass
+        elif kind == 1:
+            columns(conn, "pirogue_test", table)
+        elif kind == 2:
+            default_value(conn, "pirogue_test", table, "aid")
+        elif table != "animal":
+            reference_columns(
+                conn,
+                "pirogue_test",
+                table,
+                foreign_table_schema="pirogue_test",
+                foreign_table_name="animal",
+            )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-p", "--pg-service", default="pirogue_test")
+    parser.add_argument("-c", "--calls", type=int, default=500)
+    args = parser.parse_args()
+
+    timings = {}
+    for label, prepared in (("literal SQL", False), ("prepared", True)):
+        with psycopg.connect(f"service={args.pg_service}") as conn:
+            # warm up the connection caches
+            run(conn, 20)
+            start = time.perf_counter()
+            if prepared:
+                run(conn, args.calls)
+            else:
+                literal(conn, lambda: run(conn, args.calls))
+            timings[label] = time.perf_counter() - start
+        print(f"{label:<12} {timings[label] * 1e6 / args.calls:8.1f} µs/call")
+    print(
+        "per-call latency reduced by {:.0%}".format(
+            1 - timings["prepared"] / timings["literal SQL"]
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#! /usr/bin/env python
+"""
+Compares the row versions and the WAL written by the update trigger of the multiple
+inheritance view of test/multiple_inheritance.yaml with and without skip_unchanged_updates,
+when only a column of the child table, only a column of the master table or no column
+is changed.
+
+    python benchmarks/bench_update_guards.py --pg-service pirogue_test --rows 10000
+
+The test tables of test/demo_data.sql are used, load them beforehand.
+Each update runs in a transaction which is rolled back. The row versions are the updated
+tuples reported by pg_stat_xact_user_tables, each of them leaving a dead tuple behind.
+"""
+
+import argparse
+
+import psycopg
+import yaml
+
+from pirogue import MultipleInheritance
+
+VIEW = "pirogue_test.vw_bench_animal"
+
+UPDATES = {
+    "child only": f"UPDATE {VIEW} SET eye_color = 'green'",
+    "master only": f"UPDATE {VIEW} SET year = year + 1",
+    "no change": f"UPDATE {VIEW} SET name = name",
+}
+
+STATS_SQL = (
+    "SELECT coalesce(sum(n_tup_upd), 0), pg_current_wal_insert_lsn()"
+    " FROM pg_stat_xact_user_tables WHERE schemaname = 'pirogue_test'"
+)
+
+
+def create(conn: psycopg.Connection, skip_unchanged_updates: bool):
+    definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+    definition["view_name"] = "vw_bench_animal"
+    definition["type_name"] = "bench_animal_type"
+    definition["skip_unchanged_updates"] = skip_unchanged_updates
+    MultipleInheritance(definition=definition, connection=conn, drop=True).create(commit=False)
+
+
+def measure(conn: psycopg.Connection, sql: str) -> tuple[int, int]:
+    """
+    Returns the updated tuples and the WAL bytes written by the update
+    """
+    tuples, lsn = conn.execute(STATS_SQL).fetchone()
+    conn.execute(sql)
+    updated, end_lsn = conn.execute(STATS_SQL).fetchone()
+    wal = conn.execute("SELECT pg_wal_lsn_diff(%s, %s)", (end_lsn, lsn)).fetchone()[0]
+    return updated - tuples, wal
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("-p", "--pg-service", default="pirogue_test")
+    parser.add_argument("-n", "--rows", type=int, default=10000)
+    args = parser.parse_args()
+
+    print(f"{'update':<12} {'guards':<7} {'row versions':>13} {'WAL':>12}")
+    with psycopg.connect(f"service={args.pg_service}") as conn:
+        for label, sql in UPDATES.items():
+            for skip_unchanged_updates in (False, True):
+                create(conn, skip_unchanged_updates)
+                conn.execute(
+                    f"INSERT INTO {VIEW} (bench_animal_type, name, year, eye_color) "
+                    "SELECT 'cat', 'cat ' || i, 2000, 'black' FROM generate_series(1, %s) i",
+                    (args.rows,),
+                )
+                conn.commit()
+                updated, wal = measure(conn, sql)
+                conn.rollback()
+                print(
+                    f"{label:<12} {'yes' if skip_unchanged_updates else 'no':<7} "
+                    f"{updated:>13} {wal / 1024:>10.0f}kB"
+                )
+                conn.execute(f"DELETE FROM {VIEW}")
+                conn.execute(f"DROP VIEW {VIEW}")
+                conn.execute("DROP TYPE pirogue_test.bench_animal_type")
+                conn.commit()
+
+
+if __name__ == "__main__":
+    main()
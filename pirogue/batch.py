@@ -0,0 +1,241 @@
+import asyncio
+import random
+import time
+
+import psycopg
+
+from pirogue.instrumentation import LOCK_WAIT, STATEMENT, notify, timed
+
+SAVEPOINT = "pirogue_batch"
+
+# the lock timeout in effect before a batch is saved in a custom setting and restored after it
+SAVE_LOCK_TIMEOUT = (
+    "SELECT set_config('pirogue.lock_timeout', current_setting('lock_timeout'), true);"
+)
+RESTORE_LOCK_TIMEOUT = (
+    "SELECT set_config('lock_timeout', current_setting('pirogue.lock_timeout'), true);"
+)
+
+
+class LockRetry:
+    """
+    Deployment mode which does not queue for locks: a lock timeout is set on the batch,
+    and when a lock cannot be acquired in time (e.g. on a view held by a long editing
+    session) the batch is rolled back and retried after a jittered exponential backoff,
+    until a time budget is spent.
+    The lock waits are printed and reported to the hooks as LOCK_WAIT events.
+    """
+
+    def __init__(
+        self,
+        lock_timeout: float = 2.0,
+        budget: float = 60.0,
+        base_delay: float = 0.5,
+        max_delay: float = 10.0,
+    ):
+        """
+        Parameters
+        ----------
+        lock_timeout
+            the maximum time to wait for a lock, in seconds
+        budget
+            the maximum time spent on the attempts and delays of a batch, in seconds
+        base_delay
+            the delay before the first retry is drawn between 0 and base_delay seconds,
+            the bound being doubled at each retry
+        max_delay
+            the maximum delay between two attempts, in seconds
+        """
+        self.lock_timeout = lock_timeout
+        self.budget = budget
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # (batch name, attempt, time waited for the lock) of each lock timeout
+        self.waits = []
+
+    def setting(self) -> str:
+        """
+        Returns the statement setting the lock timeout for the rest of the transaction
+        """
+        return f"SET LOCAL lock_timeout = '{round(self.lock_timeout * 1000)}ms';"
+
+    def delay(self, attempt: int) -> float:
+        """
+        Returns the delay before the next attempt, with full jitter
+
+        Parameters
+        ----------
+        attempt
+            the number of the failed attempt, starting at 0
+        """
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+
+    def wait(self, name: str, attempt: int, waited: float, elapsed: float) -> float:
+        """
+        Records a lock timeout and returns the delay before the next attempt,
+        or None if the budget is spent
+
+        Parameters
+        ----------
+        name
+            the name of the batch
+        attempt
+            the number of the failed attempt, starting at 0
+        waited
+            the duration of the failed attempt, in seconds
+        elapsed
+            the time spent on the batch so far, in seconds
+        """
+        self.waits.append((name, attempt, waited))
+        notify(LOCK_WAIT, name, waited)
+        delay = self.delay(attempt)
+        if elapsed + delay + self.lock_timeout > self.budget:
+            print(f"*** Lock timeout on {name} after {waited:.1f} s, giving up")
+            return None
+        print(
+            f"*** Lock timeout on {name} after {waited:.1f} s "
+            f"(attempt {attempt + 1}), retrying in {delay:.1f} s"
+        )
+        return delay
+
+
+def batch_script(statements: list[str], savepoint: bool, lock_retry: LockRetry = None) -> str:
+    """
+    Returns the statements as a single script, enclosed in a savepoint if required
+    """
+    script = "\n".join(statements)
+    if lock_retry is not None:
+        script = f"{SAVE_LOCK_TIMEOUT}\n{lock_retry.setting()}\n{script}\n{RESTORE_LOCK_TIMEOUT}"
+    if savepoint:
+        script = f"SAVEPOINT {SAVEPOINT};\n{script}\nRELEASE SAVEPOINT {SAVEPOINT};"
+    return script
+
+
+def execute_batch(
+    conn: psycopg.Connection, statements: list[str], name: str, lock_retry: LockRetry = None
+):
+    """
+    Executes the statements in a single round trip.
+
+    Since the server does not tell which statement of a batch failed,
+    the batch is rolled back to a savepoint in case of error (or entirely,
+    in autocommit mode) and its statements are replayed one by one, so that
+    the failing one is printed and its error is raised.
+
+    Parameters
+    ----------
+    conn
+        the psycopg connection
+    statements
+        the SQL statements, without any parameter
+    name
+        the name of the batch reported to the instrumentation hooks
+    lock_retry
+        if given, the batch is retried when it times out waiting for a lock
+    """
+    if not statements:
+        return
+    savepoint = not conn.autocommit
+    script = batch_script(statements, savepoint, lock_retry)
+    start = time.perf_counter()
+    attempt = 0
+    while True:
+        attempt_start = time.perf_counter()
+        try:
+            with conn.cursor() as cursor, timed(STATEMENT, name):
+                cursor.execute(script)
+            return
+        except psycopg.errors.LockNotAvailable:
+            if lock_retry is None:
+                if savepoint:
+                    conn.execute(f"ROLLBACK TO SAVEPOINT {SAVEPOINT}")
+                break
+            if savepoint:
+                # the next attempt sets the savepoint again
+                conn.execute(f"ROLLBACK TO SAVEPOINT {SAVEPOINT}; RELEASE SAVEPOINT {SAVEPOINT}")
+            now = time.perf_counter()
+            delay = lock_retry.wait(name, attempt, now - attempt_start, now - start)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            attempt += 1
+        except psycopg.Error:
+            if savepoint:
+                conn.execute(f"ROLLBACK TO SAVEPOINT {SAVEPOINT}")
+            break
+    # the lock timeout set by the batch was rolled back with it, it is set for each statement
+    for sql in statements:
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(batch_script([sql], False, lock_retry))
+        except psycopg.Error as e:
+            print(f"*** Failing:\n{sql}\n***")
+            raise e
+    if savepoint:
+        conn.execute(f"RELEASE SAVEPOINT {SAVEPOINT}")
+
+
+async def aexecute_batch(
+    conn: psycopg.AsyncConnection,
+    statements: list[str],
+    name: str,
+    lock_retry: LockRetry = None,
+):
+    """
+    Executes the statements in a single round trip on an asynchronous connection,
+    see `execute_batch`.
+
+    Parameters
+    ----------
+    conn
+        the psycopg asynchronous connection
+    statements
+        the SQL statements, without any parameter
+    name
+        the name of the batch reported to the instrumentation hooks
+    lock_retry
+        if given, the batch is retried when it times out waiting for a lock
+    """
+    if not statements:
+        return
+    savepoint = not conn.autocommit
+    script = batch_script(statements, savepoint, lock_retry)
+    start = time.perf_counter()
+    attempt = 0
+    while True:
+        attempt_start = time.perf_counter()
+        try:
+            async with conn.cursor() as cursor:
+                with timed(STATEMENT, name):
+                    await cursor.execute(script)
+            return
+        except psycopg.errors.LockNotAvailable:
+            if lock_retry is None:
+                if savepoint:
+                    await conn.execute(f"ROLLBACK TO SAVEPOINT {SAVEPOINT}")
+                break
+            if savepoint:
+                # the next attempt sets the savepoint again
+                await conn.execute(
+                    f"ROLLBACK TO SAVEPOINT {SAVEPOINT}; RELEASE SAVEPOINT {SAVEPOINT}"
+                )
+            now = time.perf_counter()
+            delay = lock_retry.wait(name, attempt, now - attempt_start, now - start)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            attempt += 1
+        except psycopg.Error:
+            if savepoint:
+                await conn.execute(f"ROLLBACK TO SAVEPOINT {SAVEPOINT}")
+            break
+    # the lock timeout set by the batch was rolled back with it, it is set for each statement
+    for sql in statements:
+        try:
+            async with conn.cursor() as cursor:
+                await cursor.execute(batch_script([sql], False, lock_retry))
+        except psycopg.Error as e:
+            print(f"*** Failing:\n{sql}\n***")
+            raise e
+    if savepoint:
+        await conn.execute(f"RELEASE SAVEPOINT {SAVEPOINT}")
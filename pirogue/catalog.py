@@ -0,0 +1,683 @@
+import hashlib
+import json
+import os
+
+import psycopg
+
+from pirogue.exceptions import (
+    InvalidSkipColumns,
+    NoReferenceFound,
+    TableHasNoPrimaryKey,
+    TableNotInCatalog,
+)
+from pirogue.instrumentation import CATALOG_QUERY, timed
+
+COLUMNS_SQL = (
+    "SELECT r.name, a.attname, t.typname, pg_get_expr(d.adbin, d.adrelid)\n"
+    "FROM unnest(%s::text[]) AS r(name)\n"
+    "JOIN pg_catalog.pg_attribute a ON a.attrelid = r.name::regclass\n"
+    "LEFT JOIN pg_catalog.pg_type t ON t.oid = a.atttypid\n"
+    "LEFT JOIN pg_catalog.pg_attrdef d ON (a.attrelid, a.attnum) = (d.adrelid, d.adnum)\n"
+    "WHERE NOT a.attisdropped\n"
+    "AND a.attnum > 0\n"
+    "ORDER BY r.name, a.attnum"
+)
+
+CONSTRAINTS_SQL = (
+    "SELECT r.name, con.contype, a.attname, fn.nspname, fc.relname, fa.attname,"
+    " con.confdeltype\n"
+    "FROM unnest(%s::text[]) AS r(name)\n"
+    "JOIN pg_catalog.pg_constraint con ON con.conrelid = r.name::regclass\n"
+    "JOIN pg_catalog.pg_attribute a\n"
+    "  ON a.attrelid = con.conrelid AND a.attnum = con.conkey[1]\n"
+    "LEFT JOIN pg_catalog.pg_class fc ON fc.oid = con.confrelid\n"
+    "LEFT JOIN pg_catalog.pg_namespace fn ON fn.oid = fc.relnamespace\n"
+    "LEFT JOIN pg_catalog.pg_attribute fa\n"
+    "  ON fa.attrelid = con.confrelid AND fa.attnum = con.confkey[1]\n"
+    "WHERE con.contype IN ('p', 'f')\n"
+    "ORDER BY r.name, con.conname"
+)
+
+GEOMETRY_TYPES_SQL = (
+    "SELECT f_table_schema, f_table_name, f_geometry_column, type, srid "
+    "FROM geometry_columns "
+    "WHERE (f_table_schema, f_table_name) IN "
+    "(SELECT * FROM unnest(%s::text[], %s::text[]));"
+)
+
+# the xmin of the catalog rows changes when they are updated,
+# the referenced columns of the foreign keys are stored with the table as well
+FINGERPRINT_SQL = (
+    "SELECT r.name, md5(concat_ws(';', c.oid, c.xmin,\n"
+    "  (SELECT string_agg(a.attnum || ':' || a.xmin, ',' ORDER BY a.attnum)\n"
+    "    FROM pg_catalog.pg_attribute a WHERE a.attrelid = c.oid),\n"
+    "  (SELECT string_agg(con.oid || ':' || con.xmin || ':' || con.confrelid::regclass || ':'\n"
+    "    || coalesce((SELECT string_agg(fa.attnum || ':' || fa.xmin, ',' ORDER BY fa.attnum)\n"
+    "      FROM pg_catalog.pg_attribute fa\n"
+    "      WHERE fa.attrelid = con.confrelid AND fa.attnum = ANY (con.confkey)), ''),\n"
+    "    ',' ORDER BY con.oid)\n"
+    "    FROM pg_catalog.pg_constraint con WHERE con.conrelid = c.oid),\n"
+    "  (SELECT string_agg(d.oid || ':' || d.xmin, ',' ORDER BY d.oid)\n"
+    "    FROM pg_catalog.pg_attrdef d WHERE d.adrelid = c.oid)))\n"
+    "FROM unnest(%s::text[]) AS r(name)\n"
+    "JOIN pg_catalog.pg_class c ON c.oid = r.name::regclass"
+)
+
+
+class CatalogTable:
+    """
+    Metadata of a single table or view as loaded in a SchemaCatalog
+    """
+
+    def __init__(self, schema_name: str, table_name: str):
+        self.schema_name = schema_name
+        self.table_name = table_name
+        self.columns = []
+        self.column_types = {}
+        self.defaults = {}
+        self.pkey = None
+        self.foreign_keys = []
+        self.geometry_types = None
+
+    def to_dict(self) -> dict:
+        """
+        Returns the metadata as a JSON serializable dictionary
+        """
+        return {
+            "schema_name": self.schema_name,
+            "table_name": self.table_name,
+            "columns": self.columns,
+            "column_types": self.column_types,
+            "defaults": self.defaults,
+            "pkey": self.pkey,
+            "foreign_keys": self.foreign_keys,
+            "geometry_types": self.geometry_types,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CatalogTable":
+        """
+        Creates the table metadata from a dictionary produced by `to_dict`
+        """
+        table = cls(data["schema_name"], data["table_name"])
+        table.columns = list(data["columns"])
+        table.column_types = dict(data["column_types"])
+        table.defaults = dict(data["defaults"])
+        table.pkey = data["pkey"]
+        # the delete action is unknown for tables cached without it, no action is assumed
+        table.foreign_keys = [tuple(fk) + ("a",) * (5 - len(fk)) for fk in data["foreign_keys"]]
+        if data["geometry_types"] is not None:
+            table.geometry_types = {
+                column: tuple(gt) for column, gt in data["geometry_types"].items()
+            }
+        return table
+
+
+class TableModel:
+    """
+    Column model of a table, computed once per table from its CatalogTable and shared
+    by the SQL generators (see `SchemaCatalog.model`)
+    """
+
+    __slots__ = ("schema_name", "table_name", "pkey", "columns", "column_set", "__aliases")
+
+    def __init__(self, table: CatalogTable):
+        self.schema_name = table.schema_name
+        self.table_name = table.table_name
+        self.pkey = table.pkey
+        # the primary key first, then alphabetically
+        self.columns = tuple(sorted(table.columns, key=self.sort_key))
+        self.column_set = frozenset(table.columns)
+        self.__aliases = {}
+
+    def sort_key(self, column: str) -> tuple:
+        """
+        Returns the key to sort columns: the primary key first, then alphabetically
+        """
+        return column != self.pkey, column
+
+    def aliases(self, remap_columns: dict = {}, prefix: str = None) -> dict:
+        """
+        Returns a dictionary of the aliases of the columns for the given remapping and prefix.
+        Columns which are neither remapped nor prefixed have an empty alias.
+        The dictionary is computed once per remapping and prefix.
+
+        Parameters
+        ----------
+        remap_columns
+            dictionary to remap columns
+        prefix
+            prefix of the columns (do not applied to remapped columns)
+        """
+        key = (prefix, tuple(remap_columns.items()))
+        aliases = self.__aliases.get(key)
+        if aliases is None:
+            aliases = ColumnAliases(remap_columns, prefix)
+            for column in self.columns:
+                aliases[column]
+            self.__aliases[key] = aliases
+        return aliases
+
+
+class ColumnAliases(dict):
+    """
+    Dictionary of the aliases of columns, missing columns are computed on access
+    """
+
+    def __init__(self, remap_columns: dict, prefix: str):
+        super().__init__()
+        self.remap_columns = dict(remap_columns)
+        self.prefix = prefix
+
+    def __missing__(self, column: str) -> str:
+        if column in self.remap_columns:
+            alias = self.remap_columns[column]
+        elif self.prefix:
+            alias = self.prefix + column
+        else:
+            alias = ""
+        self[column] = alias
+        return alias
+
+
+def default_cache_dir() -> str:
+    """
+    Returns the default directory of the catalog cache, i.e. ~/.cache/pirogue
+    """
+    return os.path.join(
+        os.getenv("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+        "pirogue",
+    )
+
+
+class SchemaCatalog:
+    """
+    Holds the catalog metadata (columns, primary keys, foreign keys, default values and
+    geometry types) of a set of tables, loaded in batches rather than table per table.
+
+    Tables can be loaded upfront with `load` (or `aload` with an asynchronous connection);
+    tables which have not been loaded are fetched on first access.
+
+    A catalog can be saved to a JSON snapshot with `save` and read back with `from_file`,
+    in which case no connection is required to generate the SQL code.
+
+    If a cache directory is given, the metadata is also stored on disk together
+    with a fingerprint of the catalog entries of each table. Tables whose fingerprint
+    did not change since they were cached are then not introspected again.
+    """
+
+    def __init__(
+        self,
+        connection: psycopg.Connection | psycopg.AsyncConnection = None,
+        *,
+        cache_dir: str = None,
+    ):
+        """
+        Parameters
+        ----------
+        connection
+            a psycopg.Connection instance, or a psycopg.AsyncConnection to be used with `aload`
+        cache_dir
+            if given, the directory where the metadata is cached (see `default_cache_dir`)
+        """
+        self.conn = connection
+        self.cache_dir = cache_dir
+        self.tables = {}
+        self.__fingerprints = {}
+        self.__models = {}
+
+    def load(self, tables: list):
+        """
+        Loads the metadata of the given tables in a single batch
+
+        Parameters
+        ----------
+        tables
+            list of (schema_name, table_name) tuples
+        """
+        tables = self.missing(tables)
+        if not tables:
+            return
+        self.__check_connection(tables)
+        if self.cache_dir:
+            with self.conn.cursor() as pg_cur, timed(CATALOG_QUERY, "catalog.fingerprints"):
+                pg_cur.execute(FINGERPRINT_SQL, (self.__names(tables),), prepare=True)
+                tables = self.__read_cache(tables, pg_cur.fetchall())
+            if not tables:
+                return
+        with self.conn.cursor() as pg_cur, timed(CATALOG_QUERY, "catalog.columns"):
+            pg_cur.execute(COLUMNS_SQL, (self.__names(tables),), prepare=True)
+            column_rows = pg_cur.fetchall()
+        with self.conn.cursor() as pg_cur, timed(CATALOG_QUERY, "catalog.constraints"):
+            pg_cur.execute(CONSTRAINTS_SQL, (self.__names(tables),), prepare=True)
+            constraint_rows = pg_cur.fetchall()
+        self.__add_tables(tables, column_rows, constraint_rows)
+        if self.cache_dir:
+            self.__save_cache()
+
+    def __check_connection(self, tables: list):
+        """
+        Raises TableNotInCatalog if tables must be loaded without a connection,
+        e.g. with a snapshot catalog which does not hold them
+        """
+        if self.conn is None:
+            raise TableNotInCatalog(f"{', '.join(self.__names(tables))} not in the catalog")
+
+    async def aload(self, tables: list):
+        """
+        Loads the metadata of the given tables in a single batch using
+        the psycopg.AsyncConnection of the catalog.
+        Contrary to `load`, the geometry types are loaded as well.
+
+        Parameters
+        ----------
+        tables
+            list of (schema_name, table_name) tuples
+        """
+        tables = self.missing(tables)
+        if tables:
+            self.__check_connection(tables)
+        if tables and self.cache_dir:
+            with timed(CATALOG_QUERY, "catalog.fingerprints"):
+                async with self.conn.cursor() as pg_cur:
+                    await pg_cur.execute(FINGERPRINT_SQL, (self.__names(tables),), prepare=True)
+                    rows = await pg_cur.fetchall()
+            tables = self.__read_cache(tables, rows)
+        if tables:
+            columns_cur = self.conn.cursor()
+            constraints_cur = self.conn.cursor()
+            if psycopg.AsyncPipeline.is_supported():
+                # send both queries at once
+                with timed(CATALOG_QUERY, "catalog.columns_and_constraints"):
+                    async with self.conn.pipeline():
+                        await columns_cur.execute(
+                            COLUMNS_SQL, (self.__names(tables),), prepare=True
+                        )
+                        await constraints_cur.execute(
+                            CONSTRAINTS_SQL, (self.__names(tables),), prepare=True
+                        )
+            else:
+                with timed(CATALOG_QUERY, "catalog.columns"):
+                    await columns_cur.execute(COLUMNS_SQL, (self.__names(tables),), prepare=True)
+                with timed(CATALOG_QUERY, "catalog.constraints"):
+                    await constraints_cur.execute(
+                        CONSTRAINTS_SQL, (self.__names(tables),), prepare=True
+                    )
+            self.__add_tables(
+                tables, await columns_cur.fetchall(), await constraints_cur.fetchall()
+            )
+            await columns_cur.close()
+            await constraints_cur.close()
+        geometry_tables = self.__geometry_tables()
+        if geometry_tables:
+            with timed(CATALOG_QUERY, "catalog.geometry_types"):
+                async with self.conn.cursor() as pg_cur:
+                    await pg_cur.execute(
+                        GEOMETRY_TYPES_SQL, self.__geometry_params(geometry_tables), prepare=True
+                    )
+                    rows = await pg_cur.fetchall()
+            self.__add_geometry_types(geometry_tables, rows)
+        if self.cache_dir:
+            self.__save_cache()
+
+    def missing(self, tables: list) -> list:
+        """
+        Returns the tables which are not loaded yet, without duplicates
+
+        Parameters
+        ----------
+        tables
+            list of (schema_name, table_name) tuples
+        """
+        return list(dict.fromkeys(tuple(t) for t in tables if tuple(t) not in self.tables))
+
+    @staticmethod
+    def __names(tables: list) -> list:
+        return [f"{s}.{t}" for (s, t) in tables]
+
+    def __add_tables(self, tables: list, column_rows: list, constraint_rows: list):
+        loaded = {}
+        for schema_name, table_name in tables:
+            loaded[f"{schema_name}.{table_name}"] = CatalogTable(schema_name, table_name)
+
+        for name, column, type_name, default in column_rows:
+            table = loaded[name]
+            table.columns.append(column)
+            table.column_types[column] = type_name
+            if default is not None:
+                table.defaults[column] = default
+
+        for name, contype, column, f_schema, f_table, f_column, on_delete in constraint_rows:
+            table = loaded[name]
+            if contype == "p":
+                table.pkey = column
+            else:
+                table.foreign_keys.append((column, f_schema, f_table, f_column, on_delete))
+
+        for table in loaded.values():
+            self.tables[(table.schema_name, table.table_name)] = table
+
+    def table(self, table_schema: str, table_name: str) -> CatalogTable:
+        """
+        Returns the metadata of a table, loading it if required
+
+        Parameters
+        ----------
+        table_schema
+            the table schema
+        table_name
+            the table name
+        """
+        key = (table_schema, table_name)
+        if key not in self.tables:
+            if not isinstance(self.conn, psycopg.Connection):
+                raise TableNotInCatalog(f"{table_schema}.{table_name} is not in the catalog")
+            self.load([key])
+        return self.tables[key]
+
+    def model(self, table_schema: str, table_name: str) -> TableModel:
+        """
+        Returns the column model of a table, created on first access
+
+        Parameters
+        ----------
+        table_schema
+            the table schema
+        table_name
+            the table name
+        """
+        key = (table_schema, table_name)
+        model = self.__models.get(key)
+        if model is None:
+            model = self.__models[key] = TableModel(self.table(table_schema, table_name))
+        return model
+
+    def to_dict(self) -> dict:
+        """
+        Returns the metadata of all loaded tables as a JSON serializable dictionary
+        """
+        if isinstance(self.conn, psycopg.Connection):
+            self.load_geometry_types()
+        return {"tables": [self.tables[key].to_dict() for key in sorted(self.tables)]}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "SchemaCatalog":
+        """
+        Creates a catalog, without any connection, from a dictionary produced by `to_dict`
+        """
+        catalog = cls()
+        for table_data in data["tables"]:
+            table = CatalogTable.from_dict(table_data)
+            catalog.tables[(table.schema_name, table.table_name)] = table
+        return catalog
+
+    def save(self, file_name: str):
+        """
+        Writes a JSON snapshot of the loaded tables
+
+        Parameters
+        ----------
+        file_name
+            the path of the JSON file
+        """
+        with open(file_name, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def from_file(cls, file_name: str) -> "SchemaCatalog":
+        """
+        Reads a catalog from a JSON snapshot written by `save`
+
+        Parameters
+        ----------
+        file_name
+            the path of the JSON file
+        """
+        with open(file_name) as f:
+            return cls.from_dict(json.load(f))
+
+    def primary_key(self, table_schema: str, table_name: str) -> str:
+        """
+        Returns the primary of a table
+
+        Parameters
+        ----------
+        table_schema
+            the table schema
+        table_name
+            the table name
+        """
+        pkey = self.table(table_schema, table_name).pkey
+        if pkey is None:
+            raise TableHasNoPrimaryKey(f"{table_schema}.{table_name} has no primary key")
+        return pkey
+
+    def columns(
+        self,
+        table_schema: str,
+        table_name: str,
+        *,
+        remove_pkey: bool = False,
+        skip_columns: list = [],
+    ) -> list:
+        """
+        Returns the list of columns of a table
+
+        Parameters
+        ----------
+        table_schema
+            the table_schema
+        table_name
+            the table
+        remove_pkey
+            if True, the primary key is dropped
+        skip_columns
+            list of columns to be skipped
+        """
+        pg_fields = list(self.table(table_schema, table_name).columns)
+        for col in skip_columns:
+            try:
+                pg_fields.remove(col)
+            except ValueError:
+                raise InvalidSkipColumns(
+                    'Cannot skip unexisting column "{col}" in "{s}.{t}"'.format(
+                        col=col, s=table_schema, t=table_name
+                    )
+                )
+        if remove_pkey:
+            pg_fields.remove(self.primary_key(table_schema, table_name))
+        return pg_fields
+
+    def reference_columns(
+        self,
+        table_schema: str,
+        table_name: str,
+        *,
+        foreign_table_schema: str,
+        foreign_table_name: str,
+    ) -> tuple[str, str]:
+        """
+        Returns the columns use in a reference constraint
+
+        Parameters
+        ----------
+        table_schema
+            the table schema
+        table_name
+            the table name
+        foreign_table_schema
+            the schema of the foreign table
+        foreign_table_name
+            the name of the foreign table
+        """
+        for column, f_schema, f_table, f_column, _ in self.table(
+            table_schema, table_name
+        ).foreign_keys:
+            if (f_schema, f_table) == (foreign_table_schema, foreign_table_name):
+                return column, f_column
+        raise NoReferenceFound(
+            "{ts}.{tn} has no reference to {fts}.{ftn}".format(
+                tn=table_name,
+                ts=table_schema,
+                ftn=foreign_table_name,
+                fts=foreign_table_schema,
+            )
+        )
+
+    def reference_on_delete(
+        self,
+        table_schema: str,
+        table_name: str,
+        column: str,
+        *,
+        foreign_table_schema: str,
+        foreign_table_name: str,
+    ) -> str:
+        """
+        Returns the action of a reference constraint when the referenced row is deleted,
+        as in pg_constraint.confdeltype: a (no action), r (restrict), c (cascade),
+        n (set null) or d (set default). Returns None if the column has no such constraint.
+
+        Parameters
+        ----------
+        table_schema
+            the table schema
+        table_name
+            the table name
+        column
+            the referencing column
+        foreign_table_schema
+            the schema of the foreign table
+        foreign_table_name
+            the name of the foreign table
+        """
+        reference = (column, foreign_table_schema, foreign_table_name)
+        for fk_column, f_schema, f_table, _, on_delete in self.table(
+            table_schema, table_name
+        ).foreign_keys:
+            if (fk_column, f_schema, f_table) == reference:
+                return on_delete
+        return None
+
+    def default_value(self, table_schema: str, table_name: str, column: str) -> str:
+        """
+        Returns the default value of the column
+
+        Parameters
+        ----------
+        table_schema
+            the table schema
+        table_name
+            the table name
+        column
+            the column name
+        """
+        return self.table(table_schema, table_name).defaults.get(column, "NULL")
+
+    def geometry_type(
+        self, table_schema: str, table_name: str, column: str = "geometry"
+    ) -> tuple[str, int] | None:
+        """
+        Returns the geometry type of a column as a tuple (type, srid)
+
+        The geometry types of all loaded tables having geometry columns
+        are fetched at once, on first call.
+
+        Parameters
+        ----------
+        table_schema
+            the table schema
+        table_name
+            the table name
+        column:
+            the geometry column name, defaults to "geometry"
+        """
+        table = self.table(table_schema, table_name)
+        if table.column_types.get(column) != "geometry":
+            return None
+        if table.geometry_types is None and isinstance(self.conn, psycopg.Connection):
+            self.load_geometry_types()
+        return (table.geometry_types or {}).get(column)
+
+    def load_geometry_types(self):
+        """
+        Loads the geometry types of the loaded tables having geometry columns,
+        which are otherwise loaded on the first call to `geometry_type`.
+        Once they are loaded, the catalog does not query the connection anymore
+        for the loaded tables and can be read from several threads.
+        """
+        tables = self.__geometry_tables()
+        if not tables:
+            return
+        with self.conn.cursor() as pg_cur, timed(CATALOG_QUERY, "catalog.geometry_types"):
+            pg_cur.execute(GEOMETRY_TYPES_SQL, self.__geometry_params(tables), prepare=True)
+            self.__add_geometry_types(tables, pg_cur.fetchall())
+        if self.cache_dir:
+            self.__save_cache()
+
+    def __geometry_tables(self) -> dict:
+        return {
+            (t.schema_name, t.table_name): t
+            for t in self.tables.values()
+            if t.geometry_types is None and "geometry" in t.column_types.values()
+        }
+
+    @staticmethod
+    def __geometry_params(tables: dict) -> tuple:
+        return [s for (s, _) in tables], [t for (_, t) in tables]
+
+    @staticmethod
+    def __add_geometry_types(tables: dict, rows: list):
+        geometry_types = {key: {} for key in tables}
+        for schema_name, table_name, column, type_name, srid in rows:
+            geometry_types[(schema_name, table_name)][column] = (type_name, srid)
+        # the types of a table are set at once, they may be read concurrently
+        for key, table in tables.items():
+            table.geometry_types = geometry_types[key]
+
+    def __cache_file(self) -> str:
+        info = self.conn.info
+        key = f"{info.host}:{info.port}/{info.dbname}"
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode()).hexdigest() + ".json")
+
+    def __read_cache(self, tables: list, fingerprint_rows: list) -> list:
+        """
+        Loads the tables from the cache if their fingerprint did not change
+        Returns the tables which have to be fetched
+        """
+        fingerprints = dict(fingerprint_rows)
+        try:
+            with open(self.__cache_file()) as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+
+        to_fetch = []
+        for (schema_name, table_name), name in zip(tables, self.__names(tables)):
+            self.__fingerprints[(schema_name, table_name)] = fingerprints[name]
+            entry = cache.get(name)
+            if entry and entry["fingerprint"] == fingerprints[name]:
+                table = CatalogTable.from_dict(entry["table"])
+                self.tables[(schema_name, table_name)] = table
+            else:
+                to_fetch.append((schema_name, table_name))
+        return to_fetch
+
+    def __save_cache(self):
+        cache_file = self.__cache_file()
+        try:
+            with open(cache_file) as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+        for key, fingerprint in self.__fingerprints.items():
+            cache["{}.{}".format(*key)] = {
+                "fingerprint": fingerprint,
+                "table": self.tables[key].to_dict(),
+            }
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # write to a temporary file first, so concurrent runs never read a partial file
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, "w") as f:
+            json.dump(cache, f)
+        os.replace(tmp_file, cache_file)
@@ -2,19 +2,142 @@
 
 import argparse
 import os
+import sys
+import time
 
 import psycopg
 import yaml
 
+from pirogue.batch import LockRetry
+from pirogue.catalog import SchemaCatalog, default_cache_dir
+from pirogue.deploy import deploy, plan
+from pirogue.dump import dump
+from pirogue.export import write_script
+from pirogue.instrumentation import Profile, add_hook
+from pirogue.manifest import DeploymentResult, Manifest, deploy_manifest
 from pirogue.multiple_inheritance import MultipleInheritance
+from pirogue.part_hashes import script_statements
 from pirogue.simple_joins import SimpleJoins
 from pirogue.single_inheritance import SingleInheritance
+from pirogue.utils import definition_tables, table_parts
+
+
+def write_statements(output, statements):
+    """
+    Writes the statements to the output file as they are generated
+    """
+    for i, statement in enumerate(statements):
+        if i:
+            output.write("\n")
+        output.write(statement)
+
+
+def add_deploy_arguments(parser):
+    """
+    Adds the options to write the SQL code or to deploy the changed objects only
+    """
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=argparse.FileType("w"),
+        help="Write the SQL code to a file (- for stdout) instead of running it.",
+    )
+    parser.add_argument(
+        "--diff",
+        action="store_true",
+        help="Deploy only the views, types and triggers which changed since the last "
+        "deployment with --diff (their hashes are stored in the comment of the views).",
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Print the changes --diff would deploy, without running them.",
+    )
+    add_lock_arguments(parser)
+
+
+def add_lock_arguments(parser):
+    """
+    Adds the options to deploy without queuing for locks
+    """
+    parser.add_argument(
+        "--lock-timeout",
+        type=float,
+        help="Give up waiting for a lock after this number of seconds, "
+        "roll back and retry later with a jittered backoff.",
+    )
+    parser.add_argument(
+        "--retry-budget",
+        type=float,
+        default=60.0,
+        help="Maximum number of seconds spent retrying with --lock-timeout (default 60).",
+    )
+
+
+def lock_retry(args) -> LockRetry:
+    """
+    Returns the lock retry policy of the arguments, None if no lock timeout is given
+    """
+    if args.lock_timeout is None:
+        return None
+    return LockRetry(lock_timeout=args.lock_timeout, budget=args.retry_budget)
+
+
+def run(conn, generator, args) -> bool:
+    """
+    Writes, plans or deploys the SQL code of the generator according to the arguments
+    Returns True in case of success
+    """
+    if args.output:
+        write_statements(args.output, script_statements(generator.iter_parts()))
+    elif args.plan:
+        for change in plan(conn, [generator]):
+            print(change)
+    elif args.diff:
+        deploy(conn, [generator], lock_retry=lock_retry(args))
+    else:
+        return generator.create(lock_retry=lock_retry(args))
+    return True
+
+
+def parse_variables(var_args) -> dict:
+    """
+    Returns the variables given as (string|float|int) name value triplets
+    """
+    variables = {}
+    for v in var_args or ():
+        if v[0] == "float":
+            variables[v[1]] = float(v[2])
+        elif v[0] == "int":
+            variables[v[1]] = int(v[2])
+        else:
+            variables[v[1]] = v[2]
+    return variables
+
+
+def definition_arg(kind):
+    """
+    Returns an argparse type reading a YAML definition file of the given kind,
+    so that definitions of different kinds keep their command line order
+    """
+
+    def read_definition(path):
+        with open(path) as f:
+            return kind, path, yaml.safe_load(f)
+
+    return read_definition
 
 
 def main():
     # create the top-level parser
     parser = argparse.ArgumentParser()
     parser.add_argument("-v", "--version", help="print the version and exit", action="store_true")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="print the count and duration of catalog queries, generation phases "
+        "and executed statements to stderr",
+    )
 
     subparsers = parser.add_subparsers(
         title="commands", description="pirogue command", dest="command"
@@ -39,7 +162,24 @@ def main():
         help="The primary key column of the view will have a default value"
         " according to the child primary key table",
     )
+    single_inheritance_parser.add_argument(
+        "--skip-unchanged-updates",
+        action="store_true",
+        help="The update trigger only updates the parent or the child table"
+        " if one of its columns changed",
+    )
     single_inheritance_parser.add_argument("-p", "--pg_service", help="postgres service")
+    single_inheritance_parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Cache the tables metadata in {}".format(default_cache_dir()),
+    )
+    single_inheritance_parser.add_argument(
+        "--snapshot",
+        help="Read the tables metadata from a JSON snapshot (see the snapshot command) "
+        "instead of the database. Requires --output.",
+    )
+    add_deploy_arguments(single_inheritance_parser)
 
     # multiple inheritance view
     multiple_inheritance_parser = subparsers.add_parser(
@@ -67,6 +207,26 @@ def main():
         default=[],
     )
     multiple_inheritance_parser.add_argument("-p", "--pg_service", help="postgres service")
+    multiple_inheritance_parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Cache the tables metadata in {}".format(default_cache_dir()),
+    )
+    multiple_inheritance_parser.add_argument(
+        "--snapshot",
+        help="Read the tables metadata from a JSON snapshot (see the snapshot command) "
+        "instead of the database. Requires --output.",
+    )
+    add_deploy_arguments(multiple_inheritance_parser)
+    multiple_inheritance_parser.add_argument(
+        "--swap",
+        action="store_true",
+        help="Build the view, type and triggers in a shadow schema, "
+        "then swap them with the live ones in a short transaction.",
+    )
+    multiple_inheritance_parser.add_argument(
+        "--shadow-schema", help="Schema used by --swap, defaults to pirogue_shadow_{view_name}."
+    )
 
     # multiple inheritance view
     simple_joins = subparsers.add_parser(
@@ -76,6 +236,213 @@ def main():
         "definition_file", help="YAML definition of the merge view", type=argparse.FileType("r")
     )
     simple_joins.add_argument("-p", "--pg_service", help="postgres service")
+    simple_joins.add_argument(
+        "--cache",
+        action="store_true",
+        help="Cache the tables metadata in {}".format(default_cache_dir()),
+    )
+    simple_joins.add_argument(
+        "--snapshot",
+        help="Read the tables metadata from a JSON snapshot (see the snapshot command) "
+        "instead of the database. Requires --output.",
+    )
+    add_deploy_arguments(simple_joins)
+
+    # export
+    export_parser = subparsers.add_parser(
+        "export",
+        help="write the SQL code of several definitions to a single script, "
+        "to be run in one transaction (e.g. psql -1 -f script.sql)",
+    )
+    export_parser.add_argument(
+        "-m",
+        "--multiple-inheritance",
+        dest="definitions",
+        action="append",
+        default=[],
+        type=definition_arg("multiple_inheritance"),
+        help="YAML definition of a multiple inheritance view",
+    )
+    export_parser.add_argument(
+        "-s",
+        "--simple-joins",
+        dest="definitions",
+        action="append",
+        default=[],
+        type=definition_arg("simple_joins"),
+        help="YAML definition of a simple joins view. "
+        "The definitions are exported in the order they are given.",
+    )
+    export_parser.add_argument(
+        "-j",
+        "--create-joins",
+        action="store_true",
+        help="Create simple join view for all joined tables of the multiple inheritance views.",
+    )
+    export_parser.add_argument(
+        "-d", "--drop", action="store_true", help="Drop existing views, type and triggers."
+    )
+    export_parser.add_argument(
+        "-v",
+        "--var",
+        nargs=3,
+        help="Assign variable for running SQL deltas. "
+        "Format is: (string|float|int) name value. ",
+        action="append",
+        default=[],
+    )
+    export_parser.add_argument("-p", "--pg_service", help="postgres service")
+    export_parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Cache the tables metadata in {}".format(default_cache_dir()),
+    )
+    export_parser.add_argument(
+        "--snapshot",
+        help="Read the tables metadata from a JSON snapshot (see the snapshot command) "
+        "instead of the database.",
+    )
+    export_parser.add_argument(
+        "-o",
+        "--output",
+        type=argparse.FileType("w"),
+        default=sys.stdout,
+        help="Write the script to a file instead of stdout.",
+    )
+
+    # manifest deployment
+    deploy_parser = subparsers.add_parser(
+        "deploy",
+        help="deploy the definitions of a manifest, running the independent ones concurrently",
+    )
+    deploy_parser.add_argument("manifest", help="YAML manifest listing the definitions")
+    deploy_parser.add_argument(
+        "--jobs", type=int, default=4, help="Maximum number of concurrent deployments."
+    )
+    deploy_parser.add_argument(
+        "--diff",
+        action="store_true",
+        help="Deploy only the views, types and triggers which changed since the last "
+        "deployment with --diff.",
+    )
+    deploy_parser.add_argument(
+        "-v",
+        "--var",
+        nargs=3,
+        help="Assign variable for running SQL deltas, overriding the manifest variables. "
+        "Format is: (string|float|int) name value. ",
+        action="append",
+        default=[],
+    )
+    add_lock_arguments(deploy_parser)
+    deploy_parser.add_argument("-p", "--pg_service", help="postgres service")
+    deploy_parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Cache the tables metadata in {}".format(default_cache_dir()),
+    )
+
+    # bulk load
+    load_parser = subparsers.add_parser(
+        "load",
+        help="load a file in a multiple inheritance view with COPY, through a staging table",
+    )
+    load_parser.add_argument(
+        "definition_file", help="YAML definition of the merge view", type=argparse.FileType("r")
+    )
+    load_parser.add_argument(
+        "data_file", help="COPY data file (- for stdin)", type=argparse.FileType("rb")
+    )
+    load_parser.add_argument(
+        "-f",
+        "--format",
+        choices=("binary", "csv", "text"),
+        default="binary",
+        help="COPY format of the data file (default binary).",
+    )
+    load_parser.add_argument(
+        "--header", action="store_true", help="Skip the first line of a csv or text file."
+    )
+    load_parser.add_argument(
+        "-c",
+        "--columns",
+        help="Comma separated columns of the data file, defaults to all the columns of the view.",
+    )
+    load_parser.add_argument(
+        "-v",
+        "--var",
+        nargs=3,
+        help="Assign variable for running SQL deltas. "
+        "Format is: (string|float|int) name value. ",
+        action="append",
+        default=[],
+    )
+    load_parser.add_argument("-p", "--pg_service", help="postgres service")
+    load_parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Cache the tables metadata in {}".format(default_cache_dir()),
+    )
+
+    # parallel export
+    dump_parser = subparsers.add_parser(
+        "dump",
+        help="export a multiple inheritance view with COPY, each type over its own connection",
+    )
+    dump_parser.add_argument(
+        "definition_file", help="YAML definition of the merge view", type=argparse.FileType("r")
+    )
+    dump_parser.add_argument(
+        "output", help="the file to write, or with --split, the directory to write the files to"
+    )
+    dump_parser.add_argument(
+        "--jobs", type=int, default=4, help="Maximum number of concurrent exports."
+    )
+    dump_parser.add_argument(
+        "-f",
+        "--format",
+        choices=("binary", "csv", "text"),
+        default="binary",
+        help="COPY format of the files (default binary).",
+    )
+    dump_parser.add_argument(
+        "--split", action="store_true", help="Write the rows of each type to their own file."
+    )
+    dump_parser.add_argument(
+        "-v",
+        "--var",
+        nargs=3,
+        help="Assign variable for running SQL deltas. "
+        "Format is: (string|float|int) name value. ",
+        action="append",
+        default=[],
+    )
+    dump_parser.add_argument("-p", "--pg_service", help="postgres service")
+    dump_parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="Cache the tables metadata in {}".format(default_cache_dir()),
+    )
+
+    # catalog snapshot
+    snapshot_parser = subparsers.add_parser(
+        "snapshot", help="write the metadata of the tables used by definitions to a JSON file"
+    )
+    snapshot_parser.add_argument(
+        "definition_files",
+        nargs="*",
+        help="YAML definitions of multiple inheritance or simple joins views",
+        type=argparse.FileType("r"),
+    )
+    snapshot_parser.add_argument(
+        "-t",
+        "--table",
+        action="append",
+        default=[],
+        help="Additional table to write (e.g. for single inheritance), can be schema specified.",
+    )
+    snapshot_parser.add_argument("-o", "--output", required=True, help="the JSON file")
+    snapshot_parser.add_argument("-p", "--pg_service", help="postgres service")
 
     args = parser.parse_args()
 
@@ -93,45 +460,159 @@ def main():
 
     exit_val = 0
 
-    if args.pg_service:
-        pg_service = args.pg_service
+    profile = Profile()
+    if args.profile:
+        add_hook(profile)
+
+    if args.command == "deploy":
+        manifest = Manifest.from_file(args.manifest)
+        manifest.variables = {**manifest.variables, **parse_variables(args.var)}
+        pg_service = args.pg_service or os.getenv("PGSERVICE")
+        start = time.perf_counter()
+        results = deploy_manifest(
+            manifest,
+            f"service={pg_service}",
+            jobs=args.jobs,
+            diff=args.diff,
+            cache_dir=default_cache_dir() if args.cache else None,
+            lock_retry=lock_retry(args),
+        )
+        for result in results:
+            print(result)
+        print(f"{'total':<60} {(time.perf_counter() - start) * 1000:10.1f} ms")
+        if any(result.status != DeploymentResult.DEPLOYED for result in results):
+            exit_val = 1
+        if args.profile:
+            print(profile.report(), file=sys.stderr)
+        exit(exit_val)
+
+    if getattr(args, "snapshot", None):
+        if not args.output:
+            parser.error("--snapshot requires --output")
+        conn = None
+        catalog = SchemaCatalog.from_file(args.snapshot)
     else:
-        pg_service = os.getenv("PGSERVICE")
+        if args.pg_service:
+            pg_service = args.pg_service
+        else:
+            pg_service = os.getenv("PGSERVICE")
 
-    conn = psycopg.connect(f"service={pg_service}")
+        conn = psycopg.connect(f"service={pg_service}")
+        cache_dir = default_cache_dir() if getattr(args, "cache", False) else None
+        catalog = SchemaCatalog(conn, cache_dir=cache_dir)
 
-    if args.command == "single_inheritance":
-        success = SingleInheritance(
+    if args.command == "snapshot":
+        tables = [table_parts(table) for table in args.table]
+        for definition_file in args.definition_files:
+            tables += definition_tables(yaml.safe_load(definition_file))
+        catalog.load(tables)
+        catalog.save(args.output)
+
+    elif args.command == "single_inheritance":
+        single_inheritance = SingleInheritance(
             parent_table=args.parent_table,
             child_table=args.child_table,
             connection=conn,
+            catalog=catalog,
             view_schema=args.view_schema,
             view_name=args.view_name,
             pkey_default_value=args.pkey_default_value,
-        ).create()
-        if not success:
+            skip_unchanged_updates=args.skip_unchanged_updates,
+        )
+        if not run(conn, single_inheritance, args):
             exit_val = 1
 
     elif args.command == "multiple_inheritance":
         yaml_definition = yaml.safe_load(args.definition_file)
-        variables = {}
-        for v in args.var or ():
-            if v[0] == "float":
-                variables[v[1]] = float(v[2])
-            elif v[0] == "int":
-                variables[v[1]] = int(v[2])
-            else:
-                variables[v[1]] = v[2]
-        MultipleInheritance(
-            yaml_definition,
-            variables=variables,
+        multiple_inheritance = MultipleInheritance(
+            definition=yaml_definition,
+            variables=parse_variables(args.var),
             create_joins=args.create_joins,
+            drop=args.drop,
             connection=conn,
-        ).create()
+            catalog=catalog,
+        )
+        if args.swap and not (args.output or args.plan):
+            multiple_inheritance.create_with_swap(
+                shadow_schema=args.shadow_schema, lock_retry=lock_retry(args)
+            )
+        else:
+            run(conn, multiple_inheritance, args)
 
     elif args.command == "simple_joins":
         yaml_definition = yaml.safe_load(args.definition_file)
-        SimpleJoins(yaml_definition, connection=conn).create()
+        simple_joins = SimpleJoins(yaml_definition, connection=conn, catalog=catalog)
+        run(conn, simple_joins, args)
+
+    elif args.command == "load":
+        yaml_definition = yaml.safe_load(args.definition_file)
+        multiple_inheritance = MultipleInheritance(
+            definition=yaml_definition,
+            variables=parse_variables(args.var),
+            connection=conn,
+            catalog=catalog,
+        )
+        count = multiple_inheritance.copy_from(
+            args.data_file,
+            columns=args.columns.split(",") if args.columns else None,
+            format=args.format,
+            header=args.header,
+        )
+        view = f"{multiple_inheritance.view_schema}.{multiple_inheritance.view_name}"
+        print(f"{count} rows loaded in {view}")
+
+    elif args.command == "dump":
+        yaml_definition = yaml.safe_load(args.definition_file)
+        multiple_inheritance = MultipleInheritance(
+            definition=yaml_definition,
+            variables=parse_variables(args.var),
+            connection=conn,
+            catalog=catalog,
+        )
+        start = time.perf_counter()
+        results = dump(
+            multiple_inheritance,
+            f"service={pg_service}",
+            args.output,
+            jobs=args.jobs,
+            format=args.format,
+            split=args.split,
+        )
+        for result in results:
+            print(result)
+        print(
+            f"{'total':<30} {sum(r.rows for r in results):>12} rows "
+            f"{(time.perf_counter() - start) * 1000:10.1f} ms"
+        )
+
+    elif args.command == "export":
+        if not args.definitions:
+            parser.error("export requires at least one definition (-m or -s)")
+        # load the metadata of all definitions at once
+        tables = []
+        for _, _, definition in args.definitions:
+            tables += definition_tables(definition)
+        catalog.load(tables)
+        variables = parse_variables(args.var)
+        generators = []
+        for kind, _, definition in args.definitions:
+            if kind == "multiple_inheritance":
+                generators.append(
+                    MultipleInheritance(
+                        definition=definition,
+                        variables=variables,
+                        create_joins=args.create_joins,
+                        drop=args.drop,
+                        connection=conn,
+                        catalog=catalog,
+                    )
+                )
+            else:
+                generators.append(SimpleJoins(definition, connection=conn, catalog=catalog))
+        write_script(args.output, generators, [path for _, path, _ in args.definitions])
+
+    if args.profile:
+        print(profile.report(), file=sys.stderr)
 
     exit(exit_val)
 
@@ -0,0 +1,146 @@
+from typing import Iterable
+
+import psycopg
+
+from pirogue.batch import LockRetry, execute_batch
+from pirogue.instrumentation import CATALOG_QUERY, timed
+from pirogue.multiple_inheritance import MultipleInheritance
+from pirogue.part_hashes import hashes_comment, parse_comment, part_hash
+
+DEPLOYED_SQL = (
+    "SELECT r.name, to_regclass(r.name) IS NOT NULL,\n"
+    "  obj_description(to_regclass(r.name), 'pg_class')\n"
+    "FROM unnest(%s::text[]) AS r(name)"
+)
+
+
+class ViewChange:
+    """
+    The changes to deploy for a view, its type and its triggers,
+    as determined by comparing the hashes of the generated parts with the deployed ones
+    """
+
+    CREATE = "create"
+    UPDATE = "update"
+    RECREATE = "recreate"
+    UNCHANGED = "unchanged"
+
+    def __init__(self, view_schema: str, view_name: str, statements: dict, deployed: dict):
+        """
+        Parameters
+        ----------
+        view_schema
+            the schema of the view
+        view_name
+            the name of the view
+        statements
+            the SQL statements by part, in the order of deployment
+        deployed
+            the hashes of the deployed parts, None if the view does not exist
+        """
+        self.view_schema = view_schema
+        self.view_name = view_name
+        self.statements = statements
+        self.hashes = {part: part_hash(sql) for part, sql in statements.items() if part != "drops"}
+
+        if deployed is None:
+            self.action = self.CREATE
+            self.parts = list(statements)
+            return
+        self.parts = [
+            part for part, sql_hash in self.hashes.items() if deployed.get(part) != sql_hash
+        ]
+        if not self.parts:
+            self.action = self.UNCHANGED
+        elif "drops" in statements and {"type", "view"} & set(self.parts):
+            # the type or the columns of the view may not be replaced in place
+            self.action = self.RECREATE
+            self.parts = list(statements)
+        else:
+            self.action = self.UPDATE
+
+    def __str__(self):
+        line = f"{self.action:<10} {self.view_schema}.{self.view_name}"
+        if self.action == self.UPDATE:
+            line += f" ({', '.join(self.parts)})"
+        return line
+
+    def comment(self) -> str:
+        """
+        Returns the statement storing the hashes of the parts in the comment of the view
+        """
+        return hashes_comment(self.view_schema, self.view_name, self.hashes)
+
+    def statements_to_run(self) -> list[str]:
+        """
+        Returns the statements of the changed parts, followed by the comment of the view
+        """
+        if self.action == self.UNCHANGED:
+            return []
+        return [self.statements[part] for part in self.parts] + [self.comment()]
+
+
+def plan(conn: psycopg.Connection, generators: Iterable) -> list[ViewChange]:
+    """
+    Compares the SQL code of the generators with the deployed one
+    and returns the changes of each view, in the order of deployment.
+    The deployed hashes of all views are read in a single query.
+
+    Parameters
+    ----------
+    conn
+        the psycopg connection
+    generators
+        MultipleInheritance, SingleInheritance or SimpleJoins objects
+    """
+    views = {}
+    for generator in generators:
+        for view_schema, view_name, part, sql in generator.iter_parts():
+            views.setdefault((view_schema, view_name), {})[part] = sql
+    names = [f"{view_schema}.{view_name}" for view_schema, view_name in views]
+    with conn.cursor() as cur, timed(CATALOG_QUERY, "deploy.comments"):
+        cur.execute(DEPLOYED_SQL, (names,), prepare=True)
+        deployed = {
+            name: parse_comment(comment) if exists else None
+            for name, exists, comment in cur.fetchall()
+        }
+    return [
+        ViewChange(view_schema, view_name, statements, deployed[name])
+        for ((view_schema, view_name), statements), name in zip(views.items(), names)
+    ]
+
+
+def deploy(
+    conn: psycopg.Connection,
+    generators: Iterable,
+    commit: bool = True,
+    lock_retry: LockRetry = None,
+) -> list[ViewChange]:
+    """
+    Deploys the changed parts of the views of the generators only, in a single round trip.
+    Unchanged views are not replaced, and thus not locked.
+    The types of multiple inheritance views which are not dropped are evolved first,
+    see `pirogue.multiple_inheritance.MultipleInheritance.evolve_type`.
+    Returns the changes.
+
+    Parameters
+    ----------
+    conn
+        the psycopg connection
+    generators
+        MultipleInheritance, SingleInheritance or SimpleJoins objects
+    commit
+        If True, commits the transaction after executing the statements.
+    lock_retry
+        If given, the changes are deployed again when they time out waiting for a lock.
+    """
+    generators = list(generators)
+    for generator in generators:
+        if isinstance(generator, MultipleInheritance) and not generator.drop:
+            generator.evolve_type(commit=commit, lock_retry=lock_retry)
+    changes = plan(conn, generators)
+    statements = [sql for change in changes for sql in change.statements_to_run()]
+    execute_batch(conn, statements, "deploy", lock_retry)
+    if commit:
+        conn.commit()
+    return changes
@@ -0,0 +1,151 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg
+from psycopg import sql
+
+from pirogue.multiple_inheritance import COPY_BUFFER_SIZE, MultipleInheritance
+
+# the header of the binary COPY format: signature, flags and header extension length
+BINARY_HEADER = b"PGCOPY\n\xff\r\n\x00" + bytes(8)
+BINARY_TRAILER = b"\xff\xff"
+
+EXTENSIONS = {"binary": "bin", "csv": "csv", "text": "txt"}
+
+
+class DumpResult:
+    """
+    The outcome of the export of the rows of a type of a merge view
+    """
+
+    def __init__(self, subtype: str, path: str):
+        self.subtype = subtype
+        self.path = path
+        self.rows = None
+        self.duration = None
+
+    def __str__(self):
+        return f"{self.subtype:<30} {self.rows:>12} rows {self.duration * 1000:10.1f} ms"
+
+
+def dump(
+    multiple_inheritance: MultipleInheritance,
+    conninfo: str,
+    path: str,
+    jobs: int = 4,
+    format: str = "binary",
+    split: bool = False,
+) -> list[DumpResult]:
+    """
+    Exports the rows of a merge view with COPY TO, each type over its own connection.
+    The queries of the types join the table of their subtype only
+    (see `MultipleInheritance.subtype_queries`) and all read the same snapshot,
+    exported by a coordinating transaction held open during the export.
+    The rows are streamed to the files in chunks, they are not held in memory.
+    The files can be loaded with `MultipleInheritance.copy_from`.
+    Returns the results in the order of the types.
+
+    Parameters
+    ----------
+    multiple_inheritance
+        the merge view
+    conninfo
+        the connection string, e.g. service=pirogue
+    path
+        the file all rows are written to, or with split, the existing directory
+        the files of the types are written to (e.g. cat.bin)
+    jobs
+        the maximum number of concurrent exports, i.e. of connections
+    format
+        the COPY format: binary, csv or text
+    split
+        if True, the rows of each type are written to their own file
+    """
+    if format not in EXTENSIONS:
+        raise ValueError(f'Invalid COPY format "{format}", valid formats are binary, csv, text')
+    queries = multiple_inheritance.subtype_queries()
+    results = [
+        DumpResult(
+            subtype, os.path.join(path, f"{subtype}.{EXTENSIONS[format]}") if split else path
+        )
+        for subtype in queries
+    ]
+    workers = threading.local()
+    connections = []
+    output = None
+    output_lock = threading.Lock()
+
+    def worker_connection() -> psycopg.Connection:
+        if not hasattr(workers, "conn"):
+            workers.conn = psycopg.connect(conninfo)
+            workers.conn.isolation_level = psycopg.IsolationLevel.REPEATABLE_READ
+            workers.conn.read_only = True
+            connections.append(workers.conn)
+        return workers.conn
+
+    def write(file, data: bytes):
+        if split:
+            file.write(data)
+            return
+        with output_lock:
+            output.write(data)
+
+    def run(result: DumpResult, snapshot: str):
+        start = time.perf_counter()
+        conn = worker_connection()
+        # the merged file holds a single header and trailer of the binary format
+        strip = format == "binary" and not split
+        keep = len(BINARY_TRAILER) if strip else 0
+        file = open(result.path, "wb") if split else None
+        try:
+            conn.execute(sql.SQL("SET TRANSACTION SNAPSHOT {}").format(sql.Literal(snapshot)))
+            with conn.cursor() as cursor:
+                copy_sql = f"COPY ({queries[result.subtype]}) TO STDOUT (FORMAT {format})"
+                with cursor.copy(copy_sql) as copy:
+                    buffer = bytearray()
+                    header = strip
+                    # the rows are sent one by one, the chunks written to the file hold whole
+                    # rows only, so that the chunks of the types can interleave in the merged
+                    # file; the buffer is flushed before a row is added, as the last row
+                    # received is followed by the trailer
+                    for data in copy:
+                        if len(buffer) >= COPY_BUFFER_SIZE:
+                            write(file, buffer)
+                            buffer.clear()
+                        buffer += data
+                        if header:
+                            del buffer[: len(BINARY_HEADER)]
+                            header = False
+                    del buffer[len(buffer) - keep :]
+                    write(file, buffer)
+                result.rows = cursor.rowcount
+        finally:
+            conn.rollback()
+            if file is not None:
+                file.close()
+        result.duration = time.perf_counter() - start
+
+    try:
+        with psycopg.connect(conninfo) as conn:
+            conn.isolation_level = psycopg.IsolationLevel.REPEATABLE_READ
+            conn.read_only = True
+            snapshot = conn.execute("SELECT pg_export_snapshot()").fetchone()[0]
+            if not split:
+                output = open(path, "wb")
+                if format == "binary":
+                    output.write(BINARY_HEADER)
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                futures = [executor.submit(run, result, snapshot) for result in results]
+                for future in futures:
+                    future.result()
+            if format == "binary" and not split:
+                output.write(BINARY_TRAILER)
+            conn.rollback()
+    finally:
+        if output is not None:
+            output.close()
+        for conn in connections:
+            conn.close()
+    return results
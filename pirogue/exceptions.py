@@ -20,3 +20,15 @@ class InvalidDefinition(Exception):
 
 class InvalidColumn(Exception):
     pass
+
+
+class TableNotInCatalog(Exception):
+    pass
+
+
+class TypeEvolutionError(Exception):
+    pass
+
+
+class DependentViewsError(Exception):
+    pass
@@ -0,0 +1,70 @@
+import hashlib
+import re
+from typing import Iterable, TextIO
+
+from pirogue.part_hashes import script_statements
+
+CHECKSUM_RE = re.compile(r"^-- sha256: ([0-9a-f]{64})$", re.MULTILINE)
+
+
+def script_body(generators: Iterable) -> str:
+    """
+    Returns the SQL statements of the generators as a single script,
+    in the order of the generators and of their parts.
+    The statements storing the hashes of the parts in the comments of the views follow
+    the ones of each generator.
+
+    Parameters
+    ----------
+    generators
+        MultipleInheritance, SingleInheritance or SimpleJoins objects
+    """
+    return "".join(
+        f"{statement}\n"
+        for generator in generators
+        for statement in script_statements(generator.iter_parts())
+    )
+
+
+def write_script(output: TextIO, generators: Iterable, sources: Iterable[str] = ()) -> str:
+    """
+    Writes the SQL code of the generators as a single deployable script,
+    preceded by a header holding the SHA-256 checksum of the code.
+    The script does not hold any transaction control statement,
+    it is meant to be run in a single transaction (e.g. `psql -1 -f script.sql`).
+    Returns the checksum.
+
+    Parameters
+    ----------
+    output
+        the file the script is written to
+    generators
+        MultipleInheritance, SingleInheritance or SimpleJoins objects
+    sources
+        names of the definitions, written in the header
+    """
+    body = script_body(generators)
+    checksum = hashlib.sha256(body.encode()).hexdigest()
+    output.write("-- generated by pirogue export\n")
+    for source in sources:
+        output.write(f"-- definition: {source}\n")
+    output.write(f"-- sha256: {checksum}\n\n")
+    output.write(body)
+    return checksum
+
+
+def verify_script(script: str) -> bool:
+    """
+    Returns True if the checksum in the header of a script written by `write_script`
+    matches its SQL code, i.e. if the script was not modified after the export
+
+    Parameters
+    ----------
+    script
+        the content of the script
+    """
+    match = CHECKSUM_RE.search(script)
+    if not match:
+        return False
+    body = script[match.end() + 2 :]
+    return hashlib.sha256(body.encode()).hexdigest() == match.group(1)
@@ -5,6 +5,16 @@ from pirogue.exceptions import (
     NoReferenceFound,
     TableHasNoPrimaryKey,
 )
+from pirogue.instrumentation import CATALOG_QUERY, timed
+
+PRIMARY_KEY_SQL = (
+    "SELECT a.attname"
+    " FROM pg_catalog.pg_index i"
+    " JOIN pg_catalog.pg_attribute a"
+    " ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]"
+    " WHERE i.indrelid = to_regclass(%s)"
+    " AND i.indisprimary"
+)
 
 
 def primary_key(connection: psycopg.Connection, schema_name: str, table_name: str) -> str:
@@ -20,24 +30,48 @@ def primary_key(connection: psycopg.Connection, schema_name: str, table_name: st
     table_name
         the table name
     """
-    sql = (
-        "SELECT c.column_name"
-        " FROM information_schema.key_column_usage AS c "
-        " LEFT JOIN information_schema.table_constraints AS t"
-        " ON t.constraint_name = c.constraint_name"
-        " WHERE t.table_name = '{t}'"
-        " AND t.table_schema = '{s}'"
-        " AND t.constraint_type = 'PRIMARY KEY'".format(s=schema_name, t=table_name)
-    )
-    with connection.cursor() as pg_cur:
-        pg_cur.execute(sql)
+    with connection.cursor() as pg_cur, timed(CATALOG_QUERY, "primary_key"):
+        pg_cur.execute(PRIMARY_KEY_SQL, (f"{schema_name}.{table_name}",), prepare=True)
         try:
             pkey = pg_cur.fetchone()[0]
         except Exception:
-            raise TableHasNoPrimaryKey(sql)
+            raise TableHasNoPrimaryKey(f"{schema_name}.{table_name} has no primary key")
+    return pkey
+
+
+async def aprimary_key(
+    connection: psycopg.AsyncConnection, schema_name: str, table_name: str
+) -> str:
+    """
+    Returns the primary of a table, see `primary_key`
+    """
+    with timed(CATALOG_QUERY, "primary_key"):
+        async with connection.cursor() as pg_cur:
+            await pg_cur.execute(PRIMARY_KEY_SQL, (f"{schema_name}.{table_name}",), prepare=True)
+            try:
+                pkey = (await pg_cur.fetchone())[0]
+            except Exception:
+                raise TableHasNoPrimaryKey(f"{schema_name}.{table_name} has no primary key")
     return pkey
 
 
+TABLE_COLUMNS_SQL = """SELECT attname
+                    FROM pg_attribute
+                    WHERE attrelid = %s::regclass
+                    AND attisdropped IS NOT TRUE
+                    AND attnum > 0
+                    ORDER BY attnum ASC"""
+
+VIEW_COLUMNS_SQL = """SELECT a.attname
+                    FROM pg_attribute a
+                    JOIN pg_class c ON c.oid = a.attrelid
+                    WHERE a.attrelid = to_regclass(%s)
+                    AND c.relkind = 'v'
+                    AND a.attisdropped IS NOT TRUE
+                    AND a.attnum > 0
+                    ORDER BY a.attnum ASC"""
+
+
 def columns(
     connection: psycopg.Connection,
     table_schema: str,
@@ -66,47 +100,68 @@ def columns(
         list of columns to be skipped
     """
     assert table_type.lower() in ("table", "view")
-    if table_type.lower() == "table":
-        sql = """SELECT attname
-                    FROM pg_attribute
-                    WHERE attrelid = '{s}.{t}'::regclass
-                    AND attisdropped IS NOT TRUE
-                    AND attnum > 0
-                    ORDER BY attnum ASC""".format(
-            s=table_schema, t=table_name
-        )
-    else:
-        sql = """
-            SELECT c.column_name
-                FROM information_schema.tables t
-                    LEFT JOIN information_schema.columns c
-                              ON t.table_schema = c.table_schema
-                              AND t.table_name = c.table_name
-                WHERE table_type = 'VIEW'
-                      AND t.table_schema = '{s}'
-                      AND t.table_name = '{t}'
-                ORDER BY ordinal_position""".format(
-            s=table_schema, t=table_name
-        )
-    with connection.cursor() as pg_cur:
-        pg_cur.execute(sql)
-        pg_fields = pg_cur.fetchall()
-        pg_fields = [field[0] for field in pg_fields if field[0]]
-        for col in skip_columns:
-            try:
-                pg_fields.remove(col)
-            except ValueError:
-                raise InvalidSkipColumns(
-                    'Cannot skip unexisting column "{col}" in "{s}.{t}"'.format(
-                        col=col, s=table_schema, t=table_name
-                    )
-                )
-        if remove_pkey:
-            pkey = primary_key(connection, table_schema, table_name)
-            pg_fields.remove(pkey)
+    sql = TABLE_COLUMNS_SQL if table_type.lower() == "table" else VIEW_COLUMNS_SQL
+    with connection.cursor() as pg_cur, timed(CATALOG_QUERY, "columns"):
+        pg_cur.execute(sql, (f"{table_schema}.{table_name}",), prepare=True)
+        pg_fields = [field[0] for field in pg_cur.fetchall() if field[0]]
+    __skip_columns(pg_fields, table_schema, table_name, skip_columns)
+    if remove_pkey:
+        pkey = primary_key(connection, table_schema, table_name)
+        pg_fields.remove(pkey)
+    return pg_fields
+
+
+async def acolumns(
+    connection: psycopg.AsyncConnection,
+    table_schema: str,
+    table_name: str,
+    table_type: str = "table",
+    *,
+    remove_pkey: bool = False,
+    skip_columns: list = [],
+) -> list:
+    """
+    Returns the list of columns of a table, see `columns`
+    """
+    assert table_type.lower() in ("table", "view")
+    sql = TABLE_COLUMNS_SQL if table_type.lower() == "table" else VIEW_COLUMNS_SQL
+    with timed(CATALOG_QUERY, "columns"):
+        async with connection.cursor() as pg_cur:
+            await pg_cur.execute(sql, (f"{table_schema}.{table_name}",), prepare=True)
+            pg_fields = [field[0] for field in await pg_cur.fetchall() if field[0]]
+    __skip_columns(pg_fields, table_schema, table_name, skip_columns)
+    if remove_pkey:
+        pkey = await aprimary_key(connection, table_schema, table_name)
+        pg_fields.remove(pkey)
     return pg_fields
 
 
+def __skip_columns(pg_fields: list, table_schema: str, table_name: str, skip_columns: list):
+    for col in skip_columns:
+        try:
+            pg_fields.remove(col)
+        except ValueError:
+            raise InvalidSkipColumns(
+                'Cannot skip unexisting column "{col}" in "{s}.{t}"'.format(
+                    col=col, s=table_schema, t=table_name
+                )
+            )
+
+
+REFERENCE_COLUMNS_SQL = (
+    "SELECT a.attname, fa.attname AS foreign_column_name "
+    "FROM pg_catalog.pg_constraint con "
+    "JOIN pg_catalog.pg_attribute a "
+    "ON a.attrelid = con.conrelid AND a.attnum = con.conkey[1] "
+    "JOIN pg_catalog.pg_attribute fa "
+    "ON fa.attrelid = con.confrelid AND fa.attnum = con.confkey[1] "
+    "WHERE con.contype = 'f' "
+    "AND con.conrelid = to_regclass(%s) "
+    "AND con.confrelid = to_regclass(%s) "
+    "ORDER BY con.conname;"
+)
+
+
 def reference_columns(
     connection: psycopg.Connection,
     table_schema: str,
@@ -131,39 +186,68 @@ def reference_columns(
     foreign_table_name
         the name of the foreign table
     """
-    # see https://stackoverflow.com/a/1152321/1548052
-    sql = (
-        "SELECT kcu.column_name, ccu.column_name AS foreign_column_name "
-        "FROM information_schema.table_constraints AS tc "
-        "JOIN information_schema.key_column_usage AS kcu "
-        "ON tc.constraint_name = kcu.constraint_name "
-        "AND tc.table_schema = kcu.table_schema "
-        "JOIN information_schema.constraint_column_usage AS ccu "
-        "ON ccu.constraint_name = tc.constraint_name "
-        "AND ccu.table_schema = tc.table_schema "
-        "WHERE tc.constraint_type = 'FOREIGN KEY' "
-        "AND tc.table_name='{tn}' "
-        "AND tc.table_schema='{ts}' "
-        "AND ccu.table_name = '{ftn}' "
-        "AND ccu.table_schema = '{fts}';".format(
-            tn=table_name, ts=table_schema, ftn=foreign_table_name, fts=foreign_table_schema
+    with connection.cursor() as pg_cur, timed(CATALOG_QUERY, "reference_columns"):
+        pg_cur.execute(
+            REFERENCE_COLUMNS_SQL,
+            (f"{table_schema}.{table_name}", f"{foreign_table_schema}.{foreign_table_name}"),
+            prepare=True,
         )
-    )
-    with connection.cursor() as pg_cur:
-        pg_cur.execute(sql)
         cols = pg_cur.fetchone()
-        if not cols:
-            raise NoReferenceFound(
-                "{ts}.{tn} has no reference to {fts}.{ftn}".format(
-                    tn=table_name,
-                    ts=table_schema,
-                    ftn=foreign_table_name,
-                    fts=foreign_table_schema,
-                )
+    if not cols:
+        raise NoReferenceFound(
+            "{ts}.{tn} has no reference to {fts}.{ftn}".format(
+                tn=table_name,
+                ts=table_schema,
+                ftn=foreign_table_name,
+                fts=foreign_table_schema,
             )
+        )
     return cols
 
 
+async def areference_columns(
+    connection: psycopg.AsyncConnection,
+    table_schema: str,
+    table_name: str,
+    *,
+    foreign_table_schema: str,
+    foreign_table_name: str,
+) -> tuple[str, str]:
+    """
+    Returns the columns use in a reference constraint, see `reference_columns`
+    """
+    with timed(CATALOG_QUERY, "reference_columns"):
+        async with connection.cursor() as pg_cur:
+            await pg_cur.execute(
+                REFERENCE_COLUMNS_SQL,
+                (f"{table_schema}.{table_name}", f"{foreign_table_schema}.{foreign_table_name}"),
+                prepare=True,
+            )
+            cols = await pg_cur.fetchone()
+    if not cols:
+        raise NoReferenceFound(
+            "{ts}.{tn} has no reference to {fts}.{ftn}".format(
+                tn=table_name,
+                ts=table_schema,
+                ftn=foreign_table_name,
+                fts=foreign_table_schema,
+            )
+        )
+    return cols
+
+
+# see https://stackoverflow.com/a/8148177/1548052
+DEFAULT_VALUE_SQL = (
+    "SELECT pg_get_expr(d.adbin, d.adrelid) AS default_value\n"
+    "FROM pg_catalog.pg_attribute a\n"
+    "LEFT JOIN pg_catalog.pg_attrdef d ON (a.attrelid, a.attnum) = (d.adrelid,  d.adnum)\n"
+    "WHERE  NOT a.attisdropped   -- no dropped (dead) columns\n"
+    "AND    a.attnum > 0         -- no system columns\n"
+    "AND    a.attrelid = %s::regclass\n"
+    "AND    a.attname = %s;"
+)
+
+
 def default_value(
     connection: psycopg.Connection, table_schema: str, table_name: str, column: str
 ) -> str:
@@ -181,23 +265,36 @@ def default_value(
     column
         the column name
     """
-    # see https://stackoverflow.com/a/8148177/1548052
-
-    sql = (
-        "SELECT pg_get_expr(d.adbin, d.adrelid) AS default_value\n"
-        "FROM pg_catalog.pg_attribute a\n"
-        "LEFT JOIN pg_catalog.pg_attrdef d ON (a.attrelid, a.attnum) = (d.adrelid,  d.adnum)\n"
-        "WHERE  NOT a.attisdropped   -- no dropped (dead) columns\n"
-        "AND    a.attnum > 0         -- no system columns\n"
-        "AND    a.attrelid = '{ts}.{tn}'::regclass\n"
-        "AND    a.attname = '{col}';".format(ts=table_schema, tn=table_name, col=column)
-    )
-    with connection.cursor() as pg_cur:
-        pg_cur.execute(sql)
+    with connection.cursor() as pg_cur, timed(CATALOG_QUERY, "default_value"):
+        pg_cur.execute(DEFAULT_VALUE_SQL, (f"{table_schema}.{table_name}", column), prepare=True)
         result = pg_cur.fetchone()
         return result[0] if result and result[0] is not None else "NULL"
 
 
+async def adefault_value(
+    connection: psycopg.AsyncConnection, table_schema: str, table_name: str, column: str
+) -> str:
+    """
+    Returns the default value of the column, see `default_value`
+    """
+    with timed(CATALOG_QUERY, "default_value"):
+        async with connection.cursor() as pg_cur:
+            await pg_cur.execute(
+                DEFAULT_VALUE_SQL, (f"{table_schema}.{table_name}", column), prepare=True
+            )
+            result = await pg_cur.fetchone()
+            return result[0] if result and result[0] is not None else "NULL"
+
+
+GEOMETRY_TYPE_SQL = (
+    "SELECT type, srid "
+    "FROM geometry_columns "
+    "WHERE f_table_schema = %s "
+    "AND f_table_name = %s "
+    "AND f_geometry_column = %s;"
+)
+
+
 def geometry_type(
     connection: psycopg.Connection, table_schema: str, table_name: str, column: str = "geometry"
 ) -> tuple[str, int] | None:
@@ -215,17 +312,146 @@ def geometry_type(
     column:
         the geometry column name, defaults to "geometry"
     """
-    sql = (
-        "SELECT type, srid "
-        "FROM geometry_columns "
-        "WHERE f_table_schema = '{s}' "
-        "AND f_table_name = '{t}' "
-        "AND f_geometry_column = '{c}';".format(s=table_schema, t=table_name, c=column)
-    )
-    with connection.cursor() as pg_cur:
-        pg_cur.execute(sql)
+    with connection.cursor() as pg_cur, timed(CATALOG_QUERY, "geometry_type"):
+        pg_cur.execute(GEOMETRY_TYPE_SQL, (table_schema, table_name, column), prepare=True)
         res = pg_cur.fetchone()
         if res:
             return res[0], res[1]
         else:
             return None
+
+
+async def ageometry_type(
+    connection: psycopg.AsyncConnection,
+    table_schema: str,
+    table_name: str,
+    column: str = "geometry",
+) -> tuple[str, int] | None:
+    """
+    Returns the geometry type of a column as a tuple (type, srid), see `geometry_type`
+    """
+    with timed(CATALOG_QUERY, "geometry_type"):
+        async with connection.cursor() as pg_cur:
+            await pg_cur.execute(
+                GEOMETRY_TYPE_SQL, (table_schema, table_name, column), prepare=True
+            )
+            res = await pg_cur.fetchone()
+            if res:
+                return res[0], res[1]
+            else:
+                return None
+
+
+ENUM_VALUES_SQL = (
+    "SELECT to_regtype(%s) IS NOT NULL, array_agg(e.enumlabel ORDER BY e.enumsortorder)"
+    " FROM pg_catalog.pg_enum e"
+    " WHERE e.enumtypid = to_regtype(%s)"
+)
+
+
+def enum_values(connection: psycopg.Connection, schema_name: str, type_name: str) -> list:
+    """
+    Returns the values of an enum type, in their order, or None if the type does not exist
+
+    Parameters
+    ----------
+    conn
+        psycopg connection
+    schema_name
+        the schema name
+    type_name
+        the type name
+    """
+    name = f"{schema_name}.{type_name}"
+    with connection.cursor() as pg_cur, timed(CATALOG_QUERY, "enum_values"):
+        pg_cur.execute(ENUM_VALUES_SQL, (name, name), prepare=True)
+        exists, values = pg_cur.fetchone()
+    return (values or []) if exists else None
+
+
+async def aenum_values(
+    connection: psycopg.AsyncConnection, schema_name: str, type_name: str
+) -> list:
+    """
+    Returns the values of an enum type, see `enum_values`
+    """
+    name = f"{schema_name}.{type_name}"
+    with timed(CATALOG_QUERY, "enum_values"):
+        async with connection.cursor() as pg_cur:
+            await pg_cur.execute(ENUM_VALUES_SQL, (name, name), prepare=True)
+            exists, values = await pg_cur.fetchone()
+    return (values or []) if exists else None
+
+
+RELATION_COLUMNS_SQL = (
+    "SELECT a.attname, a.atttypid, pg_catalog.format_type(a.atttypid, a.atttypmod)"
+    " FROM pg_catalog.pg_attribute a"
+    " WHERE a.attrelid = to_regclass(%s) AND a.attnum > 0 AND NOT a.attisdropped"
+    " ORDER BY a.attnum"
+)
+
+
+def relation_columns(
+    connection: psycopg.Connection, schema_name: str, relation_name: str
+) -> list[tuple[str, int, str]]:
+    """
+    Returns the name, type oid and type of the columns of a table or a view, in their order
+
+    Parameters
+    ----------
+    conn
+        psycopg connection
+    schema_name
+        the schema name
+    relation_name
+        the table or view name
+    """
+    with connection.cursor() as pg_cur, timed(CATALOG_QUERY, "relation_columns"):
+        pg_cur.execute(RELATION_COLUMNS_SQL, (f"{schema_name}.{relation_name}",), prepare=True)
+        return pg_cur.fetchall()
+
+
+async def arelation_columns(
+    connection: psycopg.AsyncConnection, schema_name: str, relation_name: str
+) -> list[tuple[str, int, str]]:
+    """
+    Returns the columns of a table or a view, see `relation_columns`
+    """
+    with timed(CATALOG_QUERY, "relation_columns"):
+        async with connection.cursor() as pg_cur:
+            await pg_cur.execute(
+                RELATION_COLUMNS_SQL, (f"{schema_name}.{relation_name}",), prepare=True
+            )
+            return await pg_cur.fetchall()
+
+
+DEPENDENT_VIEWS_SQL = (
+    "SELECT DISTINCT v.relnamespace::regnamespace || '.' || v.relname"
+    " FROM pg_catalog.pg_depend d"
+    " JOIN pg_catalog.pg_rewrite r ON r.oid = d.objid"
+    " JOIN pg_catalog.pg_class v ON v.oid = r.ev_class"
+    " WHERE d.classid = 'pg_catalog.pg_rewrite'::regclass"
+    " AND d.refclassid = 'pg_catalog.pg_class'::regclass"
+    " AND d.refobjid = to_regclass(%s) AND v.oid <> d.refobjid"
+    " ORDER BY 1"
+)
+
+
+def dependent_views(
+    connection: psycopg.Connection, schema_name: str, relation_name: str
+) -> list[str]:
+    """
+    Returns the schema qualified names of the views built on a table or a view
+
+    Parameters
+    ----------
+    conn
+        psycopg connection
+    schema_name
+        the schema name
+    relation_name
+        the table or view name
+    """
+    with connection.cursor() as pg_cur, timed(CATALOG_QUERY, "dependent_views"):
+        pg_cur.execute(DEPENDENT_VIEWS_SQL, (f"{schema_name}.{relation_name}",), prepare=True)
+        return [row[0] for row in pg_cur.fetchall()]
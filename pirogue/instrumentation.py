@@ -0,0 +1,132 @@
+import time
+from contextlib import contextmanager
+
+CATALOG_QUERY = "catalog_query"
+PHASE = "phase"
+STATEMENT = "statement"
+LOCK_WAIT = "lock_wait"
+
+_hooks = []
+
+
+def add_hook(hook):
+    """
+    Registers a callback which is called after each instrumented event
+
+    The callback receives the event kind (CATALOG_QUERY, PHASE, STATEMENT or LOCK_WAIT),
+    the event name and its duration in seconds.
+
+    Parameters
+    ----------
+    hook
+        a callable hook(kind: str, name: str, duration: float)
+    """
+    _hooks.append(hook)
+
+
+def remove_hook(hook):
+    """
+    Unregisters a callback registered with `add_hook`
+
+    Parameters
+    ----------
+    hook
+        the callback
+    """
+    _hooks.remove(hook)
+
+
+def notify(kind: str, name: str, duration: float):
+    """
+    Reports an event to the registered hooks
+
+    Parameters
+    ----------
+    kind
+        the event kind, i.e. CATALOG_QUERY, PHASE, STATEMENT or LOCK_WAIT
+    name
+        the name of the event
+    duration
+        the duration of the event in seconds
+    """
+    for hook in list(_hooks):
+        hook(kind, name, duration)
+
+
+@contextmanager
+def timed(kind: str, name: str):
+    """
+    Times the enclosed block and reports it to the registered hooks
+
+    Parameters
+    ----------
+    kind
+        the event kind, i.e. CATALOG_QUERY, PHASE or STATEMENT
+    name
+        the name of the event
+    """
+    if not _hooks:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        notify(kind, name, time.perf_counter() - start)
+
+
+class Profile:
+    """
+    Collects the count and total duration of the instrumented events by kind and name.
+    Use it as a context manager:
+
+        with Profile() as profile:
+            MultipleInheritance(definition=definition, connection=conn).create()
+        print(profile.report())
+    """
+
+    def __init__(self):
+        self.events = {}
+
+    def __call__(self, kind: str, name: str, duration: float):
+        count, total = self.events.get((kind, name), (0, 0.0))
+        self.events[(kind, name)] = (count + 1, total + duration)
+
+    def __enter__(self):
+        add_hook(self)
+        return self
+
+    def __exit__(self, *args):
+        remove_hook(self)
+
+    def count(self, kind: str, name: str = None) -> int:
+        """
+        Returns the number of events of a kind, optionally restricted to a name
+
+        Parameters
+        ----------
+        kind
+            the event kind
+        name
+            the name of the event, if not given all events of the kind are counted
+        """
+        return sum(
+            count for (k, n), (count, _) in self.events.items() if k == kind and name in (None, n)
+        )
+
+    def report(self) -> str:
+        """
+        Returns the collected events as a text table, grouped by kind
+        """
+        lines = []
+        for kind in (CATALOG_QUERY, PHASE, STATEMENT, LOCK_WAIT):
+            events = sorted((n, v) for (k, n), v in self.events.items() if k == kind)
+            if not events:
+                continue
+            lines.append(f"{kind}:")
+            for name, (count, total) in events:
+                lines.append(f"  {name:<50} {count:>6} {total * 1000:>10.2f} ms")
+            count = sum(count for _, (count, _) in events)
+            total = sum(total for _, (_, total) in events)
+            lines.append(f"  {'total':<50} {count:>6} {total * 1000:>10.2f} ms")
+        return "\n".join(lines)
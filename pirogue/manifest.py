@@ -0,0 +1,339 @@
+import copy
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import psycopg
+import yaml
+
+from pirogue.batch import LockRetry
+from pirogue.catalog import SchemaCatalog
+from pirogue.deploy import deploy
+from pirogue.exceptions import InvalidDefinition
+from pirogue.multiple_inheritance import MultipleInheritance
+from pirogue.simple_joins import SimpleJoins
+from pirogue.utils import definition_tables
+
+KINDS = ("multiple_inheritance", "simple_joins")
+
+
+class ManifestEntry:
+    """
+    A definition of a manifest, with the tables it reads and the views it creates
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        path: str,
+        definition: dict,
+        create_joins: bool = False,
+        drop: bool = False,
+    ):
+        """
+        Parameters
+        ----------
+        kind
+            multiple_inheritance or simple_joins
+        path
+            the path of the YAML definition, used to identify the entry
+        definition
+            the YAML definition
+        create_joins
+            for multiple inheritance, if True, simple joins will be created for all joined tables
+        drop
+            for multiple inheritance, if True, will drop any existing view, type or trigger
+        """
+        if kind not in KINDS:
+            raise InvalidDefinition(f'"{kind}" is not a valid kind of definition')
+        self.kind = kind
+        self.path = path
+        self.definition = definition
+        self.create_joins = create_joins
+        self.drop = drop
+        self.tables = [tuple(table) for table in definition_tables(definition)]
+        if kind == "multiple_inheritance":
+            self.views = MultipleInheritance.definition_views(definition, create_joins)
+        else:
+            self.views = SimpleJoins.definition_views(definition)
+        self.dependencies = []
+
+    def generator(self, conn: psycopg.Connection, catalog: SchemaCatalog, variables: dict = {}):
+        """
+        Returns the MultipleInheritance or SimpleJoins object of the definition
+
+        Parameters
+        ----------
+        conn
+            the psycopg connection
+        catalog
+            the catalog to read the tables metadata from
+        variables
+            dictionary for variables to be used in SQL deltas ( name => value )
+        """
+        # the generators complete the definition, it is not modified in place
+        definition = copy.deepcopy(self.definition)
+        if self.kind == "multiple_inheritance":
+            return MultipleInheritance(
+                definition=definition,
+                variables=variables,
+                create_joins=self.create_joins,
+                drop=self.drop,
+                connection=conn,
+                catalog=catalog,
+            )
+        return SimpleJoins(definition, connection=conn, catalog=catalog)
+
+
+class Manifest:
+    """
+    A set of definitions deployed together, read from a YAML file such as:
+
+        variables:
+          srid: 2056
+        definitions:
+          - multiple_inheritance: animal.yaml
+            create_joins: true
+            drop: true
+          - simple_joins: cat.yaml
+
+    A definition depends on the definitions creating the views it reads.
+    """
+
+    def __init__(self, entries: list[ManifestEntry], variables: dict = {}):
+        """
+        Parameters
+        ----------
+        entries
+            the definitions
+        variables
+            dictionary for variables to be used in SQL deltas ( name => value )
+        """
+        self.entries = entries
+        self.variables = variables
+
+        creators = {}
+        for entry in entries:
+            for view in entry.views:
+                creators[view] = entry
+        for entry in entries:
+            entry.dependencies = []
+            for table in entry.tables:
+                creator = creators.get(table)
+                if creator not in (None, entry) and creator not in entry.dependencies:
+                    entry.dependencies.append(creator)
+        self.__ordered = self.__sort()
+
+    @classmethod
+    def from_file(cls, path: str) -> "Manifest":
+        """
+        Reads a manifest, the paths of the definitions being relative to it
+
+        Parameters
+        ----------
+        path
+            the path of the YAML manifest
+        """
+        with open(path) as f:
+            manifest = yaml.safe_load(f)
+        for key in manifest:
+            if key not in ("variables", "definitions"):
+                raise InvalidDefinition(f"key {key} is not valid in manifests")
+        directory = os.path.dirname(path)
+        entries = []
+        for item in manifest.get("definitions", []):
+            kinds = [kind for kind in KINDS if kind in item]
+            if len(kinds) != 1:
+                raise InvalidDefinition(f"a manifest definition needs one of the keys {KINDS}")
+            for key in item:
+                if key not in KINDS + ("create_joins", "drop"):
+                    raise InvalidDefinition(f'key "{key}" is not valid in manifest definitions')
+            definition_path = os.path.join(directory, item[kinds[0]])
+            with open(definition_path) as f:
+                definition = yaml.safe_load(f)
+            entries.append(
+                ManifestEntry(
+                    kinds[0],
+                    definition_path,
+                    definition,
+                    create_joins=item.get("create_joins", False),
+                    drop=item.get("drop", False),
+                )
+            )
+        return cls(entries, manifest.get("variables", {}))
+
+    def __sort(self) -> list[ManifestEntry]:
+        """
+        Returns the entries with their dependencies first, keeping the manifest order otherwise
+        """
+        ordered = []
+        remaining = list(self.entries)
+        while remaining:
+            ready = [
+                entry
+                for entry in remaining
+                if all(dependency in ordered for dependency in entry.dependencies)
+            ]
+            if not ready:
+                raise InvalidDefinition(
+                    "circular dependency between the definitions "
+                    + ", ".join(entry.path for entry in remaining)
+                )
+            ordered += ready
+            remaining = [entry for entry in remaining if entry not in ready]
+        return ordered
+
+    def ordered(self) -> list[ManifestEntry]:
+        """
+        Returns the entries in an order satisfying their dependencies
+        """
+        return list(self.__ordered)
+
+    def external_tables(self) -> list[tuple[str, str]]:
+        """
+        Returns the tables read by the definitions which are not created by the manifest
+        """
+        views = {view for entry in self.entries for view in entry.views}
+        tables = []
+        for entry in self.entries:
+            tables += [table for table in entry.tables if table not in views]
+        return tables
+
+
+class DeploymentResult:
+    """
+    The outcome of the deployment of a manifest entry
+    """
+
+    DEPLOYED = "deployed"
+    FAILED = "failed"
+    SKIPPED = "skipped"
+
+    def __init__(self, entry: ManifestEntry):
+        self.entry = entry
+        self.status = None
+        self.duration = None
+        self.error = None
+        self.lock_waits = []
+
+    def __str__(self):
+        duration = f"{self.duration * 1000:10.1f} ms" if self.duration is not None else " " * 13
+        line = f"{self.entry.path:<50} {self.status:<9} {duration}"
+        if self.lock_waits:
+            waited = sum(waited for _, _, waited in self.lock_waits)
+            line += f"  {len(self.lock_waits)} lock timeouts ({waited:.1f} s)"
+        if self.error is not None:
+            line += f"  {self.error}"
+        return line
+
+
+def deploy_manifest(
+    manifest: Manifest,
+    conninfo: str,
+    jobs: int = 4,
+    diff: bool = False,
+    cache_dir: str = None,
+    lock_retry: LockRetry = None,
+) -> list[DeploymentResult]:
+    """
+    Deploys the definitions of a manifest, running the independent ones concurrently.
+    The metadata of the existing tables is read once for all definitions,
+    the views created by the manifest are read once their definition is deployed.
+    Each definition is deployed and committed in its own transaction,
+    the definitions depending on a failed one are skipped.
+    Returns the results in the order of the manifest.
+
+    Parameters
+    ----------
+    manifest
+        the manifest
+    conninfo
+        the connection string, e.g. service=pirogue
+    jobs
+        the maximum number of concurrent deployments, i.e. of connections
+    diff
+        if True, only the changed views and triggers are deployed, see `pirogue.deploy.deploy`
+    cache_dir
+        the directory to cache the tables metadata in
+    lock_retry
+        if given, a definition is deployed again when it times out waiting for a lock
+    """
+    results = {entry: DeploymentResult(entry) for entry in manifest.entries}
+    workers = threading.local()
+    connections = []
+
+    def worker_connection() -> psycopg.Connection:
+        if not hasattr(workers, "conn"):
+            workers.conn = psycopg.connect(conninfo)
+            connections.append(workers.conn)
+        return workers.conn
+
+    def run(entry: ManifestEntry, catalog: SchemaCatalog) -> float:
+        start = time.perf_counter()
+        conn = worker_connection()
+        retry = None
+        if lock_retry is not None:
+            # the lock waits are reported per definition
+            retry = copy.copy(lock_retry)
+            retry.waits = results[entry].lock_waits
+        try:
+            generator = entry.generator(conn, catalog, manifest.variables)
+            if diff:
+                deploy(conn, [generator], lock_retry=retry)
+            else:
+                generator.create(lock_retry=retry)
+        except Exception:
+            conn.rollback()
+            raise
+        return time.perf_counter() - start
+
+    with psycopg.connect(conninfo, autocommit=True) as conn:
+        catalog = SchemaCatalog(conn, cache_dir=cache_dir)
+        catalog.load(manifest.external_tables())
+        # the catalog is shared by the workers, it must not query the connection of this thread
+        catalog.load_geometry_types()
+
+        pending = manifest.ordered()
+        running = {}
+        try:
+            with ThreadPoolExecutor(max_workers=jobs) as executor:
+                while pending or running:
+                    # the dependencies come first, a failure is propagated in a single pass
+                    for entry in list(pending):
+                        statuses = [
+                            results[dependency].status for dependency in entry.dependencies
+                        ]
+                        if (
+                            DeploymentResult.FAILED in statuses
+                            or DeploymentResult.SKIPPED in statuses
+                        ):
+                            results[entry].status = DeploymentResult.SKIPPED
+                            pending.remove(entry)
+                        elif all(status == DeploymentResult.DEPLOYED for status in statuses):
+                            pending.remove(entry)
+                            try:
+                                # reads the views created by the dependencies
+                                catalog.load(entry.tables)
+                                catalog.load_geometry_types()
+                            except psycopg.Error as e:
+                                results[entry].status = DeploymentResult.FAILED
+                                results[entry].error = e
+                                continue
+                            running[executor.submit(run, entry, catalog)] = entry
+                    if not running:
+                        break
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        result = results[running.pop(future)]
+                        try:
+                            result.duration = future.result()
+                            result.status = DeploymentResult.DEPLOYED
+                        except Exception as e:
+                            result.status = DeploymentResult.FAILED
+                            result.error = e
+        finally:
+            for worker_conn in connections:
+                worker_conn.close()
+
+    return [results[entry] for entry in manifest.entries]
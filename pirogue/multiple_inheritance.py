@@ -1,35 +1,68 @@
+import copy
+from typing import BinaryIO, Iterable, Iterator, Sequence
+
 import psycopg
 
-from pirogue.exceptions import InvalidDefinition, TableHasNoPrimaryKey, VariableError
+from pirogue.batch import LockRetry, aexecute_batch, execute_batch
+from pirogue.catalog import SchemaCatalog
+from pirogue.exceptions import (
+    DependentViewsError,
+    InvalidColumn,
+    InvalidDefinition,
+    TableHasNoPrimaryKey,
+    TypeEvolutionError,
+    VariableError,
+)
 from pirogue.information_schema import (
-    columns,
-    geometry_type,
-    primary_key,
-    reference_columns,
+    aenum_values,
+    arelation_columns,
+    dependent_views,
+    enum_values,
+    relation_columns,
 )
+from pirogue.instrumentation import PHASE, STATEMENT, timed
+from pirogue.part_hashes import comment_statements
 from pirogue.single_inheritance import SingleInheritance
+from pirogue.sql_writer import SqlWriter
 from pirogue.utils import (
-    default_value,
+    definition_tables,
     insert_command,
     select_columns,
     table_parts,
     update_command,
 )
 
+# the size of the chunks of COPY data read from files
+COPY_BUFFER_SIZE = 65536
+
 
 class MultipleInheritance:
     """
     Creates a view for multiple inheritance objects with associated triggers to edit data.
     """
 
+    PARTS = (
+        "drops",
+        "type",
+        "view",
+        "insert_trigger",
+        "update_trigger",
+        "delete_trigger",
+        "bulk_insert",
+        "bulk_update",
+        "bulk_delete",
+        "extras",
+    )
+
     def __init__(
         self,
         *,
         definition: dict,
-        connection: psycopg.Connection,
+        connection: psycopg.Connection | psycopg.AsyncConnection = None,
         variables: dict = {},
         create_joins: bool = False,
         drop: bool = False,
+        catalog: SchemaCatalog = None,
     ):
         """
         Produces the SQL code of the join table and triggers
@@ -39,13 +72,16 @@ class MultipleInheritance:
         definition
             the YAML definition of the multiple inheritance
         connection
-            a psycopg.Connection instance
+            a psycopg.Connection instance, can be omitted if a complete catalog is given.
+            A psycopg.AsyncConnection can be given as well, the view is then created with `acreate`
         variables
             dictionary for variables to be used in SQL deltas ( name => value )
         create_joins
             if True, simple joins will be created for all joined tables
         drop
             if True, will drop any existing view, type or trigger that will be created later
+        catalog
+            the catalog to read the tables metadata from, if not given it is loaded from the connection
         """
 
         self.variables = variables
@@ -53,6 +89,7 @@ class MultipleInheritance:
         self.drop = drop
 
         self.conn = connection
+        self.catalog = catalog or SchemaCatalog(connection)
 
         # check definition validity
         for key in definition.keys():
@@ -73,6 +110,10 @@ class MultipleInheritance:
                 "merge_columns",
                 "merge_geometry_columns",
                 "pkey_default_value",
+                "skip_unchanged_updates",
+                "bulk_insert",
+                "bulk_update",
+                "bulk_delete",
             ):
                 raise InvalidDefinition(f"key {key} is not a valid")
         # check joins validity
@@ -116,9 +157,644 @@ class MultipleInheritance:
         self.allow_type_change = definition.get("allow_type_change", True)
         self.additional_joins = definition.get("additional_joins", None)
         self.additional_columns = definition.get("additional_columns", {})
+        self.skip_unchanged_updates = definition.get("skip_unchanged_updates", False)
+        self.bulk_insert = definition.get("bulk_insert", False)
+        self.bulk_update = definition.get("bulk_update", False)
+        self.bulk_delete = definition.get("bulk_delete", False)
+        for trigger, bulk_keys in (
+            ("insert_trigger", ("bulk_insert", "bulk_update")),
+            ("update_trigger", ("bulk_update",)),
+        ):
+            for bulk_key in bulk_keys:
+                if definition.get(bulk_key) and any(
+                    definition.get(trigger, {}).get(key) for key in ("pre", "post")
+                ):
+                    raise InvalidDefinition(
+                        f"the pre and post code of {trigger} is written for single rows, "
+                        f"it cannot be used with {bulk_key}"
+                    )
+
+        self.__definition = definition
+        self.__resolved = False
+        # the values of the type in the database, None if it does not exist or is unknown
+        self.__deployed_type_values = None
+        # with an asynchronous connection, the metadata is loaded in acreate
+        if not isinstance(connection, psycopg.AsyncConnection):
+            # load the metadata of all involved tables at once
+            self.catalog.load(definition_tables(definition))
+            self.__resolve()
+
+    @staticmethod
+    def definition_views(definition: dict, create_joins: bool = False) -> list[tuple[str, str]]:
+        """
+        Returns the views (as schema and view names tuples) created for a definition,
+        without reading any metadata
+
+        Parameters
+        ----------
+        definition
+            the YAML definition
+        create_joins
+            if True, the single inheritance views of the joined tables are included
+        """
+        (master_schema, master_table) = table_parts(definition.get("table", None))
+        view_schema = definition.get("view_schema", master_schema)
+        views = [(view_schema, definition.get("view_name", f"vw_merge_{master_table}"))]
+        if create_joins:
+            views += [(view_schema, f"vw_{alias}") for alias in definition.get("joins", {})]
+        return views
+
+    def create(
+        self, commit: bool = True, batch: bool = True, lock_retry: LockRetry = None
+    ) -> bool:
+        """
+        Creates the merge view on the specified service
+        Returns True in case of success
+
+        Parameters
+        ----------
+        commit : bool
+            If True, commits the transaction after executing queries.
+        batch : bool
+            If True, all the statements (including the ones of the joins views)
+            are sent in a single round trip. Otherwise, they are executed one by one.
+        lock_retry : LockRetry
+            If given, the batch (and the evolution of the type) is retried when it times out
+            waiting for a lock. ValueError is raised if batch is False.
+        """
+        if not batch and lock_retry is not None:
+            raise ValueError("lock_retry requires batch")
+        if not self.drop:
+            self.evolve_type(commit=commit, lock_retry=lock_retry)
+        if batch:
+            view_parts = self.__view_parts()
+            statements = [sql for *_, sql in view_parts] + comment_statements(view_parts)
+            execute_batch(self.conn, statements, self.__batch_name(), lock_retry)
+            if commit:
+                self.conn.commit()
+            return True
+
+        success = True
+        view_parts = []
+        for phase, _sql in self.__iter_queries():
+            try:
+                sql = self.__format_variables(_sql).as_string(self.conn)
+                cursor = self.conn.cursor()
+                with timed(STATEMENT, f"{self.view_schema}.{self.view_name}.{phase}"):
+                    cursor.execute(sql)
+            except VariableError:
+                success = False
+                print(f"*** Failing:\n{_sql}\n***")
+                raise
+            except psycopg.Error as e:
+                print(f"*** Failing:\n{_sql}\n***")
+                raise e
+            view_parts.append((self.view_schema, self.view_name, phase, sql))
+        for sql in comment_statements(view_parts):
+            self.conn.execute(sql)
+        if commit:
+            self.conn.commit()
+
+        for join in self.__single_inheritances():
+            success &= join.create(commit=commit, batch=False)
+        return success
+
+    async def acreate(
+        self, commit: bool = True, batch: bool = True, lock_retry: LockRetry = None
+    ) -> bool:
+        """
+        Creates the merge view using the psycopg.AsyncConnection given at construction.
+        The metadata of all tables is loaded in a single pipelined round trip.
+        Returns True in case of success
+
+        Parameters
+        ----------
+        commit : bool
+            If True, commits the transaction after executing queries.
+        batch : bool
+            If True, all the statements (including the ones of the joins views)
+            are sent in a single round trip. Otherwise, they are executed one by one.
+        lock_retry : LockRetry
+            If given, the batch (and the evolution of the type) is retried when it times out
+            waiting for a lock. ValueError is raised if batch is False.
+        """
+        if not batch and lock_retry is not None:
+            raise ValueError("lock_retry requires batch")
+        await self.catalog.aload(definition_tables(self.__definition))
+        self.__resolve()
+        if not self.drop:
+            await self.aevolve_type(commit=commit, lock_retry=lock_retry)
+        if batch:
+            # the tables of the joins views are loaded already
+            view_parts = self.__view_parts()
+            statements = [sql for *_, sql in view_parts] + comment_statements(view_parts)
+            await aexecute_batch(self.conn, statements, self.__batch_name(), lock_retry)
+            if commit:
+                await self.conn.commit()
+            return True
+
+        success = True
+        view_parts = []
+        for phase, _sql in self.__iter_queries():
+            try:
+                sql = self.__format_variables(_sql).as_string(self.conn)
+                async with self.conn.cursor() as cursor:
+                    with timed(STATEMENT, f"{self.view_schema}.{self.view_name}.{phase}"):
+                        await cursor.execute(sql)
+            except VariableError:
+                success = False
+                print(f"*** Failing:\n{_sql}\n***")
+                raise
+            except psycopg.Error as e:
+                print(f"*** Failing:\n{_sql}\n***")
+                raise e
+            view_parts.append((self.view_schema, self.view_name, phase, sql))
+        for sql in comment_statements(view_parts):
+            await self.conn.execute(sql)
+        if commit:
+            await self.conn.commit()
+
+        for join in self.__single_inheritances():
+            success &= await join.acreate(commit=commit, batch=False)
+        return success
+
+    def __batch_name(self) -> str:
+        return f"{self.view_schema}.{self.view_name}.batch"
+
+    def __batch_statements(self, parts: Iterable[str] = None, joins: bool = True) -> list[str]:
+        return [sql for *_, sql in self.__view_parts(parts, joins)]
+
+    def __view_parts(
+        self, parts: Iterable[str] = None, joins: bool = True
+    ) -> list[tuple[str, str, str, str]]:
+        """
+        Returns the view schema, view name, part and SQL statement of the parts, see `iter_parts`
+        """
+        view_parts = []
+        for part, _sql in self.__iter_queries(parts):
+            try:
+                sql = self.__format_variables(_sql).as_string(self.conn)
+            except VariableError:
+                print(f"*** Failing:\n{_sql}\n***")
+                raise
+            view_parts.append((self.view_schema, self.view_name, part, sql))
+        if joins:
+            for join in self.__single_inheritances():
+                view_parts.extend(join.iter_parts())
+        return view_parts
+
+    def type_values(self) -> list[str]:
+        """
+        Returns the values of the type of the view, i.e. the parent and the subtypes aliases
+        """
+        parent = self.view_alias if self.allow_parent_only else "unknown"
+        return [parent] + list(self.__definition["joins"])
+
+    def evolve_type(self, commit: bool = True, lock_retry: LockRetry = None) -> list[str]:
+        """
+        Adapts the existing type of the view to the subtypes of the definition,
+        so that the view and triggers can be replaced in place rather than dropped.
+        The type is then not created by `create`.
+
+        The values of new subtypes are added with ALTER TYPE ... ADD VALUE at their
+        position in the definition, and committed right away since PostgreSQL does not allow
+        to use them in the transaction adding them.
+        The values of removed subtypes are kept, since enum values cannot be removed:
+        the view does not return them anymore, and writing them through the view only writes
+        the parent table. Rebuild the type with drop or `create_with_swap` to remove them.
+        The view is replaced in place afterwards, so when subtypes are added or removed,
+        its columns must only be appended to the deployed ones: TypeEvolutionError is raised
+        otherwise (e.g. when a subtype having columns is removed), before the type is altered.
+
+        Returns the added values. Does nothing if the type does not exist.
+
+        Parameters
+        ----------
+        commit : bool
+            Must be True if values are added, TypeEvolutionError is raised otherwise.
+        lock_retry : LockRetry
+            If given, adding the values is retried when it times out waiting for a lock.
+        """
+        values = enum_values(self.conn, self.view_schema, self.type_name)
+        statements, added, removed = self.__type_evolution(values, commit)
+        if statements or removed:
+            deployed = relation_columns(self.conn, self.view_schema, self.view_name)
+            if deployed:
+                with self.conn.cursor() as cursor:
+                    cursor.execute(self.__columns_query())
+                    self.__check_columns(deployed, [column.name for column in cursor.description])
+        if statements:
+            execute_batch(
+                self.conn, statements, f"{self.view_schema}.{self.type_name}.evolve", lock_retry
+            )
+            self.conn.commit()
+        return added
+
+    async def aevolve_type(self, commit: bool = True, lock_retry: LockRetry = None) -> list[str]:
+        """
+        Adapts the existing type of the view to the subtypes of the definition
+        using the psycopg.AsyncConnection given at construction, see `evolve_type`
+
+        Parameters
+        ----------
+        commit : bool
+            Must be True if values are added, TypeEvolutionError is raised otherwise.
+        lock_retry : LockRetry
+            If given, adding the values is retried when it times out waiting for a lock.
+        """
+        values = await aenum_values(self.conn, self.view_schema, self.type_name)
+        statements, added, removed = self.__type_evolution(values, commit)
+        if statements or removed:
+            deployed = await arelation_columns(self.conn, self.view_schema, self.view_name)
+            if deployed:
+                async with self.conn.cursor() as cursor:
+                    await cursor.execute(self.__columns_query())
+                    self.__check_columns(deployed, [column.name for column in cursor.description])
+        if statements:
+            await aexecute_batch(
+                self.conn, statements, f"{self.view_schema}.{self.type_name}.evolve", lock_retry
+            )
+            await self.conn.commit()
+        return added
+
+    def __type_evolution(
+        self, values: list, commit: bool
+    ) -> tuple[list[str], list[str], list[str]]:
+        """
+        Returns the statements adding the missing values to the type,
+        the added values and the removed values
+        """
+        self.__deployed_type_values = values
+        if values is None:
+            return [], [], []
+        vs, tn = self.view_schema, self.type_name
+        expected = self.type_values()
+        removed = [value for value in values if value not in expected]
+        if removed:
+            print(
+                f"*** The values {removed} of {vs}.{tn} are not used anymore and are kept. "
+                "Rebuild the type with drop or create_with_swap to remove them."
+            )
+        statements = []
+        added = []
+        current = list(values)
+        for i, value in enumerate(expected):
+            if value in current:
+                continue
+            previous = next((v for v in reversed(expected[:i]) if v in current), None)
+            if previous is not None:
+                statements.append(f"ALTER TYPE {vs}.{tn} ADD VALUE '{value}' AFTER '{previous}';")
+                current.insert(current.index(previous) + 1, value)
+            elif current:
+                statements.append(
+                    f"ALTER TYPE {vs}.{tn} ADD VALUE '{value}' BEFORE '{current[0]}';"
+                )
+                current.insert(0, value)
+            else:
+                statements.append(f"ALTER TYPE {vs}.{tn} ADD VALUE '{value}';")
+                current.append(value)
+            added.append(value)
+        if statements and not commit:
+            raise TypeEvolutionError(
+                f"The values {added} must be added to {vs}.{tn} and committed "
+                "before the view is replaced, use commit=True."
+            )
+        return statements, added, removed
+
+    def __columns_query(self) -> psycopg.sql.Composed:
+        """
+        Returns a query selecting no row but the columns of the view.
+        The values of the type are cast to text, since the added ones cannot be used yet.
+        """
+        described = copy.copy(self)
+        described.view_schema, described.type_name = "pg_catalog", "text"
+        sql = SqlWriter()
+        sql.write("SELECT * FROM (\n")
+        described.__write_select(sql)
+        sql.write("\n) AS view_columns LIMIT 0")
+        return self.__format_variables(sql.getvalue())
+
+    def __check_columns(self, deployed: list, columns: list[str]):
+        """
+        Raises TypeEvolutionError if the columns of the view do not only append to the
+        deployed ones, since the view could then not be replaced in place.
+        The first column is the type, it is not compared.
+        """
+        deployed = [column[0] for column in deployed]
+        if columns[1 : len(deployed)] != deployed[1:]:
+            vs = self.view_schema
+            raise TypeEvolutionError(
+                f"The columns of {vs}.{self.view_name} are not appended to the deployed ones, "
+                f"the view cannot be replaced in place and {vs}.{self.type_name} is left "
+                "unchanged. Recreate the view with drop and create, or with create_with_swap."
+            )
+
+    def create_with_swap(
+        self, shadow_schema: str = None, commit: bool = True, lock_retry: LockRetry = None
+    ) -> bool:
+        """
+        Replaces the merge view without any window where it does not exist, even if drop is False.
+        The type, view and trigger functions are first built and validated in a shadow schema.
+        Then, in a single short batch, the live view and type are dropped, the new ones are moved
+        to the view schema and the trigger functions and triggers are created on them.
+        The trigger functions are created again rather than moved,
+        since their code refers to the type of the shadow schema.
+        The single inheritance views (with create_joins) are replaced in a separate batch,
+        once the swap is committed.
+        The live view cannot be dropped if other views are built on it:
+        DependentViewsError is then raised before anything is built.
+        Returns True in case of success
+
+        Parameters
+        ----------
+        shadow_schema
+            the schema to build the objects in, defaults to pirogue_shadow_{view_name}.
+            It must not exist, it is dropped after the swap.
+        commit : bool
+            If True, commits the transaction after executing queries.
+        lock_retry : LockRetry
+            If given, the swap is retried when it times out waiting for a lock.
+        """
+        self.__resolve()
+        dependents = dependent_views(self.conn, self.view_schema, self.view_name)
+        if dependents:
+            raise DependentViewsError(
+                f"The views {', '.join(dependents)} are built on "
+                f"{self.view_schema}.{self.view_name}, which cannot be swapped. "
+                "Drop them before the swap and create them again afterwards, "
+                "or replace the view in place with create."
+            )
+        shadow_schema = shadow_schema or f"pirogue_shadow_{self.view_name}"
+        shadow = copy.copy(self)
+        shadow.view_schema = shadow_schema
+
+        build = [f"CREATE SCHEMA {shadow_schema};"]
+        build += shadow.__batch_statements(
+            ("type", "view", "insert_trigger", "update_trigger", "delete_trigger"), joins=False
+        )
+        build.append(f"SELECT * FROM {shadow_schema}.{self.view_name} LIMIT 0;")
+        execute_batch(self.conn, build, f"{shadow_schema}.{self.view_name}.build")
+
+        swap = self.__batch_statements(("drops",), joins=False)
+        swap.append(f"ALTER TYPE {shadow_schema}.{self.type_name} SET SCHEMA {self.view_schema};")
+        swap.append(f"ALTER VIEW {shadow_schema}.{self.view_name} SET SCHEMA {self.view_schema};")
+        # replaces the triggers moved with the view,
+        # the type and view are only generated for the hashes stored in the comment of the view
+        view_parts = self.__view_parts(
+            [part for part in self.PARTS if part != "drops"], joins=False
+        )
+        swap += [sql for _, _, part, sql in view_parts if part not in ("type", "view")]
+        swap += comment_statements(view_parts)
+        swap.append(f"DROP SCHEMA {shadow_schema} CASCADE;")
+        execute_batch(self.conn, swap, f"{self.view_schema}.{self.view_name}.swap", lock_retry)
+        if commit:
+            self.conn.commit()
+
+        # the join views do not depend on the merge view, they are replaced after the swap
+        join_parts = [part for join in self.__single_inheritances() for part in join.iter_parts()]
+        if join_parts:
+            joins = [sql for *_, sql in join_parts] + comment_statements(join_parts)
+            execute_batch(
+                self.conn, joins, f"{self.view_schema}.{self.view_name}.joins", lock_retry
+            )
+            if commit:
+                self.conn.commit()
+        return True
+
+    def copy_from(
+        self,
+        source: BinaryIO | Iterable[Sequence],
+        columns: list[str] = None,
+        format: str = "binary",
+        header: bool = False,
+        commit: bool = True,
+    ) -> int:
+        """
+        Loads rows in the merge view with COPY, which views do not support.
+        The rows are streamed to a temporary staging table shaped like the view,
+        then written to the master and subtype tables with one set-based insert per table,
+        in the same transaction and without firing the triggers of the view.
+        Neither the rows nor the file are held in memory.
+        Returns the number of loaded rows.
+
+        Parameters
+        ----------
+        source
+            a file of COPY data in the given format, opened in binary mode,
+            or an iterable of rows given as sequences of values in the order of the columns.
+            The rows are sent in binary format: the values of the types psycopg cannot dump
+            in binary (e.g. the type of the view or geometries) are given as text.
+        columns
+            the columns of the data, defaults to all the columns of the view
+        format
+            the COPY format of the file: binary, csv or text
+        header
+            if True, the first line of the file is skipped (csv and text formats)
+        commit : bool
+            If True, commits the transaction after loading the rows.
+        """
+        view_columns = relation_columns(self.conn, self.view_schema, self.view_name)
+        prepare, copy_sql, types, distribute = self.__copy_statements(
+            view_columns, columns, not hasattr(source, "read"), format, header
+        )
+        with self.conn.cursor() as cursor:
+            for statement in prepare:
+                cursor.execute(statement)
+            with timed(STATEMENT, f"{self.view_schema}.{self.view_name}.copy"):
+                with cursor.copy(copy_sql) as copy:
+                    if types is None:
+                        while data := source.read(COPY_BUFFER_SIZE):
+                            copy.write(data)
+                    else:
+                        copy.set_types(types)
+                        for row in source:
+                            copy.write_row(row)
+            for statement in distribute:
+                with timed(STATEMENT, f"{self.view_schema}.{self.view_name}.distribute"):
+                    cursor.execute(statement)
+                    if cursor.description:
+                        count = cursor.fetchone()[0]
+        if commit:
+            self.conn.commit()
+        return count
+
+    async def acopy_from(
+        self,
+        source: BinaryIO | Iterable[Sequence],
+        columns: list[str] = None,
+        format: str = "binary",
+        header: bool = False,
+        commit: bool = True,
+    ) -> int:
+        """
+        Loads rows in the merge view with COPY using the psycopg.AsyncConnection given
+        at construction, see `copy_from`
+        """
+        await self.catalog.aload(definition_tables(self.__definition))
+        self.__resolve()
+        view_columns = await arelation_columns(self.conn, self.view_schema, self.view_name)
+        prepare, copy_sql, types, distribute = self.__copy_statements(
+            view_columns, columns, not hasattr(source, "read"), format, header
+        )
+        async with self.conn.cursor() as cursor:
+            for statement in prepare:
+                await cursor.execute(statement)
+            with timed(STATEMENT, f"{self.view_schema}.{self.view_name}.copy"):
+                async with cursor.copy(copy_sql) as copy:
+                    if types is None:
+                        while data := source.read(COPY_BUFFER_SIZE):
+                            await copy.write(data)
+                    else:
+                        copy.set_types(types)
+                        for row in source:
+                            await copy.write_row(row)
+            for statement in distribute:
+                with timed(STATEMENT, f"{self.view_schema}.{self.view_name}.distribute"):
+                    await cursor.execute(statement)
+                    if cursor.description:
+                        count = (await cursor.fetchone())[0]
+        if commit:
+            await self.conn.commit()
+        return count
+
+    def __copy_statements(
+        self,
+        view_columns: list[tuple[str, int, str]],
+        columns: list[str],
+        rows: bool,
+        format: str,
+        header: bool,
+    ) -> tuple[list[str], str, list[int], list]:
+        """
+        Returns the statements creating the staging table, the COPY statement,
+        the types of the rows (None for files) and the statements distributing
+        the staging rows to the tables, the insert returning their number.
+        The columns of rows whose type cannot be dumped in binary are staged as text,
+        and converted to their type before the distribution.
+        """
+        vs, vn = self.view_schema, self.view_name
+        if format not in ("binary", "csv", "text"):
+            raise ValueError(
+                f'Invalid COPY format "{format}", valid formats are binary, csv, text'
+            )
+        if any(self.insert_trigger.get(key) for key in ("pre", "post")):
+            raise InvalidDefinition(
+                "the pre and post code of insert_trigger is written for single rows, "
+                "it cannot be used with copy_from"
+            )
+        column_types = {name: (oid, type_name) for name, oid, type_name in view_columns}
+        columns = columns or list(column_types)
+        for col in columns:
+            if col not in column_types:
+                raise InvalidColumn(f"{col} is not a column of {vs}.{vn}")
+
+        staging = f"pg_temp.{vn}_staging"
+        prepare = [f"CREATE TEMPORARY TABLE {vn}_staging (LIKE {vs}.{vn})"]
+        types = None
+        converted = []
+        if rows:
+            text_oid = psycopg.adapters.types["text"].oid
+            types = []
+            for col in columns:
+                oid = column_types[col][0]
+                try:
+                    self.conn.adapters.get_dumper_by_oid(oid, psycopg.pq.Format.BINARY)
+                    types.append(oid)
+                except psycopg.ProgrammingError:
+                    types.append(text_oid)
+                    converted.append(col)
+            format = "binary"
+        if converted:
+            prepare.append(
+                f"ALTER TABLE {staging} "
+                + ", ".join(f"ALTER COLUMN {col} TYPE text" for col in converted)
+            )
+        options = f"FORMAT {format}" + (", HEADER true" if header else "")
+        copy_sql = f"COPY {staging} ({', '.join(columns)}) FROM STDIN ({options})"
+
+        distribute = []
+        if converted:
+            distribute.append(
+                f"ALTER TABLE {staging} "
+                + ", ".join(
+                    f"ALTER COLUMN {col} TYPE {column_types[col][1]}"
+                    f" USING {col}::{column_types[col][1]}"
+                    for col in converted
+                )
+            )
+        distribute.append(
+            self.__format_variables(self.__bulk_insert_query(f"{staging} AS r", count=True))
+        )
+        distribute.append(f"DROP TABLE {staging}")
+        return prepare, copy_sql, types, distribute
+
+    def subtype_queries(self) -> dict[str, str]:
+        """
+        Returns the SELECT of the rows of each type of the view, by type value.
+        A query joins the table of its subtype only and returns the columns of the view.
+        """
+        queries = {}
+        for value in self.type_values():
+            sql = SqlWriter()
+            self.__write_select(sql, value)
+            queries[value] = self.__format_variables(sql.getvalue()).as_string(self.conn)
+        return queries
+
+    def sql(self) -> str:
+        """
+        Returns the SQL code which is run by `create`, without executing it.
+        A connection is not required if the catalog holds all tables.
+        """
+        return "\n".join(self.iter_statements())
+
+    def iter_statements(self, parts: Iterable[str] = None) -> Iterator[str]:
+        """
+        Yields the SQL statements of the given parts, in the order of PARTS,
+        followed by the ones of the single inheritance views if create_joins is True.
+        Each statement is generated when it is requested, so that they can be written
+        to a file or a socket as they come, and only the metadata required by the
+        requested parts is read.
+
+        Parameters
+        ----------
+        parts
+            the parts to generate among PARTS, defaults to all of them
+            ("drops" being included only if drop is True)
+        """
+        for *_, sql in self.iter_parts(parts):
+            yield sql
+
+    def iter_parts(self, parts: Iterable[str] = None) -> Iterator[tuple[str, str, str, str]]:
+        """
+        Yields the view schema, view name, part and SQL statement of the given parts,
+        for the merge view and the single inheritance views, see `iter_statements`
+
+        Parameters
+        ----------
+        parts
+            the parts to generate among PARTS, defaults to all of them
+            ("drops" being included only if drop is True)
+        """
+        self.__resolve()
+        for part, _sql in self.__iter_queries(parts):
+            sql = self.__format_variables(_sql).as_string(self.conn)
+            yield self.view_schema, self.view_name, part, sql
+        join_parts = None
+        if parts is not None:
+            join_parts = [part for part in parts if part in SingleInheritance.PARTS]
+        for join in self.__single_inheritances():
+            yield from join.iter_parts(join_parts)
+
+    def __resolve(self):
+        """
+        Reads the keys and references of the tables from the catalog
+        """
+        if self.__resolved:
+            return
+        definition = self.__definition
 
         try:
-            self.master_pkey = primary_key(self.conn, self.master_schema, self.master_table)
+            self.master_pkey = self.catalog.primary_key(self.master_schema, self.master_table)
         except TableHasNoPrimaryKey:
             raise TableHasNoPrimaryKey(
                 f'{self.view_alias} has no primary key, specify it with "key"'
@@ -134,99 +810,117 @@ class MultipleInheritance:
             if "fkey" in table_def:
                 table_def["ref_master_key"] = table_def["fkey"]
             else:
-                table_def["ref_master_key"] = reference_columns(
-                    self.conn,
+                table_def["ref_master_key"] = self.catalog.reference_columns(
                     table_def["table_schema"],
                     table_def["table_name"],
                     foreign_table_schema=self.master_schema,
                     foreign_table_name=self.master_table,
                 )[0]
             try:
-                table_def["pkey"] = primary_key(
-                    self.conn, table_def["table_schema"], table_def["table_name"]
+                table_def["pkey"] = self.catalog.primary_key(
+                    table_def["table_schema"], table_def["table_name"]
                 )
             except TableHasNoPrimaryKey:
                 table_def["pkey"] = table_def["ref_master_key"]
+            # the subtype row is deleted by the database with the master row
+            table_def["delete_cascade"] = (
+                self.catalog.reference_on_delete(
+                    table_def["table_schema"],
+                    table_def["table_name"],
+                    table_def["ref_master_key"],
+                    foreign_table_schema=self.master_schema,
+                    foreign_table_name=self.master_table,
+                )
+                == "c"
+            )
+
+        # index of the joins having each column, in the order of the definition
+        self.column_joins = {}
+        for alias, table_def in self.joins.items():
+            model = self.catalog.model(table_def["table_schema"], table_def["table_name"])
+            for col in model.columns:
+                self.column_joins.setdefault(col, []).append(alias)
 
         # pre-process merged columns
-        self.merge_column_cast = {}
-        # for geometry columns, we need to get the type to cast the NULL value
-        merge_geometry_columns = definition.get("merge_geometry_columns", [])
-        for col in merge_geometry_columns:
-            for table_def in self.joins.values():
-                gt = geometry_type(
-                    self.conn, table_def["table_schema"], table_def["table_name"], col
-                )
-                if gt:
-                    self.merge_column_cast[col] = "::geometry({type},{srid})".format(
-                        type=gt[0], srid=gt[1]
-                    )
-                    break
-            if col not in self.merge_column_cast:
-                raise InvalidDefinition(f'There is no geometry column "{col}" in joined tables')
-        self.merge_columns = definition.get("merge_columns", []) + merge_geometry_columns
+        # for geometry columns, the type to cast the NULL value is read when writing the view
+        self.merge_geometry_columns = definition.get("merge_geometry_columns", [])
+        self.merge_column_cast = None
+        self.merge_columns = definition.get("merge_columns", []) + self.merge_geometry_columns
+        self.__resolved = True
 
-    def create(self, commit: bool = True) -> bool:
+    def __iter_queries(self, parts: Iterable[str] = None) -> Iterator[tuple[str, str]]:
         """
-        Creates the merge view on the specified service
-        Returns True in case of success
-
-        Parameters
-        ----------
-        commit : bool
-            If True, commits the transaction after executing queries.
+        Yields the phase and SQL code of the requested parts, skipping empty ones
         """
-        queries = []
-        success = True
-        if self.drop:
-            queries.append(self.__drops())
-        queries.append(self.__type())
-        queries.append(self.__view())
-        queries.append(self.__insert_trigger())
-        queries.append(self.__update_trigger())
-        queries.append(self.__delete_trigger())
-        queries.append(self.__extras())
-
-        for _sql in queries:
-            if not _sql:
+        if parts is None:
+            parts = self.PARTS if self.drop else self.PARTS[1:]
+            if not self.drop and self.__deployed_type_values is not None:
+                # the type exists already, see evolve_type
+                parts = [part for part in parts if part != "type"]
+        for part in parts:
+            if part not in self.PARTS:
+                raise ValueError(f'Invalid part "{part}", valid parts are {self.PARTS}')
+        generators = {
+            "drops": self.__drops,
+            "type": self.__type,
+            "view": self.__view,
+            "insert_trigger": self.__insert_trigger,
+            "update_trigger": self.__update_trigger,
+            "delete_trigger": self.__delete_trigger,
+            "bulk_insert": self.__bulk_insert,
+            "bulk_update": self.__bulk_update,
+            "bulk_delete": self.__bulk_delete,
+            "extras": self.__extras,
+        }
+        for phase in self.PARTS:
+            if phase not in parts:
                 continue
-            try:
-                cursor = self.conn.cursor()
-                cursor.execute(psycopg.sql.SQL(_sql).format(**self.variables))
-            except (TypeError, KeyError):
-                success = False
-                print(f"*** Failing:\n{_sql}\n***")
-                raise VariableError(
-                    "An error in a SQL variable is probable. "
-                    "Check the variables in the SQL code "
-                    "(were given: {svars}). "
-                    "Also, any % character shall be escaped with %%".format(
-                        svars=list(self.variables.keys())
-                    )
+            with timed(PHASE, f"MultipleInheritance.{phase}"):
+                _sql = generators[phase]()
+            if _sql:
+                yield phase, _sql
+
+    def __format_variables(self, sql: str) -> psycopg.sql.Composed:
+        try:
+            return psycopg.sql.SQL(sql).format(**self.variables)
+        except (TypeError, KeyError):
+            raise VariableError(
+                "An error in a SQL variable is probable. "
+                "Check the variables in the SQL code "
+                "(were given: {svars}). "
+                "Also, any % character shall be escaped with %%".format(
+                    svars=list(self.variables.keys())
                 )
-            except psycopg.Error as e:
-                print(f"*** Failing:\n{_sql}\n***")
-                raise e
-        if commit:
-            self.conn.commit()
+            )
 
-        if self.create_joins:
-            for alias, table_def in self.joins.items():
-                success &= SingleInheritance(
-                    connection=self.conn,
-                    parent_table=f"{self.master_schema}.{self.master_table}",
-                    child_table="{s}.{t}".format(
-                        s=table_def["table_schema"], t=table_def["table_name"]
-                    ),
-                    view_name=f"vw_{alias}",
-                    view_schema=self.view_schema,
-                ).create(commit=commit)
-        return success
+    def __single_inheritances(self) -> list:
+        if not self.create_joins:
+            return []
+        return [
+            SingleInheritance(
+                connection=self.conn,
+                catalog=self.catalog,
+                parent_table=f"{self.master_schema}.{self.master_table}",
+                child_table="{s}.{t}".format(
+                    s=table_def["table_schema"], t=table_def["table_name"]
+                ),
+                view_name=f"vw_{alias}",
+                view_schema=self.view_schema,
+                skip_unchanged_updates=self.skip_unchanged_updates,
+            )
+            for alias, table_def in self.joins.items()
+        ]
 
     def __drops(self) -> str:
-        sql = "DROP VIEW IF EXISTS {vs}.{vn};" "DROP TYPE IF EXISTS {vs}.{tn};".format(
-            vs=self.view_schema, tn=self.type_name, vn=self.view_name
-        )
+        sql = (
+            "DROP FUNCTION IF EXISTS {vs}.fn_{vn}_bulk_insert({vs}.{vn}[]);"
+            "DROP FUNCTION IF EXISTS {vs}.fn_{vn}_bulk_update({vs}.{vn}[], boolean);"
+            "DROP FUNCTION IF EXISTS {vs}.fn_{vn}_purge({vs}.{tn});"
+            # the type of its argument is the one of the primary key, it is dropped by name
+            "DROP FUNCTION IF EXISTS {vs}.fn_{vn}_delete_many;"
+            "DROP VIEW IF EXISTS {vs}.{vn};"
+            "DROP TYPE IF EXISTS {vs}.{tn};"
+        ).format(vs=self.view_schema, tn=self.type_name, vn=self.view_name)
         return sql
 
     def __type(self) -> str:
@@ -234,55 +928,49 @@ class MultipleInheritance:
 
         :return:
         """
+        values = self.type_values()
         sql = "CREATE TYPE {vs}.{tn} AS ENUM ('{pt}', {ct} );".format(
             vs=self.view_schema,
             tn=self.type_name,
-            pt=self.view_alias if self.allow_parent_only else "unknown",
-            ct=", ".join([f"'{alias}'" for alias in self.joins]),
+            pt=values[0],
+            ct=", ".join([f"'{alias}'" for alias in values[1:]]),
         )
         return sql
 
     def __view(self) -> str:
         """
-        :return:
+        Writes the SELECT of the view
         """
+        sql = SqlWriter()
+        sql.write(f"\nCREATE OR REPLACE VIEW {self.view_schema}.{self.view_name} AS\n")
+        self.__write_select(sql)
+        sql.write(";\n")
+        return sql.getvalue()
 
+    def __write_select(self, sql: SqlWriter, subtype: str = None):
+        """
+        Writes the SELECT of the view, or of the rows of one of its types only.
+        For a subtype, its table is inner joined and the other tables are joined on false,
+        so that the planner does not read them while the columns are kept.
+        For the parent, all tables are joined on false and the rows having a subtype are
+        filtered out.
+        """
         sorted_joins = sorted(self.joins.items())
-
-        sql = """
-CREATE OR REPLACE VIEW {vs}.{vn} AS
-  SELECT
-    CASE
-      {types}
-      ELSE {no_subtype}
-    END AS {type_name}
-    {master_columns}{merge_columns}
-    {joined_columns}{additional_columns}
-  FROM {mt}.{ms} {sa}
-    {joined_tables}{additional_joins};
-""".format(
-            vs=self.view_schema,
-            vn=self.view_name,
-            types="\n      ".join(
-                [
-                    "WHEN {shal}.{mrf} IS NOT NULL THEN '{al}'::{vs}.{tn}".format(
-                        shal=table_def["short_alias"],
-                        mrf=table_def["ref_master_key"],
-                        al=alias,
-                        vs=self.view_schema,
-                        tn=self.type_name,
-                    )
-                    for alias, table_def in sorted_joins
-                ]
-            ),
-            no_subtype="'{type}'::{vs}.{tn}".format(
-                type=self.view_alias if self.allow_parent_only else "unknown",
-                vs=self.view_schema,
-                tn=self.type_name,
+        vs, tn = self.view_schema, self.type_name
+        sql.write("  SELECT\n    CASE\n      ")
+        sql.join(
+            "\n      ",
+            (
+                f"WHEN {table_def['short_alias']}.{table_def['ref_master_key']} IS NOT NULL "
+                f"THEN '{alias}'::{vs}.{tn}"
+                for alias, table_def in sorted_joins
             ),
-            type_name=self.type_name,
-            master_columns=select_columns(
-                connection=self.conn,
+        )
+        no_subtype = self.view_alias if self.allow_parent_only else "unknown"
+        sql.write(f"\n      ELSE '{no_subtype}'::{vs}.{tn}\n    END AS {tn}\n    ")
+        sql.write(
+            select_columns(
+                catalog=self.catalog,
                 table_schema=self.master_schema,
                 table_name=self.master_table,
                 table_alias=self.view_alias,
@@ -291,120 +979,117 @@ CREATE OR REPLACE VIEW {vs}.{vn} AS
                 remap_columns=self.master_remap_columns,
                 indent=4,
                 separate_first=True,
+            )
+        )
+        sql.join("\n      , ", (self.__merge_column(col) for col in self.merge_columns))
+        sql.write("\n    ")
+        sql.join(
+            "\n    ",
+            (
+                select_columns(
+                    catalog=self.catalog,
+                    table_schema=table_def["table_schema"],
+                    table_name=table_def["table_name"],
+                    table_alias=table_def["short_alias"],
+                    skip_columns=table_def.get("skip_columns", []) + [table_def["ref_master_key"]],
+                    safe_skip_columns=self.merge_columns,
+                    prefix=table_def.get("prefix", None),
+                    remove_pkey=False,
+                    remap_columns=table_def.get("remap_columns", {}),
+                    indent=4,
+                    separate_first=True,
+                )
+                for alias, table_def in sorted_joins
             ),
-            merge_columns="\n      , ".join(
-                [
-                    "\n    , CASE"
-                    "\n      {conditions}"
-                    "\n      ELSE NULL{cast}"
-                    "\n    END AS {col}".format(
-                        col=col,
-                        conditions="\n      ".join(
-                            [
-                                "WHEN {ta}.{rmk} IS NOT NULL THEN {ta}.{col}".format(
-                                    ta=table_def["short_alias"],
-                                    rmk=table_def["ref_master_key"],
-                                    col=col,
-                                )
-                                for alias, table_def in sorted_joins
-                                if col
-                                in columns(
-                                    connection=self.conn,
-                                    table_schema=table_def["table_schema"],
-                                    table_name=table_def["table_name"],
-                                    skip_columns=table_def.get("skip_columns", []),
-                                )
-                            ]
-                        ),
-                        cast=self.merge_column_cast.get(col, ""),
-                    )
-                    for col in self.merge_columns
-                ]
-            ),
-            joined_columns="\n    ".join(
-                [
-                    select_columns(
-                        connection=self.conn,
-                        table_schema=table_def["table_schema"],
-                        table_name=table_def["table_name"],
-                        table_alias=table_def["short_alias"],
-                        skip_columns=table_def.get("skip_columns", [])
-                        + [table_def["ref_master_key"]],
-                        safe_skip_columns=self.merge_columns,
-                        prefix=table_def.get("prefix", None),
-                        remove_pkey=False,
-                        remap_columns=table_def.get("remap_columns", {}),
-                        indent=4,
-                        separate_first=True,
-                    )
+        )
+        for alias, cdef in self.additional_columns.items():
+            sql.write(f",\n    {cdef} AS {alias}")
+        sql.write(f"\n  FROM {self.master_schema}.{self.master_table} {self.short_alias}\n    ")
+
+        def join(alias: str, table_def: dict) -> str:
+            reference = (
+                f"{table_def['short_alias']}.{table_def['ref_master_key']} "
+                f"= {self.short_alias}.{self.master_pkey}"
+            )
+            if subtype is None:
+                return f"LEFT JOIN {table_def['table']} {table_def['short_alias']} ON {reference}"
+            if alias == subtype:
+                return f"JOIN {table_def['table']} {table_def['short_alias']} ON {reference}"
+            return f"LEFT JOIN {table_def['table']} {table_def['short_alias']} ON false"
+
+        sql.join("\n    ", (join(alias, table_def) for alias, table_def in sorted_joins))
+        if self.additional_joins:
+            sql.write(f"\n    {self.additional_joins}")
+        if subtype is not None and subtype not in self.joins:
+            sql.write("\n  WHERE ")
+            sql.join(
+                "\n    AND ",
+                (
+                    f"NOT EXISTS (SELECT 1 FROM {table_def['table']} WHERE "
+                    f"{table_def['table']}.{table_def['ref_master_key']} "
+                    f"= {self.short_alias}.{self.master_pkey})"
                     for alias, table_def in sorted_joins
-                ]
-            ),
-            additional_columns="".join(
-                [f",\n    {cdef} AS {alias}" for alias, cdef in self.additional_columns.items()]
-            ),
-            mt=self.master_schema,
-            ms=self.master_table,
-            sa=self.short_alias,
-            joined_tables="\n    ".join(
-                [
-                    "LEFT JOIN {tbl} {tal} ON {tal}.{rmk} = {msa}.{mpk}".format(
-                        tbl=table_def[1]["table"],
-                        tal=table_def[1]["short_alias"],
-                        rmk=table_def[1]["ref_master_key"],
-                        msa=self.short_alias,
-                        mpk=self.master_pkey,
+                ),
+            )
+
+    def __merge_column_casts(self) -> dict:
+        """
+        Returns the casts of the NULL value of the merged geometry columns
+        """
+        if self.merge_column_cast is not None:
+            return self.merge_column_cast
+        self.merge_column_cast = {}
+        for col in self.merge_geometry_columns:
+            for alias in self.column_joins.get(col, []):
+                table_def = self.joins[alias]
+                gt = self.catalog.geometry_type(
+                    table_def["table_schema"], table_def["table_name"], col
+                )
+                if gt:
+                    self.merge_column_cast[col] = "::geometry({type},{srid})".format(
+                        type=gt[0], srid=gt[1]
                     )
-                    for table_def in sorted_joins
-                ]
-            ),
-            additional_joins=f"\n    {self.additional_joins}" if self.additional_joins else "",
+                    break
+            if col not in self.merge_column_cast:
+                raise InvalidDefinition(f'There is no geometry column "{col}" in joined tables')
+        return self.merge_column_cast
+
+    def __merge_column(self, col: str) -> str:
+        """
+        Writes the CASE selecting a merged column from the joins having it
+        """
+        conditions = []
+        for alias in sorted(self.column_joins.get(col, [])):
+            table_def = self.joins[alias]
+            if col not in table_def.get("skip_columns", []):
+                conditions.append(
+                    f"WHEN {table_def['short_alias']}.{table_def['ref_master_key']} IS NOT NULL "
+                    f"THEN {table_def['short_alias']}.{col}"
+                )
+        return "\n    , CASE\n      {conditions}\n      ELSE NULL{cast}\n    END AS {col}".format(
+            col=col,
+            conditions="\n      ".join(conditions),
+            cast=self.__merge_column_casts().get(col, ""),
         )
-        return sql
 
     def __insert_trigger(self) -> str:
         """
-
-        :return:
+        Writes the function and trigger to insert through the view
         """
-
         sorted_joins = sorted(self.joins.items())
-
-        sql = """-- INSERT TRIGGER
-CREATE OR REPLACE FUNCTION {vs}.ft_{vn}_insert() RETURNS trigger AS
-$BODY$
-DECLARE
-  {declare}
-BEGIN
-  {insert_trigger_pre}
-  {insert_master}
-
-  CASE
-    {insert_joins}
-  ELSE
-    {raise_notice}
-  END CASE;
-
-  {insert_trigger_post}
-RETURN NEW;
-END;
-$BODY$
-LANGUAGE plpgsql;
-
-DROP TRIGGER IF EXISTS tr_{vn}_on_insert ON {vs}.{vn};
-
-CREATE TRIGGER tr_{vn}_on_insert
-    INSTEAD OF INSERT ON {vs}.{vn}
-    FOR EACH ROW EXECUTE PROCEDURE {vs}.ft_{vn}_insert();
-""".format(
-            vs=self.view_schema,
-            vn=self.view_name,
-            declare="\n  ".join(
-                [f"{declare};" for declare in self.insert_trigger.get("declare", [])]
-            ),
-            insert_trigger_pre=self.insert_trigger.get("pre", ""),
-            insert_master=insert_command(
-                connection=self.conn,
+        vs, vn, tn = self.view_schema, self.view_name, self.type_name
+        sql = SqlWriter()
+        sql.write(
+            f"-- INSERT TRIGGER\n"
+            f"CREATE OR REPLACE FUNCTION {vs}.ft_{vn}_insert() RETURNS trigger AS\n"
+            f"$BODY$\n"
+            f"DECLARE\n  "
+        )
+        sql.join("\n  ", (f"{declare};" for declare in self.insert_trigger.get("declare", [])))
+        sql.write("\nBEGIN\n  ", self.insert_trigger.get("pre", ""), "\n  ")
+        sql.write(
+            insert_command(
+                catalog=self.catalog,
                 table_schema=self.master_schema,
                 table_name=self.master_table,
                 skip_columns=self.master_skip_colums,
@@ -414,227 +1099,515 @@ CREATE TRIGGER tr_{vn}_on_insert
                 indent=8,
                 coalesce_pkey_default=True,
                 returning="{mpk} INTO NEW.{mpk}".format(mpk=self.master_pkey),
-            ),
-            insert_joins="\n    ".join(
-                [
-                    "WHEN NEW.{type_name} = '{alias}'::{vs}.{type_name} THEN"
-                    "\n      {insert_join}".format(
-                        type_name=self.type_name,
-                        alias=alias,
-                        vs=self.view_schema,
-                        insert_join=insert_command(
-                            connection=self.conn,
-                            table_schema=table_def["table_schema"],
-                            table_name=table_def["table_name"],
-                            table_alias=table_def["short_alias"],
-                            skip_columns=table_def.get("skip_columns", []),
-                            prefix=table_def.get("prefix", None),
-                            insert_values={
-                                **{
-                                    table_def["ref_master_key"]: "NEW.{c}".format(
-                                        c=self.master_pkey
-                                    )
-                                },
-                                **table_def.get("insert_values", {}),
-                            },
-                            remap_columns=table_def.get("remap_columns", {}),
-                            remove_pkey=False,
-                            indent=4,
-                        ),
-                    )
-                    for alias, table_def in sorted_joins
-                ]
-            ),
-            raise_notice=(
-                "NULL;"
-                if self.allow_parent_only
-                else "RAISE NOTICE '{vn} type not known (%)', NEW.{type_name}; -- ERROR".format(
-                    vn=self.view_name,
-                    type_name=self.type_name,
+            )
+        )
+        sql.write("\n\n  CASE\n    ")
+        sql.join(
+            "\n    ",
+            (
+                f"WHEN NEW.{tn} = '{alias}'::{vs}.{tn} THEN\n      "
+                + insert_command(
+                    catalog=self.catalog,
+                    table_schema=table_def["table_schema"],
+                    table_name=table_def["table_name"],
+                    table_alias=table_def["short_alias"],
+                    skip_columns=table_def.get("skip_columns", []),
+                    prefix=table_def.get("prefix", None),
+                    insert_values={
+                        **{table_def["ref_master_key"]: f"NEW.{self.master_pkey}"},
+                        **table_def.get("insert_values", {}),
+                    },
+                    remap_columns=table_def.get("remap_columns", {}),
+                    remove_pkey=False,
+                    indent=4,
                 )
+                for alias, table_def in sorted_joins
             ),
-            insert_trigger_post=self.insert_trigger.get("post", ""),
         )
-        return sql
+        sql.write("\n  ELSE\n    ", self.__raise_notice(), "\n  END CASE;\n\n  ")
+        sql.write(
+            self.insert_trigger.get("post", ""),
+            f"\nRETURN NEW;\n"
+            f"END;\n"
+            f"$BODY$\n"
+            f"LANGUAGE plpgsql;\n"
+            f"\n"
+            f"DROP TRIGGER IF EXISTS tr_{vn}_on_insert ON {vs}.{vn};\n"
+            f"\n"
+            f"CREATE TRIGGER tr_{vn}_on_insert\n"
+            f"    INSTEAD OF INSERT ON {vs}.{vn}\n"
+            f"    FOR EACH ROW EXECUTE PROCEDURE {vs}.ft_{vn}_insert();\n",
+        )
+        return sql.getvalue()
 
     def __update_trigger(self):
+        """
+        Writes the function and trigger to update through the view
+        """
         sorted_joins = sorted(self.joins.items())
-        sql = """-- UPDATE TRIGGER
-CREATE OR REPLACE FUNCTION {vs}.ft_{vn}_update() RETURNS trigger AS
-$BODY$
-DECLARE
-  {declare}
-BEGIN
-  {update_trigger_pre}
-  {update_master}
-
-  IF OLD.{type_name} <> NEW.{type_name} THEN
-    {type_change}
-  END IF;
-
-  CASE {update_joins}
-  ELSE
-     {raise_notice}
-  END CASE;
-  {update_trigger_post}
-RETURN NEW;
-END;
-$BODY$
-LANGUAGE plpgsql;
-
-DROP TRIGGER IF EXISTS tr_{vn}_on_update ON {vs}.{vn};
-
-CREATE TRIGGER tr_{vn}_on_update
-    INSTEAD OF update ON {vs}.{vn}
-    FOR EACH ROW EXECUTE PROCEDURE {vs}.ft_{vn}_update();
-        """.format(
-            vs=self.view_schema,
-            vn=self.view_name,
-            declare="\n  ".join(
-                [f"{declare};" for declare in self.update_trigger.get("declare", [])]
-            ),
-            update_trigger_pre=self.update_trigger.get("pre", ""),
-            update_master=update_command(
-                connection=self.conn,
+        vs, vn, tn = self.view_schema, self.view_name, self.type_name
+        sql = SqlWriter()
+        sql.write(
+            f"-- UPDATE TRIGGER\n"
+            f"CREATE OR REPLACE FUNCTION {vs}.ft_{vn}_update() RETURNS trigger AS\n"
+            f"$BODY$\n"
+            f"DECLARE\n  "
+        )
+        sql.join("\n  ", (f"{declare};" for declare in self.update_trigger.get("declare", [])))
+        sql.write("\nBEGIN\n  ", self.update_trigger.get("pre", ""), "\n  ")
+        sql.write(
+            update_command(
+                catalog=self.catalog,
                 table_schema=self.master_schema,
                 table_name=self.master_table,
                 skip_columns=self.master_skip_colums,
                 prefix=self.master_prefix,
                 remap_columns=self.master_remap_columns,
                 indent=8,
-            ),
-            type_name=self.type_name,
-            type_change=(
-                "RAISE EXCEPTION 'Type change not allowed for {alias}'"
-                "\n      USING HINT = 'You cannot switch from ' "
-                "|| OLD.{type_name} || ' to ' || NEW.{type_name};".format(
-                    alias=self.view_alias, type_name=self.type_name
+                changed_only=self.skip_unchanged_updates,
+            )
+        )
+        sql.write(f"\n\n  IF OLD.{tn} <> NEW.{tn} THEN\n    ")
+        if not self.allow_type_change:
+            sql.write(
+                f"RAISE EXCEPTION 'Type change not allowed for {self.view_alias}'"
+                f"\n      USING HINT = 'You cannot switch from ' "
+                f"|| OLD.{tn} || ' to ' || NEW.{tn};"
+            )
+        else:
+            sql.write("CASE\n      ")
+            self.__write_subtype_deletes(sql, sorted_joins)
+            sql.write("\n    ELSE NULL; --do nothing\n    END CASE;\n    CASE\n      ")
+            sql.join(
+                "\n      ",
+                (
+                    f"WHEN NEW.{tn} = '{alias}'::{vs}.{tn} "
+                    f"THEN INSERT INTO {table_def['table_schema']}.{table_def['table_name']} "
+                    f"({table_def['ref_master_key']}) VALUES (OLD.{self.master_pkey});"
+                    for alias, table_def in sorted_joins
+                ),
+            )
+            sql.write("\n    ELSE NULL; --do nothing\n    END CASE;")
+        sql.write("\n  END IF;\n\n  CASE ")
+        sql.join(
+            "\n    ",
+            (
+                f"WHEN NEW.{tn} = '{alias}'::{vs}.{tn} THEN\n      "
+                + update_command(
+                    catalog=self.catalog,
+                    table_schema=table_def["table_schema"],
+                    table_name=table_def["table_name"],
+                    table_alias=table_def["short_alias"],
+                    pkey=table_def["pkey"],
+                    skip_columns=table_def.get("skip_columns", []),
+                    prefix=table_def.get("prefix", None),
+                    remap_columns=table_def.get("remap_columns", {}),
+                    update_values={
+                        **{table_def["pkey"]: f"OLD.{self.master_pkey}"},
+                        **table_def.get("update_values", {}),
+                    },
+                    indent=4,
+                    changed_only=self.skip_unchanged_updates,
                 )
-                if not self.allow_type_change
-                else "CASE"
-                "\n      {deletes}"
-                "\n    ELSE NULL; --do nothing"
-                "\n    END CASE;"
-                "\n    CASE"
-                "\n      {inserts}"
-                "\n    ELSE NULL; --do nothing"
-                "\n    END CASE;".format(
-                    deletes="\n      ".join(
-                        [
-                            "WHEN OLD.{type_name} = '{alias}'::{vs}.{type_name} "
-                            "THEN DELETE FROM {ts}.{tn} "
-                            "WHERE {rmk} = OLD.{mpk};".format(
-                                type_name=self.type_name,
-                                alias=alias,
-                                vs=self.view_schema,
-                                ts=table_def["table_schema"],
-                                tn=table_def["table_name"],
-                                rmk=table_def["ref_master_key"],
-                                mpk=self.master_pkey,
-                            )
-                            for alias, table_def in sorted_joins
-                        ]
+                for alias, table_def in sorted_joins
+            ),
+        )
+        sql.write("\n  ELSE\n     ", self.__raise_notice(), "\n  END CASE;\n  ")
+        sql.write(
+            self.update_trigger.get("post", ""),
+            f"\nRETURN NEW;\n"
+            f"END;\n"
+            f"$BODY$\n"
+            f"LANGUAGE plpgsql;\n"
+            f"\n"
+            f"DROP TRIGGER IF EXISTS tr_{vn}_on_update ON {vs}.{vn};\n"
+            f"\n"
+            f"CREATE TRIGGER tr_{vn}_on_update\n"
+            f"    INSTEAD OF update ON {vs}.{vn}\n"
+            f"    FOR EACH ROW EXECUTE PROCEDURE {vs}.ft_{vn}_update();\n"
+            f"        ",
+        )
+        return sql.getvalue()
+
+    def __delete_trigger(self):
+        """
+        Writes the function and trigger to delete through the view
+        """
+        sorted_joins = sorted(self.joins.items())
+        # the rows of the subtypes whose reference cascades are deleted with the master row
+        explicit_joins = [
+            (alias, table_def)
+            for alias, table_def in sorted_joins
+            if not table_def["delete_cascade"]
+        ]
+        vs, vn = self.view_schema, self.view_name
+        sql = SqlWriter()
+        sql.write(
+            f"\nCREATE OR REPLACE FUNCTION {vs}.ft_{vn}_delete() RETURNS trigger AS\n"
+            f"    $BODY$\n"
+            f"    BEGIN\n"
+        )
+        if explicit_joins:
+            sql.write("    CASE\n        ")
+            self.__write_subtype_deletes(sql, explicit_joins)
+            if len(explicit_joins) < len(sorted_joins):
+                sql.write("\n      ELSE NULL;")
+            sql.write("\n    END CASE;\n")
+        sql.write(
+            f"    DELETE FROM {self.master_schema}.{self.master_table} "
+            f"WHERE {self.master_pkey} = OLD.{self.master_pkey};\n"
+            f"    RETURN NULL;\n"
+            f"    END;\n"
+            f"    $BODY$\n"
+            f"    LANGUAGE 'plpgsql';\n"
+            f"\n"
+            f"DROP TRIGGER IF EXISTS tr_{vn}_on_delete ON {vs}.{vn};\n"
+            f"\n"
+            f"CREATE TRIGGER tr_{vn}_on_delete\n"
+            f"    INSTEAD OF DELETE ON {vs}.{vn}\n"
+            f"    FOR EACH ROW EXECUTE PROCEDURE {vs}.ft_{vn}_delete();\n"
+        )
+        return sql.getvalue()
+
+    def __write_subtype_deletes(self, sql: SqlWriter, sorted_joins: list):
+        """
+        Writes the CASE branches deleting the subtype row of the OLD type
+        """
+        vs, tn = self.view_schema, self.type_name
+        sql.join(
+            "\n      ",
+            (
+                f"WHEN OLD.{tn} = '{alias}'::{vs}.{tn} "
+                f"THEN DELETE FROM {table_def['table_schema']}.{table_def['table_name']} "
+                f"WHERE {table_def['ref_master_key']} = OLD.{self.master_pkey};"
+                for alias, table_def in sorted_joins
+            ),
+        )
+
+    def __bulk_insert(self) -> str:
+        """
+        Writes the function inserting an array of rows of the view with set-based inserts,
+        see `__bulk_insert_query`. Returns the rows with their primary key.
+        """
+        if not self.bulk_insert:
+            return ""
+        vs, vn = self.view_schema, self.view_name
+        return (
+            f"-- BULK INSERT FUNCTION\n"
+            f"CREATE OR REPLACE FUNCTION {vs}.fn_{vn}_bulk_insert(rows {vs}.{vn}[])"
+            f" RETURNS SETOF {vs}.{vn} AS\n"
+            f"$BODY$\n"
+            f"BEGIN\n"
+            f"  RETURN QUERY\n"
+            f"  {self.__bulk_insert_query('unnest(rows) AS r')};\n"
+            f"END;\n"
+            f"$BODY$\n"
+            f"LANGUAGE plpgsql;\n"
+        )
+
+    def __bulk_insert_query(self, source: str, count: bool = False) -> str:
+        """
+        Writes the query inserting the master rows in one statement, then the rows of each
+        subtype in one statement. The values are written as in the insert trigger,
+        the rows being aliased NEW. Returns the rows with their primary key, in their order.
+
+        Parameters
+        ----------
+        source
+            the FROM clause of the rows to insert, aliased r
+        count
+            if True, the query returns the number of inserted rows instead of the rows
+        """
+        sorted_joins = sorted(self.joins.items())
+        vs, tn, mpk = self.view_schema, self.type_name, self.master_pkey
+        pkey_default = self.catalog.default_value(self.master_schema, self.master_table, mpk)
+        rows = "(SELECT (new_row).* FROM new_rows) NEW"
+        inserts = [
+            (
+                "insert_master",
+                insert_command(
+                    catalog=self.catalog,
+                    table_schema=self.master_schema,
+                    table_name=self.master_table,
+                    skip_columns=self.master_skip_colums,
+                    prefix=self.master_prefix,
+                    remap_columns=self.master_remap_columns,
+                    remove_pkey=False,
+                    indent=4,
+                    select_from=rows,
+                ),
+            )
+        ]
+        for alias, table_def in sorted_joins:
+            inserts.append(
+                (
+                    f"insert_{alias}",
+                    insert_command(
+                        catalog=self.catalog,
+                        table_schema=table_def["table_schema"],
+                        table_name=table_def["table_name"],
+                        table_alias=table_def["short_alias"],
+                        skip_columns=table_def.get("skip_columns", []),
+                        prefix=table_def.get("prefix", None),
+                        insert_values={
+                            **{table_def["ref_master_key"]: f"NEW.{mpk}"},
+                            **table_def.get("insert_values", {}),
+                        },
+                        remap_columns=table_def.get("remap_columns", {}),
+                        remove_pkey=False,
+                        indent=4,
+                        select_from=f"{rows}\n      WHERE NEW.{tn} = '{alias}'::{vs}.{tn}",
                     ),
-                    inserts="\n      ".join(
-                        [
-                            "WHEN NEW.{type_name} = '{alias}'::{vs}.{type_name} "
-                            "THEN INSERT INTO {ts}.{tn} "
-                            "({rmk}) VALUES (OLD.{mpk});".format(
-                                type_name=self.type_name,
-                                alias=alias,
-                                vs=self.view_schema,
-                                ts=table_def["table_schema"],
-                                tn=table_def["table_name"],
-                                rmk=table_def["ref_master_key"],
-                                mpk=self.master_pkey,
-                            )
-                            for alias, table_def in sorted_joins
-                        ]
+                )
+            )
+        sql = SqlWriter()
+        sql.write(
+            f"WITH new_rows AS MATERIALIZED (\n"
+            f"    SELECT row_number() OVER () AS i, jsonb_populate_record(\n"
+            f"        r, jsonb_build_object('{mpk}', COALESCE(r.{mpk}, {pkey_default}))\n"
+            f"      ) AS new_row\n"
+            f"    FROM {source}\n"
+            f"  )"
+        )
+        self.__write_ctes(sql, inserts)
+        if count:
+            sql.write("\n  SELECT count(*) FROM new_rows")
+        else:
+            sql.write("\n  SELECT (new_row).* FROM new_rows ORDER BY i")
+        return sql.getvalue()
+
+    def __bulk_update(self) -> str:
+        """
+        Writes the function updating an array of rows of the view with set-based statements,
+        as the update trigger does for each row: the subtype rows of the rows changing type
+        are deleted and inserted in one statement, then the master rows and the rows of each
+        subtype are updated in one statement, the new and old rows being aliased NEW and OLD.
+        If upsert is true, the rows which do not exist are inserted, see `__bulk_insert_query`.
+        Returns the updated rows, followed by the inserted ones.
+        """
+        if not self.bulk_update:
+            return ""
+        sorted_joins = sorted(self.joins.items())
+        vs, vn, tn, mpk = self.view_schema, self.view_name, self.type_name, self.master_pkey
+
+        def rows(condition: str = None) -> str:
+            where = f" WHERE {condition}" if condition else ""
+            return (
+                f"(SELECT * FROM new_rows{where}) AS u,\n"
+                f"      LATERAL (SELECT (u.new_row).*) NEW,\n"
+                f"      LATERAL (SELECT (u.old_row).*) OLD"
+            )
+
+        updates = [
+            (
+                "update_master",
+                update_command(
+                    catalog=self.catalog,
+                    table_schema=self.master_schema,
+                    table_name=self.master_table,
+                    skip_columns=self.master_skip_colums,
+                    prefix=self.master_prefix,
+                    remap_columns=self.master_remap_columns,
+                    indent=4,
+                    changed_only=self.skip_unchanged_updates,
+                    select_from=rows(),
+                ),
+            )
+        ]
+        for alias, table_def in sorted_joins:
+            updates.append(
+                (
+                    f"update_{alias}",
+                    update_command(
+                        catalog=self.catalog,
+                        table_schema=table_def["table_schema"],
+                        table_name=table_def["table_name"],
+                        table_alias=table_def["short_alias"],
+                        # the rows are matched on the reference to the master table,
+                        # which is not in the view if it is not the primary key
+                        pkey=table_def["ref_master_key"],
+                        skip_columns=table_def.get("skip_columns", []),
+                        prefix=table_def.get("prefix", None),
+                        remap_columns=table_def.get("remap_columns", {}),
+                        update_values={
+                            **{table_def["ref_master_key"]: f"OLD.{mpk}"},
+                            **table_def.get("update_values", {}),
+                        },
+                        indent=4,
+                        changed_only=self.skip_unchanged_updates,
+                        select_from=rows(f"(new_row).{tn} = '{alias}'::{vs}.{tn}"),
                     ),
                 )
-            ),
-            update_joins="\n    ".join(
-                [
-                    "WHEN NEW.{type_name} = '{alias}'::{vs}.{type_name} THEN"
-                    "\n      {update_join}".format(
-                        type_name=self.type_name,
-                        alias=alias,
-                        vs=self.view_schema,
-                        update_join=update_command(
-                            connection=self.conn,
-                            table_schema=table_def["table_schema"],
-                            table_name=table_def["table_name"],
-                            table_alias=table_def["short_alias"],
-                            pkey=table_def["pkey"],
-                            skip_columns=table_def.get("skip_columns", []),
-                            prefix=table_def.get("prefix", None),
-                            remap_columns=table_def.get("remap_columns", {}),
-                            update_values={
-                                **{table_def["pkey"]: f"OLD.{self.master_pkey}"},
-                                **table_def.get("update_values", {}),
-                            },
-                            indent=4,
-                        ),
+            )
+
+        sql = SqlWriter()
+        sql.write(
+            f"-- BULK UPDATE FUNCTION\n"
+            f"CREATE OR REPLACE FUNCTION {vs}.fn_{vn}_bulk_update("
+            f"rows {vs}.{vn}[], upsert boolean DEFAULT false)"
+            f" RETURNS SETOF {vs}.{vn} AS\n"
+            f"$BODY$\n"
+            f"DECLARE\n"
+            f"  changed bigint;\n"
+            f"BEGIN\n  "
+        )
+        changed_types = (
+            f"SELECT v.{mpk}, v.{tn} AS old_type, r.{tn} AS new_type\n"
+            f"    FROM unnest(rows) AS r JOIN {vs}.{vn} AS v ON v.{mpk} = r.{mpk}\n"
+            f"    WHERE v.{tn} <> r.{tn}"
+        )
+        if not self.allow_type_change:
+            sql.write(
+                f"IF EXISTS (\n    {changed_types}\n  ) THEN\n"
+                f"    RAISE EXCEPTION 'Type change not allowed for {self.view_alias}';\n"
+                f"  END IF;\n\n  "
+            )
+        else:
+            type_changes = []
+            for alias, table_def in sorted_joins:
+                table = f"{table_def['table_schema']}.{table_def['table_name']}"
+                type_changes.append(
+                    (
+                        f"delete_{alias}",
+                        f"DELETE FROM {table} USING changed_types c\n"
+                        f"      WHERE {table}.{table_def['ref_master_key']} = c.{mpk}"
+                        f" AND c.old_type = '{alias}'::{vs}.{tn}",
                     )
-                    for alias, table_def in sorted_joins
-                ]
-            ),
-            raise_notice=(
-                "NULL;"
-                if self.allow_parent_only
-                else "RAISE NOTICE '{vn} type not known (%)', NEW.{type_name}; -- ERROR".format(
-                    vn=self.view_name,
-                    type_name=self.type_name,
                 )
-            ),
-            update_trigger_post=self.update_trigger.get("post", ""),
+            for alias, table_def in sorted_joins:
+                table = f"{table_def['table_schema']}.{table_def['table_name']}"
+                type_changes.append(
+                    (
+                        f"insert_{alias}",
+                        f"INSERT INTO {table} ({table_def['ref_master_key']})\n"
+                        f"      SELECT c.{mpk} FROM changed_types c"
+                        f" WHERE c.new_type = '{alias}'::{vs}.{tn}",
+                    )
+                )
+            sql.write(f"WITH changed_types AS MATERIALIZED (\n    {changed_types}\n  )")
+            self.__write_ctes(sql, type_changes)
+            # the subtype rows are written before the next statement updates them
+            sql.write("\n  SELECT count(*) INTO changed FROM changed_types;\n\n  ")
+        sql.write(
+            f"RETURN QUERY\n"
+            f"  WITH new_rows AS MATERIALIZED (\n"
+            f"    SELECT r AS new_row, v AS old_row\n"
+            f"    FROM unnest(rows) AS r JOIN {vs}.{vn} AS v ON v.{mpk} = r.{mpk}\n"
+            f"  )"
         )
-        return sql
+        self.__write_ctes(sql, updates)
+        master = f"{self.master_schema}.{self.master_table}"
+        insert_query = self.__bulk_insert_query(
+            f"unnest(rows) AS r\n"
+            f"    WHERE NOT EXISTS (SELECT 1 FROM {master} m WHERE m.{mpk} = r.{mpk})"
+        )
+        sql.write(
+            f"\n  SELECT (new_row).* FROM new_rows;\n\n"
+            f"  IF upsert THEN\n"
+            f"    RETURN QUERY\n"
+            f"    {insert_query};\n"
+            f"  END IF;\n"
+            f"END;\n"
+            f"$BODY$\n"
+            f"LANGUAGE plpgsql;\n"
+        )
+        return sql.getvalue()
 
-    def __delete_trigger(self):
+    def __bulk_delete(self) -> str:
+        """
+        Writes the function deleting an array of keys, with one set-based statement
+        per subtype table and one for the master table, and the function purging
+        a subtype or the whole hierarchy, without firing the triggers of the view.
+        """
+        if not self.bulk_delete:
+            return ""
         sorted_joins = sorted(self.joins.items())
-        sql = """
-CREATE OR REPLACE FUNCTION {vs}.ft_{vn}_delete() RETURNS trigger AS
-    $BODY$
-    BEGIN
-    CASE
-        {deletes}
-    END CASE;
-    DELETE FROM {ts}.{tn} WHERE {mpk} = OLD.{mpk};
-    RETURN NULL;
-    END;
-    $BODY$
-    LANGUAGE 'plpgsql';
-
-DROP TRIGGER IF EXISTS tr_{vn}_on_delete ON {vs}.{vn};
-
-CREATE TRIGGER tr_{vn}_on_delete
-    INSTEAD OF DELETE ON {vs}.{vn}
-    FOR EACH ROW EXECUTE PROCEDURE {vs}.ft_{vn}_delete();
-""".format(
-            vn=self.view_name,
-            deletes="\n      ".join(
-                [
-                    "WHEN OLD.{type_name} = '{alias}'::{vs}.{type_name} "
-                    "THEN DELETE FROM {ts}.{tn} "
-                    "WHERE {rmk} = OLD.{mpk};".format(
-                        type_name=self.type_name,
-                        alias=alias,
-                        vs=self.view_schema,
-                        ts=table_def["table_schema"],
-                        tn=table_def["table_name"],
-                        rmk=table_def["ref_master_key"],
-                        mpk=self.master_pkey,
-                    )
-                    for alias, table_def in sorted_joins
-                ]
+        vs, vn, tn, mpk = self.view_schema, self.view_name, self.type_name, self.master_pkey
+        master = f"{self.master_schema}.{self.master_table}"
+        pkey_type = self.catalog.table(self.master_schema, self.master_table).column_types[mpk]
+        tables = {
+            alias: (f"{table_def['table_schema']}.{table_def['table_name']}", table_def)
+            for alias, table_def in sorted_joins
+        }
+        sql = SqlWriter()
+        sql.write(
+            f"-- BULK DELETE FUNCTIONS\n"
+            f"CREATE OR REPLACE FUNCTION {vs}.fn_{vn}_delete_many(ids {pkey_type}[])"
+            f" RETURNS bigint AS\n"
+            f"$BODY$\n"
+            f"DECLARE\n"
+            f"  deleted bigint;\n"
+            f"BEGIN\n"
+        )
+        for table, table_def in tables.values():
+            # the rows of the subtypes whose reference cascades are deleted with the master rows
+            if not table_def["delete_cascade"]:
+                sql.write(
+                    f"  DELETE FROM {table} WHERE {table_def['ref_master_key']} = ANY(ids);\n"
+                )
+        sql.write(
+            f"  DELETE FROM {master} WHERE {mpk} = ANY(ids);\n"
+            f"  GET DIAGNOSTICS deleted = ROW_COUNT;\n"
+            f"  RETURN deleted;\n"
+            f"END;\n"
+            f"$BODY$\n"
+            f"LANGUAGE plpgsql;\n"
+            f"\n"
+            f"CREATE OR REPLACE FUNCTION {vs}.fn_{vn}_purge(subtype {vs}.{tn} DEFAULT NULL)"
+            f" RETURNS void AS\n"
+            f"$BODY$\n"
+            f"BEGIN\n"
+            f"  IF subtype IS NULL THEN\n"
+            f"    TRUNCATE {', '.join(table for table, _ in tables.values())}, {master};\n"
+            f"    RETURN;\n"
+            f"  END IF;\n"
+            f"  CASE subtype\n    "
+        )
+        sql.join(
+            "\n    ",
+            (
+                f"WHEN '{alias}'::{vs}.{tn} THEN\n"
+                f"      WITH deleted AS (\n"
+                f"        DELETE FROM {table} RETURNING {table_def['ref_master_key']} AS {mpk}\n"
+                f"      )\n"
+                f"      DELETE FROM {master} WHERE {mpk} IN (SELECT {mpk} FROM deleted);"
+                for alias, (table, table_def) in tables.items()
             ),
-            ts=self.master_schema,
-            tn=self.master_table,
-            mpk=self.master_pkey,
-            vs=self.view_schema,
         )
-        return sql
+        if self.allow_parent_only:
+            # the rows of the parent only are not referenced by any subtype table
+            sql.write(
+                f"\n    WHEN '{self.view_alias}'::{vs}.{tn} THEN\n"
+                f"      DELETE FROM {master} m WHERE ",
+            )
+            sql.join(
+                "\n        AND ",
+                (
+                    f"NOT EXISTS (SELECT 1 FROM {table} s"
+                    f" WHERE s.{table_def['ref_master_key']} = m.{mpk})"
+                    for table, table_def in tables.values()
+                ),
+            )
+            sql.write(";")
+        sql.write("\n    ELSE NULL;\n" "  END CASE;\n" "END;\n" "$BODY$\n" "LANGUAGE plpgsql;\n")
+        return sql.getvalue()
+
+    @staticmethod
+    def __write_ctes(sql: SqlWriter, ctes: list[tuple[str, str]]):
+        """
+        Writes the data-modifying CTEs following the first one of a query
+        """
+        for name, command in ctes:
+            # the tables whose columns are all skipped are not written
+            if not command.startswith("--"):
+                sql.write(f", {name} AS (\n    ", command, "\n  )")
+
+    def __raise_notice(self) -> str:
+        if self.allow_parent_only:
+            return "NULL;"
+        return (
+            f"RAISE NOTICE '{self.view_name} type not known (%)', NEW.{self.type_name}; -- ERROR"
+        )
 
     def __extras(self):
         sql = ""
@@ -643,8 +1616,8 @@ CREATE TRIGGER tr_{vn}_on_delete
                 vs=self.view_schema,
                 vn=self.view_name,
                 master_pkey=self.master_pkey,
-                dv=default_value(
-                    self.conn, self.master_schema, self.master_table, self.master_pkey
+                dv=self.catalog.default_value(
+                    self.master_schema, self.master_table, self.master_pkey
                 ),
             )
         return sql
@@ -0,0 +1,82 @@
+import hashlib
+from typing import Iterable, Iterator
+
+# the hashes of the deployed parts are stored in the comment of the view
+COMMENT_PREFIX = "pirogue:"
+
+
+def part_hash(sql: str) -> str:
+    """
+    Returns the hash of the SQL code of a part, as stored in the comment of the view
+    """
+    return hashlib.sha256(sql.encode()).hexdigest()[:16]
+
+
+def parse_comment(comment: str) -> dict:
+    """
+    Returns the hashes of the parts stored in the comment of a view,
+    or an empty dictionary if the view was not deployed by pirogue
+    """
+    if not comment or not comment.startswith(COMMENT_PREFIX):
+        return {}
+    return dict(item.split("=", 1) for item in comment[len(COMMENT_PREFIX) :].split(";") if item)
+
+
+def hashes_comment(view_schema: str, view_name: str, hashes: dict) -> str:
+    """
+    Returns the statement storing the hashes of the parts in the comment of the view
+
+    Parameters
+    ----------
+    view_schema
+        the schema of the view
+    view_name
+        the name of the view
+    hashes
+        the hashes by part
+    """
+    items = ";".join(f"{part}={sql_hash}" for part, sql_hash in hashes.items())
+    return f"COMMENT ON VIEW {view_schema}.{view_name} IS '{COMMENT_PREFIX}{items}';"
+
+
+def comment_statements(parts: Iterable[tuple[str, str, str, str]]) -> list[str]:
+    """
+    Returns the statements storing the hashes of the parts in the comments of their views,
+    so that `pirogue.deploy.plan` compares the generated parts with the created ones.
+    The drops are not hashed.
+
+    Parameters
+    ----------
+    parts
+        the view schema, view name, part and SQL statement of all the parts of the views,
+        see `MultipleInheritance.iter_parts`
+    """
+    views = {}
+    for view_schema, view_name, part, sql in parts:
+        if part != "drops":
+            views.setdefault((view_schema, view_name), {})[part] = part_hash(sql)
+    return [
+        hashes_comment(view_schema, view_name, hashes)
+        for (view_schema, view_name), hashes in views.items()
+    ]
+
+
+def script_statements(parts: Iterable[tuple[str, str, str, str]]) -> Iterator[str]:
+    """
+    Yields the SQL statements of the parts as they come, followed by the statements
+    storing their hashes in the comments of their views (see `comment_statements`),
+    so that a script deployed with psql is planned as the views created by pirogue.
+
+    Parameters
+    ----------
+    parts
+        the view schema, view name, part and SQL statement of all the parts of the views,
+        see `MultipleInheritance.iter_parts`
+    """
+    views = {}
+    for view_schema, view_name, part, sql in parts:
+        yield sql
+        if part != "drops":
+            views.setdefault((view_schema, view_name), {})[part] = part_hash(sql)
+    for (view_schema, view_name), hashes in views.items():
+        yield hashes_comment(view_schema, view_name, hashes)
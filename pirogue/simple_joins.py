@@ -1,8 +1,14 @@
+from typing import Iterable, Iterator
+
 import psycopg
 
+from pirogue.batch import LockRetry, aexecute_batch, execute_batch
+from pirogue.catalog import SchemaCatalog
 from pirogue.exceptions import InvalidDefinition, NoReferenceFound, TableHasNoPrimaryKey
-from pirogue.information_schema import primary_key, reference_columns
-from pirogue.utils import select_columns, table_parts
+from pirogue.instrumentation import PHASE, STATEMENT, timed
+from pirogue.part_hashes import hashes_comment, part_hash
+from pirogue.sql_writer import SqlWriter
+from pirogue.utils import definition_tables, select_columns, table_parts
 
 
 class SimpleJoins:
@@ -10,7 +16,14 @@ class SimpleJoins:
     Creates a view made of simple joins, without any edit triggers.
     """
 
-    def __init__(self, definition: dict, connection: psycopg.Connection):
+    PARTS = ("view",)
+
+    def __init__(
+        self,
+        definition: dict,
+        connection: psycopg.Connection | psycopg.AsyncConnection = None,
+        catalog: SchemaCatalog = None,
+    ):
         """
         Produces the SQL code of the join table and triggers
 
@@ -19,7 +32,10 @@ class SimpleJoins:
         definition
             the YAML definition of the multiple inheritance
         connection
-            a psycopg.Connection instance
+            a psycopg.Connection instance, can be omitted if a complete catalog is given.
+            A psycopg.AsyncConnection can be given as well, the view is then created with `acreate`
+        catalog
+            the catalog to read the tables metadata from, if not given it is loaded from the connection
         """
 
         # check definition validity
@@ -40,13 +56,161 @@ class SimpleJoins:
                     raise InvalidDefinition(f'in join {alias} key "{key}" is not valid')
 
         self.conn = connection
+        self.catalog = catalog or SchemaCatalog(connection)
 
         (self.parent_schema, self.parent_table) = table_parts(definition["table"])
         self.view_schema = definition.get("view_schema", self.parent_schema)
         self.view_name = definition.get("view_name", f"vw_{self.parent_table}")
 
+        self.__definition = definition
+        self.__resolved = False
+        # with an asynchronous connection, the metadata is loaded in acreate
+        if not isinstance(connection, psycopg.AsyncConnection):
+            # load the metadata of all involved tables at once
+            self.catalog.load(definition_tables(definition))
+            self.__resolve()
+
+    @staticmethod
+    def definition_views(definition: dict) -> list[tuple[str, str]]:
+        """
+        Returns the view (as schema and view names tuple) created for a definition,
+        without reading any metadata
+
+        Parameters
+        ----------
+        definition
+            the YAML definition
+        """
+        (parent_schema, parent_table) = table_parts(definition["table"])
+        return [
+            (
+                definition.get("view_schema", parent_schema),
+                definition.get("view_name", f"vw_{parent_table}"),
+            )
+        ]
+
+    def create(self, commit: bool = True, lock_retry: LockRetry = None) -> bool:
+        """
+        Creates the merge view on the specified service
+        Returns True in case of success
+
+        Parameters
+        ----------
+        commit : bool
+            If True, commits the transaction after executing the SQL.
+        lock_retry : LockRetry
+            If given, the view is created again when it times out waiting for a lock.
+        """
+        with timed(PHASE, "SimpleJoins.view"):
+            sql = self.__view()
+        comment = hashes_comment(self.view_schema, self.view_name, {"view": part_hash(sql)})
+        if lock_retry is not None:
+            execute_batch(
+                self.conn, [sql, comment], f"{self.view_schema}.{self.view_name}.view", lock_retry
+            )
+            if commit:
+                self.conn.commit()
+            return True
+        success = True
+        try:
+            cursor = self.conn.cursor()
+            with timed(STATEMENT, f"{self.view_schema}.{self.view_name}.view"):
+                cursor.execute(sql)
+            cursor.execute(comment)
+        except psycopg.Error as e:
+            success = False
+            print(f"*** Failing:\n{sql}\n***")
+            raise e
+        if commit:
+            self.conn.commit()
+        return success
+
+    async def acreate(self, commit: bool = True, lock_retry: LockRetry = None) -> bool:
+        """
+        Creates the merge view using the psycopg.AsyncConnection given at construction.
+        Returns True in case of success
+
+        Parameters
+        ----------
+        commit : bool
+            If True, commits the transaction after executing the SQL.
+        lock_retry : LockRetry
+            If given, the view is created again when it times out waiting for a lock.
+        """
+        await self.catalog.aload(definition_tables(self.__definition))
+        self.__resolve()
+        with timed(PHASE, "SimpleJoins.view"):
+            sql = self.__view()
+        comment = hashes_comment(self.view_schema, self.view_name, {"view": part_hash(sql)})
+        if lock_retry is not None:
+            await aexecute_batch(
+                self.conn, [sql, comment], f"{self.view_schema}.{self.view_name}.view", lock_retry
+            )
+            if commit:
+                await self.conn.commit()
+            return True
+        success = True
+        try:
+            async with self.conn.cursor() as cursor:
+                with timed(STATEMENT, f"{self.view_schema}.{self.view_name}.view"):
+                    await cursor.execute(sql)
+                await cursor.execute(comment)
+        except psycopg.Error as e:
+            success = False
+            print(f"*** Failing:\n{sql}\n***")
+            raise e
+        if commit:
+            await self.conn.commit()
+        return success
+
+    def sql(self) -> str:
+        """
+        Returns the SQL code which is run by `create`, without executing it.
+        A connection is not required if the catalog holds all tables.
+        """
+        return "\n".join(self.iter_statements())
+
+    def iter_statements(self, parts: Iterable[str] = None) -> Iterator[str]:
+        """
+        Yields the SQL statements of the given parts, see `MultipleInheritance.iter_statements`
+
+        Parameters
+        ----------
+        parts
+            the parts to generate among PARTS, defaults to all of them
+        """
+        for *_, sql in self.iter_parts(parts):
+            yield sql
+
+    def iter_parts(self, parts: Iterable[str] = None) -> Iterator[tuple[str, str, str, str]]:
+        """
+        Yields the view schema, view name, part and SQL statement of the given parts,
+        see `iter_statements`
+
+        Parameters
+        ----------
+        parts
+            the parts to generate among PARTS, defaults to all of them
+        """
+        for part in parts if parts is not None else self.PARTS:
+            if part not in self.PARTS:
+                raise ValueError(f'Invalid part "{part}", valid parts are {self.PARTS}')
+        if parts is None or "view" in parts:
+            self.__resolve()
+            with timed(PHASE, "SimpleJoins.view"):
+                sql = self.__view()
+            yield self.view_schema, self.view_name, "view", sql
+
+    def __resolve(self):
+        """
+        Reads the keys and references of the tables from the catalog
+        """
+        if self.__resolved:
+            return
+        definition = self.__definition
+
         try:
-            self.parent_pkey = primary_key(self.conn, self.parent_schema, self.parent_table)
+            self.parent_pkey = self.catalog.primary_key(self.parent_schema, self.parent_table)
         except TableHasNoPrimaryKey:
             self.parent_pkey = definition["pkey"]
 
@@ -65,14 +229,15 @@ class SimpleJoins:
         for alias, table_def in definition["joins"].items():
             child = Table()
             (child.schema_name, child.table_name) = table_parts(table_def["table"])
-            child.pkey = primary_key(self.conn, child.schema_name, child.table_name)
+            child.pkey = self.catalog.primary_key(child.schema_name, child.table_name)
             try:
-                (child.parent_referenced_key, child.ref_parent_key) = reference_columns(
-                    self.conn,
-                    self.parent_schema,
-                    self.parent_table,
-                    foreign_table_schema=child.schema_name,
-                    foreign_table_name=child.table_name,
+                (child.parent_referenced_key, child.ref_parent_key) = (
+                    self.catalog.reference_columns(
+                        self.parent_schema,
+                        self.parent_table,
+                        foreign_table_schema=child.schema_name,
+                        foreign_table_name=child.table_name,
+                    )
                 )
                 assert child.pkey == child.ref_parent_key
             except NoReferenceFound:
@@ -82,80 +247,48 @@ class SimpleJoins:
             child.remap_columns = table_def.get("remap_columns", {})
             child.prefix = table_def.get("prefix", None)
             self.child_tables[alias] = child
-
-    def create(self, commit: bool = True) -> bool:
-        """
-        Creates the merge view on the specified service
-        Returns True in case of success
-
-        Parameters
-        ----------
-        commit : bool
-            If True, commits the transaction after executing the SQL.
-        """
-        sql = self.__view()
-        success = True
-        try:
-            cursor = self.conn.cursor()
-            cursor.execute(sql)
-        except psycopg.Error as e:
-            success = False
-            print(f"*** Failing:\n{sql}\n***")
-            raise e
-        if commit:
-            self.conn.commit()
-        return success
+        self.__resolved = True
 
     def __view(self) -> str:
         """
         Create the SQL code for the view
         :return: the SQL code
         """
-        sql = """
-CREATE OR REPLACE VIEW {vs}.{vn} AS SELECT
-  {parent_cols}
-  {child_cols}
-  FROM {ps}.{pt}
-  {joins};
-""".format(
-            vs=self.view_schema,
-            vn=self.view_name,
-            parent_cols=select_columns(
-                connection=self.conn,
+        sql = SqlWriter()
+        sql.write(f"\nCREATE OR REPLACE VIEW {self.view_schema}.{self.view_name} AS SELECT\n  ")
+        sql.write(
+            select_columns(
+                catalog=self.catalog,
                 table_schema=self.parent_schema,
                 table_name=self.parent_table,
                 table_alias=self.parent_table,
                 remove_pkey=False,
             ),
-            child_cols="\n  ".join(
-                [
-                    select_columns(
-                        connection=self.conn,
-                        table_schema=child_def.schema_name,
-                        table_name=child_def.table_name,
-                        table_alias=alias,
-                        remap_columns=child_def.remap_columns,
-                        prefix=child_def.prefix,
-                        separate_first=True,
-                    )
-                    for alias, child_def in self.child_tables.items()
-                ]
+            "\n  ",
+        )
+        sql.join(
+            "\n  ",
+            (
+                select_columns(
+                    catalog=self.catalog,
+                    table_schema=child_def.schema_name,
+                    table_name=child_def.table_name,
+                    table_alias=alias,
+                    remap_columns=child_def.remap_columns,
+                    prefix=child_def.prefix,
+                    separate_first=True,
+                )
+                for alias, child_def in self.child_tables.items()
             ),
-            ps=self.parent_schema,
-            pt=self.parent_table,
-            joins="\n  ".join(
-                [
-                    "LEFT JOIN {cs}.{ct} {alias} ON {alias}.{cpk} = {pt}.{rpk}".format(
-                        cs=child.schema_name,
-                        ct=child.table_name,
-                        alias=alias,
-                        cpk=child.pkey,
-                        pt=self.parent_table,
-                        rpk=child.parent_referenced_key,
-                    )
-                    for alias, child in self.child_tables.items()
-                ]
+        )
+        sql.write(f"\n  FROM {self.parent_schema}.{self.parent_table}\n  ")
+        sql.join(
+            "\n  ",
+            (
+                f"LEFT JOIN {child.schema_name}.{child.table_name} {alias} "
+                f"ON {alias}.{child.pkey} = {self.parent_table}.{child.parent_referenced_key}"
+                for alias, child in self.child_tables.items()
             ),
         )
-
-        return sql
+        sql.write(";\n")
+        return sql.getvalue()
@@ -1,7 +1,13 @@
+from typing import Iterable, Iterator
+
 import psycopg
 
+from pirogue.batch import LockRetry, aexecute_batch, execute_batch
+from pirogue.catalog import SchemaCatalog
 from pirogue.exceptions import TableHasNoPrimaryKey
-from pirogue.information_schema import default_value, primary_key, reference_columns
+from pirogue.instrumentation import PHASE, STATEMENT, timed
+from pirogue.part_hashes import comment_statements
+from pirogue.sql_writer import SqlWriter
 from pirogue.utils import insert_command, select_columns, table_parts, update_command
 
 
@@ -10,16 +16,20 @@ class SingleInheritance:
     Creates a join view with associated triggers to edit for a single inheritance.
     """
 
+    PARTS = ("view", "insert_trigger", "update_trigger", "delete_trigger", "extras")
+
     def __init__(
         self,
         *,
-        connection: psycopg.Connection,
+        connection: psycopg.Connection | psycopg.AsyncConnection = None,
         parent_table: str,
         child_table: str,
         view_schema: str = None,
         view_name: str = None,
         pkey_default_value: bool = False,
         inner_defaults: dict = {},
+        catalog: SchemaCatalog = None,
+        skip_unchanged_updates: bool = False,
     ):
         """
         Produces the SQL code of the join table and triggers
@@ -27,7 +37,8 @@ class SingleInheritance:
         Parameters
         ----------
         connection
-            a psycopg.Connection instance
+            a psycopg.Connection instance, can be omitted if a complete catalog is given.
+            A psycopg.AsyncConnection can be given as well, the view is then created with `acreate`
         parent_table
             the parent table, can be schema specified
         child_table
@@ -40,12 +51,19 @@ class SingleInheritance:
             the primary key column of the view will have a default value according to the child primary key table
         inner_defaults
             dictionary of other columns to default to in case the provided value is null or empty
+        catalog
+            the catalog to read the tables metadata from, if not given it is loaded from the connection
+        skip_unchanged_updates
+            if True, the update trigger only updates the parent or the child table
+            if one of its columns changed
         """
 
         self.conn = connection
+        self.catalog = catalog or SchemaCatalog(connection)
 
         self.pkey_default_value = pkey_default_value
         self.inner_defaults = inner_defaults
+        self.skip_unchanged_updates = skip_unchanged_updates
 
         (self.parent_schema, self.parent_table) = table_parts(parent_table)
         (self.child_schema, self.child_table) = table_parts(child_table)
@@ -64,22 +82,17 @@ class SingleInheritance:
             pt=self.parent_table, ct=self.child_table
         )
 
-        (self.ref_parent_key, parent_referenced_key) = reference_columns(
-            self.conn,
-            self.child_schema,
-            self.child_table,
-            foreign_table_schema=self.parent_schema,
-            foreign_table_name=self.parent_table,
-        )
-        try:
-            self.child_pkey = primary_key(self.conn, self.child_schema, self.child_table)
-        except TableHasNoPrimaryKey:
-            self.child_pkey = self.ref_parent_key
-        self.parent_pkey = primary_key(self.conn, self.parent_schema, self.parent_table)
-
-        assert self.parent_pkey == parent_referenced_key
+        self.__resolved = False
+        # with an asynchronous connection, the metadata is loaded in acreate
+        if not isinstance(connection, psycopg.AsyncConnection):
+            self.catalog.load(
+                [(self.parent_schema, self.parent_table), (self.child_schema, self.child_table)]
+            )
+            self.__resolve()
 
-    def create(self, commit: bool = True) -> bool:
+    def create(
+        self, commit: bool = True, batch: bool = True, lock_retry: LockRetry = None
+    ) -> bool:
         """
         Creates the merge view on the specified service
         Returns True in case of success
@@ -88,152 +101,299 @@ class SingleInheritance:
         ----------
         commit : bool
             Whether to commit the transaction after executing the SQL statements.
+        batch : bool
+            Whether to send all the statements in a single round trip,
+            rather than executing them one by one.
+        lock_retry : LockRetry
+            If given, the batch is retried when it times out waiting for a lock.
+            ValueError is raised if batch is False.
         """
+        if not batch and lock_retry is not None:
+            raise ValueError("lock_retry requires batch")
+        if batch:
+            view_parts = list(self.iter_parts())
+            statements = [sql for *_, sql in view_parts] + comment_statements(view_parts)
+            execute_batch(self.conn, statements, self.__batch_name(), lock_retry)
+            if commit:
+                self.conn.commit()
+            return True
+
         success = True
-        for sql in [
-            self.__view(),
-            self.__insert_trigger(),
-            self.__update_trigger(),
-            self.__delete_trigger(),
-            self.__extras(),
-        ]:
+        view_parts = []
+        for phase, sql in self.__iter_queries():
             try:
-                if sql:
-                    cursor = self.conn.cursor()
+                cursor = self.conn.cursor()
+                with timed(STATEMENT, f"{self.view_schema}.{self.view_name}.{phase}"):
                     cursor.execute(sql)
             except psycopg.Error as e:
                 success = False
                 print(f"*** Failing:\n{sql}\n***")
                 raise e
+            view_parts.append((self.view_schema, self.view_name, phase, sql))
+        for sql in comment_statements(view_parts):
+            self.conn.execute(sql)
         if commit:
             self.conn.commit()
         return success
 
+    async def acreate(
+        self, commit: bool = True, batch: bool = True, lock_retry: LockRetry = None
+    ) -> bool:
+        """
+        Creates the merge view using the psycopg.AsyncConnection given at construction.
+        Returns True in case of success
+
+        Parameters
+        ----------
+        commit : bool
+            Whether to commit the transaction after executing the SQL statements.
+        batch : bool
+            Whether to send all the statements in a single round trip,
+            rather than executing them one by one.
+        lock_retry : LockRetry
+            If given, the batch is retried when it times out waiting for a lock.
+            ValueError is raised if batch is False.
+        """
+        if not batch and lock_retry is not None:
+            raise ValueError("lock_retry requires batch")
+        await self.catalog.aload(
+            [(self.parent_schema, self.parent_table), (self.child_schema, self.child_table)]
+        )
+        self.__resolve()
+        if batch:
+            view_parts = list(self.iter_parts())
+            statements = [sql for *_, sql in view_parts] + comment_statements(view_parts)
+            await aexecute_batch(self.conn, statements, self.__batch_name(), lock_retry)
+            if commit:
+                await self.conn.commit()
+            return True
+
+        success = True
+        view_parts = []
+        for phase, sql in self.__iter_queries():
+            try:
+                async with self.conn.cursor() as cursor:
+                    with timed(STATEMENT, f"{self.view_schema}.{self.view_name}.{phase}"):
+                        await cursor.execute(sql)
+            except psycopg.Error as e:
+                success = False
+                print(f"*** Failing:\n{sql}\n***")
+                raise e
+            view_parts.append((self.view_schema, self.view_name, phase, sql))
+        for sql in comment_statements(view_parts):
+            await self.conn.execute(sql)
+        if commit:
+            await self.conn.commit()
+        return success
+
+    def __batch_name(self) -> str:
+        return f"{self.view_schema}.{self.view_name}.batch"
+
+    def sql(self) -> str:
+        """
+        Returns the SQL code which is run by `create`, without executing it.
+        A connection is not required if the catalog holds all tables.
+        """
+        return "\n".join(self.iter_statements())
+
+    def iter_statements(self, parts: Iterable[str] = None) -> Iterator[str]:
+        """
+        Yields the SQL statements of the given parts, in the order of PARTS.
+        Each statement is generated when it is requested.
+
+        Parameters
+        ----------
+        parts
+            the parts to generate among PARTS, defaults to all of them
+        """
+        for *_, sql in self.iter_parts(parts):
+            yield sql
+
+    def iter_parts(self, parts: Iterable[str] = None) -> Iterator[tuple[str, str, str, str]]:
+        """
+        Yields the view schema, view name, part and SQL statement of the given parts,
+        see `iter_statements`
+
+        Parameters
+        ----------
+        parts
+            the parts to generate among PARTS, defaults to all of them
+        """
+        self.__resolve()
+        for part, sql in self.__iter_queries(parts):
+            yield self.view_schema, self.view_name, part, sql
+
+    def __resolve(self):
+        """
+        Reads the keys and references of the tables from the catalog
+        """
+        if self.__resolved:
+            return
+        (self.ref_parent_key, parent_referenced_key) = self.catalog.reference_columns(
+            self.child_schema,
+            self.child_table,
+            foreign_table_schema=self.parent_schema,
+            foreign_table_name=self.parent_table,
+        )
+        try:
+            self.child_pkey = self.catalog.primary_key(self.child_schema, self.child_table)
+        except TableHasNoPrimaryKey:
+            self.child_pkey = self.ref_parent_key
+        self.parent_pkey = self.catalog.primary_key(self.parent_schema, self.parent_table)
+
+        assert self.parent_pkey == parent_referenced_key
+        self.__resolved = True
+
+    def __iter_queries(self, parts: Iterable[str] = None) -> Iterator[tuple[str, str]]:
+        """
+        Yields the phase and SQL code of the requested parts, skipping empty ones
+        """
+        if parts is None:
+            parts = self.PARTS
+        for part in parts:
+            if part not in self.PARTS:
+                raise ValueError(f'Invalid part "{part}", valid parts are {self.PARTS}')
+        generators = {
+            "view": self.__view,
+            "insert_trigger": self.__insert_trigger,
+            "update_trigger": self.__update_trigger,
+            "delete_trigger": self.__delete_trigger,
+            "extras": self.__extras,
+        }
+        for phase in self.PARTS:
+            if phase not in parts:
+                continue
+            with timed(PHASE, f"SingleInheritance.{phase}"):
+                sql = generators[phase]()
+            if sql:
+                yield phase, sql
+
     def __view(self) -> str:
         """
         Create the SQL code for the view
         :return: the SQL code
         """
-        sql = """
-CREATE OR REPLACE VIEW {vs}.{vn} AS SELECT
-  {child_cols},
-  {parent_cols}
-  FROM {cs}.{ct}
-  LEFT JOIN {ps}.{pt} ON {pt}.{prk} = {ct}.{rpk};
-""".format(
-            vs=self.view_schema,
-            vn=self.view_name,
-            parent_cols=select_columns(
-                connection=self.conn,
+        sql = SqlWriter()
+        sql.write(f"\nCREATE OR REPLACE VIEW {self.view_schema}.{self.view_name} AS SELECT\n  ")
+        sql.write(
+            select_columns(
+                catalog=self.catalog,
+                table_schema=self.child_schema,
+                table_name=self.child_table,
+                table_alias=self.child_table,
+            ),
+            ",\n  ",
+        )
+        sql.write(
+            select_columns(
+                catalog=self.catalog,
                 table_schema=self.parent_schema,
                 table_name=self.parent_table,
                 table_alias=self.parent_table,
                 remove_pkey=True,
             ),
-            child_cols=select_columns(
-                connection=self.conn,
-                table_schema=self.child_schema,
-                table_name=self.child_table,
-                table_alias=self.child_table,
-            ),
-            cs=self.child_schema,
-            ct=self.child_table,
-            ps=self.parent_schema,
-            pt=self.parent_table,
-            rpk=self.ref_parent_key,
-            prk=self.parent_pkey,
         )
-
-        return sql
+        sql.write(
+            f"\n  FROM {self.child_schema}.{self.child_table}"
+            f"\n  LEFT JOIN {self.parent_schema}.{self.parent_table} "
+            f"ON {self.parent_table}.{self.parent_pkey} = {self.child_table}.{self.ref_parent_key};\n"
+        )
+        return sql.getvalue()
 
     def __insert_trigger(self) -> str:
         """
-
-        :return:
+        Create the SQL code for the insert trigger
+        :return: the SQL code
         """
-        sql = """
--- INSERT TRIGGER
-CREATE OR REPLACE FUNCTION {vs}.ft_{vn}_insert() RETURNS trigger AS
-$BODY$
-BEGIN
-{insert_parent}
-
-{insert_child}
-RETURN NEW;
-END;
-$BODY$
-LANGUAGE plpgsql;
-
-DROP TRIGGER IF EXISTS tr_{vn}_on_insert ON {vs}.{vn};
-
-CREATE TRIGGER tr_{vn}_on_insert
-  INSTEAD OF INSERT ON {vs}.{vn}
-  FOR EACH ROW EXECUTE PROCEDURE {vs}.ft_{vn}_insert();
-""".format(
-            vs=self.view_schema,
-            vn=self.view_name,
-            insert_parent=insert_command(
-                connection=self.conn,
+        vs, vn = self.view_schema, self.view_name
+        sql = SqlWriter()
+        sql.write(
+            f"\n-- INSERT TRIGGER"
+            f"\nCREATE OR REPLACE FUNCTION {vs}.ft_{vn}_insert() RETURNS trigger AS"
+            f"\n$BODY$"
+            f"\nBEGIN\n"
+        )
+        sql.write(
+            insert_command(
+                catalog=self.catalog,
                 table_schema=self.parent_schema,
                 table_name=self.parent_table,
                 remove_pkey=False,
                 coalesce_pkey_default=True,
-                coalesce_pkey_default_value=default_value(
-                    self.conn, self.child_schema, self.child_table, self.child_pkey
+                coalesce_pkey_default_value=self.catalog.default_value(
+                    self.child_schema, self.child_table, self.child_pkey
                 ),
                 remap_columns={self.parent_pkey: self.ref_parent_key},
                 inner_defaults=self.inner_defaults,
-                returning="{ppk} INTO NEW.{prk}".format(
-                    ppk=self.parent_pkey, prk=self.ref_parent_key
-                ),
+                returning=f"{self.parent_pkey} INTO NEW.{self.ref_parent_key}",
             ),
-            insert_child=insert_command(
-                connection=self.conn,
+            "\n\n",
+        )
+        sql.write(
+            insert_command(
+                catalog=self.catalog,
                 table_schema=self.child_schema,
                 table_name=self.child_table,
                 remove_pkey=False,
                 pkey=self.child_pkey,
-            ),
+            )
         )
-        return sql
+        sql.write(
+            f"\nRETURN NEW;"
+            f"\nEND;"
+            f"\n$BODY$"
+            f"\nLANGUAGE plpgsql;"
+            f"\n"
+            f"\nDROP TRIGGER IF EXISTS tr_{vn}_on_insert ON {vs}.{vn};"
+            f"\n"
+            f"\nCREATE TRIGGER tr_{vn}_on_insert"
+            f"\n  INSTEAD OF INSERT ON {vs}.{vn}"
+            f"\n  FOR EACH ROW EXECUTE PROCEDURE {vs}.ft_{vn}_insert();\n"
+        )
+        return sql.getvalue()
 
     def __update_trigger(self):
-        sql = """
--- UPDATE TRIGGER
-CREATE OR REPLACE FUNCTION {vs}.ft_{vn}_update() RETURNS trigger AS
-$BODY$
-BEGIN
-{update_master}
-
-{update_child}
-RETURN NEW;
-END;
-$BODY$
-LANGUAGE plpgsql;
-
-DROP TRIGGER IF EXISTS tr_{vn}_on_update ON {vs}.{vn};
-
-CREATE TRIGGER tr_{vn}_on_update
-  INSTEAD OF UPDATE ON {vs}.{vn}
-  FOR EACH ROW EXECUTE PROCEDURE {vs}.ft_{vn}_update();
-""".format(
-            vs=self.view_schema,
-            vn=self.view_name,
-            update_master=update_command(
-                connection=self.conn,
+        vs, vn = self.view_schema, self.view_name
+        sql = SqlWriter()
+        sql.write(
+            f"\n-- UPDATE TRIGGER"
+            f"\nCREATE OR REPLACE FUNCTION {vs}.ft_{vn}_update() RETURNS trigger AS"
+            f"\n$BODY$"
+            f"\nBEGIN\n"
+        )
+        sql.write(
+            update_command(
+                catalog=self.catalog,
                 table_schema=self.parent_schema,
                 table_name=self.parent_table,
                 remap_columns={self.parent_pkey: self.ref_parent_key},
+                changed_only=self.skip_unchanged_updates,
             ),
-            update_child=update_command(
-                connection=self.conn,
+            "\n\n",
+        )
+        sql.write(
+            update_command(
+                catalog=self.catalog,
                 table_schema=self.child_schema,
                 table_name=self.child_table,
                 pkey=self.child_pkey,
                 remove_pkey=False,
-            ),
+                changed_only=self.skip_unchanged_updates,
+            )
         )
-        return sql
+        sql.write(
+            f"\nRETURN NEW;"
+            f"\nEND;"
+            f"\n$BODY$"
+            f"\nLANGUAGE plpgsql;"
+            f"\n"
+            f"\nDROP TRIGGER IF EXISTS tr_{vn}_on_update ON {vs}.{vn};"
+            f"\n"
+            f"\nCREATE TRIGGER tr_{vn}_on_update"
+            f"\n  INSTEAD OF UPDATE ON {vs}.{vn}"
+            f"\n  FOR EACH ROW EXECUTE PROCEDURE {vs}.ft_{vn}_update();\n"
+        )
+        return sql.getvalue()
 
     def __delete_trigger(self):
         sql = """
@@ -271,6 +431,8 @@ CREATE TRIGGER tr_{vn}_on_delete
                 vs=self.view_schema,
                 vn=self.view_name,
                 rpk=self.child_pkey,
-                dv=default_value(self.conn, self.child_schema, self.child_table, self.child_pkey),
+                dv=self.catalog.default_value(
+                    self.child_schema, self.child_table, self.child_pkey
+                ),
             )
         return sql
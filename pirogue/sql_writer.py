@@ -0,0 +1,51 @@
+from typing import Iterable
+
+
+class SqlWriter:
+    """
+    Buffer the SQL code is written to fragment by fragment, and joined once at the end.
+    It is used by the generators instead of nested str.format templates,
+    which copy the whole code produced so far at every level.
+    """
+
+    __slots__ = ("fragments",)
+
+    def __init__(self):
+        self.fragments = []
+
+    def write(self, *fragments: str) -> "SqlWriter":
+        """
+        Appends the fragments to the buffer
+
+        Parameters
+        ----------
+        fragments
+            the SQL fragments
+        """
+        self.fragments.extend(fragments)
+        return self
+
+    def join(self, separator: str, fragments: Iterable[str]) -> "SqlWriter":
+        """
+        Appends the fragments to the buffer, with the separator between them
+
+        Parameters
+        ----------
+        separator
+            the separator written between two fragments
+        fragments
+            an iterable of SQL fragments
+        """
+        first = True
+        for fragment in fragments:
+            if not first:
+                self.fragments.append(separator)
+            first = False
+            self.fragments.append(fragment)
+        return self
+
+    def getvalue(self) -> str:
+        """
+        Returns the SQL code written so far
+        """
+        return "".join(self.fragments)
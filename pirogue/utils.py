@@ -1,7 +1,8 @@
 import psycopg
 
-from pirogue.exceptions import InvalidColumn, TableHasNoPrimaryKey
-from pirogue.information_schema import columns, default_value, primary_key
+from pirogue.catalog import SchemaCatalog, TableModel
+from pirogue.exceptions import InvalidColumn
+from pirogue.information_schema import default_value  # noqa: F401
 
 
 def table_parts(name: str) -> tuple[str, str]:
@@ -19,9 +20,26 @@ def table_parts(name: str) -> tuple[str, str]:
         return "public", name
 
 
+def definition_tables(definition: dict) -> list[tuple[str, str]]:
+    """
+    Returns the list of tables (as schema and table names tuples) used by a definition
+    of a multiple inheritance or simple joins view
+
+    Parameters
+    ----------
+    definition
+        the YAML definition
+    """
+    tables = [tuple(table_parts(definition.get("table", None)))]
+    for table_def in definition.get("joins", {}).values():
+        tables.append(tuple(table_parts(table_def["table"])))
+    return tables
+
+
 def select_columns(
     *,
-    connection: psycopg.Connection,
+    connection: psycopg.Connection = None,
+    catalog: SchemaCatalog = None,
     table_schema: str,
     table_name: str,
     table_type: str = "table",
@@ -45,6 +63,8 @@ def select_columns(
     ----------
     connection
         the psycopg connection
+    catalog
+        the catalog to read the metadata from, if not given it is loaded from the connection
     table_schema
         the schema
     table_name
@@ -77,22 +97,17 @@ def select_columns(
     separate_first
         separate the first column with a comma
     """
-    try:
-        pk_for_sort = primary_key(connection, table_schema, table_name)
-    except TableHasNoPrimaryKey:
-        pk_for_sort = None
-    cols = sorted(
-        columns_list
-        or columns(
-            connection,
-            table_schema=table_schema,
-            table_name=table_name,
-            table_type=table_type,
-            remove_pkey=remove_pkey,
-        ),
-        key=lambda col, pk_for_sort=pk_for_sort: __column_priority(col, primary_key=pk_for_sort),
-    )
+    catalog = catalog or SchemaCatalog(connection)
+    model = catalog.model(table_schema, table_name)
+    if columns_list:
+        cols = sorted(columns_list, key=model.sort_key)
+    else:
+        cols = __model_columns(catalog, model, remove_pkey)
+    safe_skip_columns = set(safe_skip_columns)
     cols = [col for col in cols if col not in safe_skip_columns]
+    col_set = set(cols)
+    skip_set = set(skip_columns)
+    aliases = model.aliases(remap_columns, prefix)
 
     # check arguments
     for param, dict_or_list in {
@@ -102,7 +117,7 @@ def select_columns(
         "columns_at_end": columns_at_end,
     }.items():
         for col in dict_or_list:
-            if col not in cols:
+            if col not in col_set:
                 raise InvalidColumn(
                     'Invalid column in {param} paramater: "{tab}" has no column "{col}"'.format(
                         param=param, tab=table_name, col=col
@@ -127,25 +142,20 @@ def select_columns(
             return ""
 
     lines = []
+    table_alias = table_alias or table_name
     for col in cols:
-        if comment_skipped or col not in skip_columns:
-            lines.append(
-                "{skip}{comma}{table_alias}.{column}{col_alias}".format(
-                    comma=print_comma(first_column_printed, col not in skip_columns),
-                    skip="-- " if col in skip_columns else "",
-                    table_alias=table_alias or table_name,
-                    column=col,
-                    col_alias=__column_alias(
-                        col, remap_columns=remap_columns, prefix=prefix, prepend_as=True
-                    ),
-                )
-            )
+        skipped = col in skip_set
+        if comment_skipped or not skipped:
+            comma = print_comma(first_column_printed, not skipped)
+            col_alias = f" AS {aliases[col]}" if aliases[col] else ""
+            lines.append(f"{'-- ' if skipped else ''}{comma}{table_alias}.{col}{col_alias}")
     return "\n{indent}".format(indent=indent * " ").join(lines)
 
 
 def insert_command(
     *,
-    connection: psycopg.Connection,
+    connection: psycopg.Connection = None,
+    catalog: SchemaCatalog = None,
     table_schema: str,
     table_name: str,
     table_type: str = "table",
@@ -164,6 +174,7 @@ def insert_command(
     returning: str = None,
     indent: int = 2,
     inner_defaults: dict = {},
+    select_from: str = None,
 ) -> str:
     """
     Creates an INSERT command
@@ -172,6 +183,8 @@ def insert_command(
     ----------
     connection
         the psycopg connection
+    catalog
+        the catalog to read the metadata from, if not given it is loaded from the connection
     table_schema
         the schema
     table_name
@@ -208,34 +221,27 @@ def insert_command(
          add an indent in front
     inner_defaults
         dictionary of other columns to default to in case the provided value is null (can be used instead of insert_values to make it easier to reuse other columns definitions)
+    select_from
+        if given, the values are selected from this FROM clause, in which the rows are aliased NEW,
+        rather than given as VALUES. The command is then not terminated, so that it can be used in a CTE.
     """
     remove_pkey = remove_pkey and pkey is None
 
     # get columns
-    try:
-        pk_for_sort = primary_key(connection, table_schema, table_name)
-    except TableHasNoPrimaryKey:
-        pk_for_sort = None
-    cols = sorted(
-        columns(
-            connection,
-            table_schema=table_schema,
-            table_name=table_name,
-            table_type=table_type,
-            remove_pkey=remove_pkey,
-        ),
-        key=lambda col, pk_for_sort=pk_for_sort: __column_priority(col, primary_key=pk_for_sort),
-    )
-
-    if pkey and remove_pkey:
-        cols.remove(pkey)
+    catalog = catalog or SchemaCatalog(connection)
+    model = catalog.model(table_schema, table_name)
+    cols = __model_columns(catalog, model, remove_pkey)
+    col_set = set(cols)
+    skip_set = set(skip_columns)
 
     # if no columns, return NULL
-    if len([col for col in cols if col not in skip_columns]) == 0:
+    if col_set <= skip_set:
         return f"-- Do not insert for {table_name} since all columns are skipped"
 
     if not pkey and coalesce_pkey_default:
-        pkey = primary_key(connection, table_schema, table_name)
+        pkey = catalog.primary_key(table_schema, table_name)
+
+    aliases = model.aliases(remap_columns, prefix)
 
     # check arguments
     for param, dict_or_list in {
@@ -246,7 +252,7 @@ def insert_command(
         "columns_at_end": columns_at_end,
     }.items():
         for col in dict_or_list:
-            if col not in cols:
+            if col not in col_set:
                 raise InvalidColumn(
                     'Invalid column in {param} paramater: "{tab}" has no column "{col}"'.format(
                         param=param, tab=table_name, col=col
@@ -256,14 +262,12 @@ def insert_command(
     def value(col):
         if col in insert_values:
             return f"{insert_values[col]} -- {col}"
-        cal = __column_alias(
-            col, remap_columns=remap_columns, prefix=prefix, field_if_no_alias=True
-        )
+        cal = aliases[col] or col
         if coalesce_pkey_default and col == pkey:
             return "COALESCE( NEW.{cal}, {pk_def} )".format(
                 cal=cal,
                 pk_def=coalesce_pkey_default_value
-                or default_value(connection, table_schema, table_name, pkey),
+                or catalog.default_value(table_schema, table_name, pkey),
             )
         elif col in inner_defaults:
             def_col = inner_defaults[col]
@@ -277,35 +281,38 @@ def insert_command(
 
     next_comma_printed_1 = [False]
     next_comma_printed_2 = [False]
-    return """INSERT INTO {s}.{t} (
+    if select_from:
+        template = """INSERT INTO {s}.{t} (
+{indent}      {cols}
+{indent}  ) SELECT
+{indent}      {new_cols}
+{indent}  FROM {select_from}{returning}"""
+    else:
+        template = """INSERT INTO {s}.{t} (
 {indent}      {cols}
 {indent}  ) VALUES (
 {indent}      {new_cols}
 {indent}  ){returning};
-""".format(
+"""
+    return template.format(
         indent=indent * " ",
+        select_from=select_from,
         s=table_schema,
         t=table_name,
         cols="\n{indent}    ".format(indent=indent * " ").join(
             [
-                "{skip}{comma}{col}".format(
-                    skip="-- " if col in skip_columns else "",
-                    comma=", " if __print_comma(next_comma_printed_1, col in skip_columns) else "",
-                    col=col,
-                )
+                f"{'-- ' if col in skip_set else ''}"
+                f"{', ' if __print_comma(next_comma_printed_1, col in skip_set) else ''}{col}"
                 for col in cols
-                if (comment_skipped or col not in skip_columns)
+                if (comment_skipped or col not in skip_set)
             ]
         ),
         new_cols="\n{indent}    ".format(indent=indent * " ").join(
             [
-                "{skip}{comma}{value}".format(
-                    skip="-- " if col in skip_columns else "",
-                    comma=", " if __print_comma(next_comma_printed_2, col in skip_columns) else "",
-                    value=value(col),
-                )
+                f"{'-- ' if col in skip_set else ''}"
+                f"{', ' if __print_comma(next_comma_printed_2, col in skip_set) else ''}{value(col)}"
                 for col in cols
-                if (comment_skipped or col not in skip_columns)
+                if (comment_skipped or col not in skip_set)
             ]
         ),
         returning=f" RETURNING {returning}" if returning else "",
@@ -314,7 +321,8 @@ def insert_command(
 
 def update_command(
     *,
-    connection: psycopg.Connection,
+    connection: psycopg.Connection = None,
+    catalog: SchemaCatalog = None,
     table_schema: str,
     table_name: str,
     table_alias: str = None,
@@ -332,6 +340,8 @@ def update_command(
     returning: str = None,
     indent: int = 2,
     inner_defaults: dict = {},
+    changed_only: bool = False,
+    select_from: str = None,
 ) -> str:
     """
     Creates an UPDATE command
@@ -340,6 +350,8 @@ def update_command(
     ----------
     connection
          the psycopg connection
+    catalog
+        the catalog to read the metadata from, if not given it is loaded from the connection
     table_schema
          the schema
     table_name
@@ -374,6 +386,12 @@ def update_command(
          add an indent in front
     inner_defaults
          dictionary of other columns to default to in case the provided value is null (can be used instead of insert_values to make it easier to reuse other columns definitions)
+    changed_only
+        if True, the row is only updated if one of the updated columns is distinct from its new value,
+        so that no-op updates do not write row versions. The columns need an equality operator.
+    select_from
+        if given, the rows are updated from this FROM clause, in which the new and old rows are aliased
+        NEW and OLD. The command is then not terminated, so that it can be used in a CTE.
 
     Returns
     -------
@@ -382,30 +400,20 @@ def update_command(
 
     remove_pkey = remove_pkey and pkey is None and where_clause is None
     # get columns
-    try:
-        pk_for_sort = primary_key(connection, table_schema, table_name)
-    except TableHasNoPrimaryKey:
-        pk_for_sort = None
-    cols = sorted(
-        columns(
-            connection,
-            table_schema=table_schema,
-            table_name=table_name,
-            table_type=table_type,
-            remove_pkey=remove_pkey,
-        ),
-        key=lambda _col, pk_for_sort=pk_for_sort: __column_priority(_col, primary_key=pk_for_sort),
-    )
-
-    if pkey and remove_pkey:
-        cols.remove(pkey)
+    catalog = catalog or SchemaCatalog(connection)
+    model = catalog.model(table_schema, table_name)
+    cols = __model_columns(catalog, model, remove_pkey)
+    col_set = set(cols)
+    skip_set = set(skip_columns)
 
     # if no columns, return NULL
-    if len([col for col in cols if col not in skip_columns]) == 0:
+    if col_set <= skip_set:
         return f"-- Do not update for {table_name} since all columns are skipped"
 
     if not pkey and not where_clause:
-        pkey = primary_key(connection, table_schema, table_name)
+        pkey = catalog.primary_key(table_schema, table_name)
+
+    aliases = model.aliases(remap_columns, prefix)
 
     # check arguments
     for param, dict_or_list in {
@@ -416,7 +424,7 @@ def update_command(
         "columns_at_end": columns_at_end,
     }.items():
         for col in dict_or_list:
-            if col not in cols and col != pkey:
+            if col not in col_set and col != pkey:
                 raise InvalidColumn(
                     'Invalid column in {param} paramater: "{tab}" has no column "{col}"'.format(
                         param=param, tab=table_name, col=col
@@ -428,9 +436,7 @@ def update_command(
     def value(col):
         if col in update_values:
             return update_values[col]
-        cal = __column_alias(
-            col, remap_columns=remap_columns, prefix=prefix, field_if_no_alias=True
-        )
+        cal = aliases[col] or col
         if col in inner_defaults:
             def_col = inner_defaults[col]
             # we don't use COALESCE to deal with empt strings too
@@ -441,88 +447,69 @@ def update_command(
         else:
             return f"NEW.{cal}"
 
-    return """UPDATE {s}.{t}{a} SET
+    qualifier = table_alias or table_name
+    guard = ""
+    if changed_only:
+        # the primary key is matched by the where clause already
+        compared = [col for col in cols if col not in skip_set and col != pkey] or [
+            col for col in cols if col not in skip_set
+        ]
+        guard = "\n{indent}    AND (\n{indent}      {changes}\n{indent}    )".format(
+            indent=indent * " ",
+            changes="\n{indent}      OR ".format(indent=indent * " ").join(
+                f"{qualifier}.{col} IS DISTINCT FROM {value(col)}" for col in compared
+            ),
+        )
+
+    if select_from:
+        template = """UPDATE {s}.{t}{a} SET
+{indent}    {cols}
+{indent}  FROM {select_from}
+{indent}  WHERE {where_clause}{guard}{returning}"""
+    else:
+        template = """UPDATE {s}.{t}{a} SET
 {indent}    {cols}
-{indent}  WHERE {where_clause}
-{indent}  {returning};""".format(
+{indent}  WHERE {where_clause}{guard}
+{indent}  {returning};"""
+    return template.format(
         indent=indent * " ",
         s=table_schema,
         t=table_name,
         a=f" {table_alias}" if table_alias else "",
         cols="\n{indent}    ".format(indent=indent * " ").join(
             [
-                "{skip}{comma}{col} = {new_col}".format(
-                    skip="-- " if col in skip_columns else "",
-                    comma=", " if __print_comma(next_comma_printed, col in skip_columns) else "",
-                    col=col,
-                    new_col=value(col),
-                )
+                f"{'-- ' if col in skip_set else ''}"
+                f"{', ' if __print_comma(next_comma_printed, col in skip_set) else ''}"
+                f"{col} = {value(col)}"
                 for col in cols
-                if (comment_skipped or col not in skip_columns)
+                if (comment_skipped or col not in skip_set)
             ]
         ),
+        select_from=select_from,
         where_clause=where_clause
         or "{pkey} = {pkal}".format(
-            pkey=pkey,
+            # the columns of the FROM clause are ambiguous
+            pkey=f"{qualifier}.{pkey}" if select_from else pkey,
             pkal=update_values.get(
                 pkey,
-                "OLD.{cal}".format(
-                    cal=__column_alias(
-                        pkey, remap_columns=remap_columns, prefix=prefix, field_if_no_alias=True
-                    )
-                ),
+                "OLD.{cal}".format(cal=aliases[pkey] or pkey),
             ),
         ),
+        guard=guard,
         returning=f" RETURNING {returning}" if returning else "",
     )
 
 
-def __column_alias(
-    column: str,
-    *,
-    remap_columns: dict = {},
-    prefix: str = None,
-    field_if_no_alias: bool = False,
-    prepend_as: bool = False,
-) -> list:
+def __model_columns(catalog: SchemaCatalog, model: TableModel, remove_pkey: bool) -> tuple:
     """
-
-    table_alias
-    column
-    field_if_no_alias if True, return the field if the alias doesn't exist. If False return an empty string
-    prepend_as prepend " AS " to the alias
-    :return: empty string if there is no alias and (i.e = field name)
+    Returns the sorted columns of the table model, optionally without the primary key
     """
-    col_alias = ""
-    if column in remap_columns:
-        col_alias = remap_columns[column]
-    elif prefix:
-        col_alias = prefix + column
-    elif field_if_no_alias:
-        col_alias = column
-    if prepend_as and col_alias:
-        col_alias = f" AS {col_alias}"
-    return col_alias
-
-
-def __column_priority(
-    column: str,
-    *,
-    columns_on_top: list = [],
-    columns_at_end: list = [],
-    primary_key: str = None,
-):
-    """
-    Returns a value to sort columns first the primary key, then by priority (on top / at end), then alphabetically
-    """
-    if primary_key is not None and primary_key == column:
-        return [-1, column]
-    if column in columns_on_top:
-        return [0, column]
-    elif column in columns_at_end:
-        return [2, column]
-    else:
-        return [1, column]
+    if remove_pkey:
+        # raises TableHasNoPrimaryKey if there is none
+        catalog.primary_key(model.schema_name, model.table_name)
+        # the primary key is sorted first
+        return model.columns[1:]
+    return model.columns
 
 
 def __print_comma(next_comma_printed: list, is_skipped: bool) -> bool:
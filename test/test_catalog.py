@@ -0,0 +1,263 @@
+#! /usr/bin/env python
+
+import asyncio
+import glob
+import json
+import tempfile
+import unittest
+
+import psycopg
+import yaml
+
+from pirogue import MultipleInheritance, SimpleJoins
+from pirogue.catalog import SchemaCatalog
+from pirogue.exceptions import (
+    NoReferenceFound,
+    TableHasNoPrimaryKey,
+    TableNotInCatalog,
+)
+from pirogue.information_schema import (
+    acolumns,
+    adefault_value,
+    aenum_values,
+    ageometry_type,
+    aprimary_key,
+    areference_columns,
+    arelation_columns,
+    columns,
+    default_value,
+    enum_values,
+    geometry_type,
+    primary_key,
+    reference_columns,
+    relation_columns,
+)
+
+pg_service = "pirogue_test"
+
+
+class TestSchemaCatalog(unittest.TestCase):
+    def setUp(self):
+        self.conn = psycopg.connect(f"service={pg_service}")
+
+        sql = open("test/demo_data.sql").read()
+        cur = self.conn.cursor()
+        cur.execute(sql)
+        self.conn.commit()
+
+        self.tables = ["animal", "cat", "dog", "aardvark", "eagle", "cat_breed", "vet"]
+        self.catalog = SchemaCatalog(self.conn)
+        self.catalog.load([("pirogue_test", table) for table in self.tables])
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_same_as_information_schema(self):
+        for table in self.tables:
+            self.assertEqual(
+                self.catalog.columns("pirogue_test", table),
+                columns(self.conn, "pirogue_test", table),
+            )
+            try:
+                pkey = primary_key(self.conn, "pirogue_test", table)
+            except TableHasNoPrimaryKey:
+                with self.assertRaises(TableHasNoPrimaryKey):
+                    self.catalog.primary_key("pirogue_test", table)
+            else:
+                self.assertEqual(self.catalog.primary_key("pirogue_test", table), pkey)
+            for column in self.catalog.columns("pirogue_test", table):
+                self.assertEqual(
+                    self.catalog.default_value("pirogue_test", table, column),
+                    default_value(self.conn, "pirogue_test", table, column),
+                )
+
+    def test_async_information_schema(self):
+        MultipleInheritance(
+            definition=yaml.safe_load(open("test/multiple_inheritance.yaml")), connection=self.conn
+        ).create()
+
+        async def compare(aconn, function, afunction, *args, **kwargs):
+            # the results, or the raised exceptions, are the same
+            try:
+                expected = function(self.conn, *args, **kwargs)
+            except (TableHasNoPrimaryKey, NoReferenceFound, psycopg.Error) as e:
+                self.conn.rollback()
+                with self.assertRaises(type(e)):
+                    await afunction(aconn, *args, **kwargs)
+                await aconn.rollback()
+            else:
+                self.assertEqual(await afunction(aconn, *args, **kwargs), expected)
+
+        async def run():
+            aconn = await psycopg.AsyncConnection.connect(f"service={pg_service}")
+            async with aconn:
+                for table in self.tables:
+                    await compare(aconn, columns, acolumns, "pirogue_test", table)
+                    await compare(aconn, primary_key, aprimary_key, "pirogue_test", table)
+                    await compare(
+                        aconn, relation_columns, arelation_columns, "pirogue_test", table
+                    )
+                    for column in columns(self.conn, "pirogue_test", table):
+                        await compare(
+                            aconn, default_value, adefault_value, "pirogue_test", table, column
+                        )
+                    await compare(
+                        aconn,
+                        reference_columns,
+                        areference_columns,
+                        "pirogue_test",
+                        table,
+                        foreign_table_schema="pirogue_test",
+                        foreign_table_name="animal",
+                    )
+                    await compare(aconn, geometry_type, ageometry_type, "pirogue_test", table)
+                await compare(
+                    aconn, relation_columns, arelation_columns, "pirogue_test", "vw_merge_animal"
+                )
+                await compare(aconn, enum_values, aenum_values, "pirogue_test", "animal_type")
+                await compare(aconn, enum_values, aenum_values, "pirogue_test", "no_such_type")
+
+        asyncio.run(run())
+
+    def test_reference_columns(self):
+        kwargs = dict(foreign_table_schema="pirogue_test", foreign_table_name="animal")
+        self.assertEqual(
+            self.catalog.reference_columns("pirogue_test", "eagle", **kwargs),
+            reference_columns(self.conn, "pirogue_test", "eagle", **kwargs),
+        )
+        with self.assertRaises(NoReferenceFound):
+            self.catalog.reference_columns("pirogue_test", "vet", **kwargs)
+
+    def test_reference_on_delete(self):
+        kwargs = dict(foreign_table_schema="pirogue_test", foreign_table_name="animal")
+        self.assertEqual(
+            self.catalog.reference_on_delete("pirogue_test", "eagle", "fk_animal", **kwargs), "a"
+        )
+        self.assertIsNone(
+            self.catalog.reference_on_delete("pirogue_test", "eagle", "eid", **kwargs)
+        )
+
+    def test_lazy_load(self):
+        catalog = SchemaCatalog(self.conn)
+        self.assertEqual(catalog.primary_key("pirogue_test", "eagle"), "eid")
+        self.assertIn(("pirogue_test", "eagle"), catalog.tables)
+
+    def test_model(self):
+        model = self.catalog.model("pirogue_test", "animal")
+        self.assertIs(model, self.catalog.model("pirogue_test", "animal"))
+        self.assertEqual(model.columns[0], "aid")
+        self.assertEqual(list(model.columns[1:]), sorted(model.columns[1:]))
+        aliases = model.aliases({"name": "animal_name"}, "a_")
+        self.assertEqual(aliases["name"], "animal_name")
+        self.assertEqual(aliases["year"], "a_year")
+        self.assertIs(aliases, model.aliases({"name": "animal_name"}, "a_"))
+        self.assertEqual(model.aliases()["year"], "")
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            catalog = SchemaCatalog(self.conn, cache_dir=cache_dir)
+            catalog.load([("pirogue_test", "cat"), ("pirogue_test", "dog")])
+            (cache_file,) = glob.glob(f"{cache_dir}/*.json")
+
+            # tamper the cache to check it is read
+            cache = json.load(open(cache_file))
+            cache["pirogue_test.cat"]["table"]["columns"].append("from_cache")
+            json.dump(cache, open(cache_file, "w"))
+            catalog = SchemaCatalog(self.conn, cache_dir=cache_dir)
+            self.assertIn("from_cache", catalog.columns("pirogue_test", "cat"))
+
+            # a schema change invalidates the entry
+            self.conn.execute("ALTER TABLE pirogue_test.cat ADD COLUMN whiskers integer")
+            catalog = SchemaCatalog(self.conn, cache_dir=cache_dir)
+            cols = catalog.columns("pirogue_test", "cat")
+            self.assertIn("whiskers", cols)
+            self.assertNotIn("from_cache", cols)
+            self.conn.rollback()
+
+            # renaming a referenced column invalidates the entry of the referencing table
+            catalog = SchemaCatalog(self.conn, cache_dir=cache_dir)
+            catalog.load([("pirogue_test", "cat")])
+            self.conn.execute("ALTER TABLE pirogue_test.animal RENAME COLUMN aid TO animal_id")
+            catalog = SchemaCatalog(self.conn, cache_dir=cache_dir)
+            self.assertEqual(
+                catalog.reference_columns(
+                    "pirogue_test",
+                    "cat",
+                    foreign_table_schema="pirogue_test",
+                    foreign_table_name="animal",
+                ),
+                ("cid", "animal_id"),
+            )
+            self.conn.rollback()
+
+    def test_snapshot(self):
+        mi_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        sj_definition = yaml.safe_load(open("test/simple_joins.yaml"))
+        catalog = SchemaCatalog(self.conn)
+        mi_sql = MultipleInheritance(
+            definition=mi_definition, connection=self.conn, catalog=catalog, create_joins=True
+        ).sql()
+        sj_sql = SimpleJoins(sj_definition, connection=self.conn, catalog=catalog).sql()
+
+        with tempfile.TemporaryDirectory() as snapshot_dir:
+            catalog.save(f"{snapshot_dir}/snapshot.json")
+            offline_catalog = SchemaCatalog.from_file(f"{snapshot_dir}/snapshot.json")
+
+        mi_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        self.assertEqual(
+            MultipleInheritance(
+                definition=mi_definition, catalog=offline_catalog, create_joins=True
+            ).sql(),
+            mi_sql,
+        )
+        self.assertEqual(SimpleJoins(sj_definition, catalog=offline_catalog).sql(), sj_sql)
+        with self.assertRaises(TableNotInCatalog):
+            offline_catalog.columns("pirogue_test", "dog_breed")
+
+    def test_incomplete_snapshot(self):
+        sj_definition = yaml.safe_load(open("test/simple_joins.yaml"))
+        catalog = SchemaCatalog(self.conn)
+        SimpleJoins(sj_definition, connection=self.conn, catalog=catalog).sql()
+        with tempfile.TemporaryDirectory() as snapshot_dir:
+            catalog.save(f"{snapshot_dir}/snapshot.json")
+            offline_catalog = SchemaCatalog.from_file(f"{snapshot_dir}/snapshot.json")
+
+        # the snapshot does not hold the tables of the other animals
+        mi_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        with self.assertRaises(TableNotInCatalog):
+            MultipleInheritance(definition=mi_definition, catalog=offline_catalog)
+        with self.assertRaises(TableNotInCatalog):
+            asyncio.run(offline_catalog.aload([("pirogue_test", "dog")]))
+        offline_catalog.load([("pirogue_test", "cat")])
+
+    def test_async(self):
+        mi_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        mi_sql = MultipleInheritance(
+            definition=mi_definition, connection=self.conn, create_joins=True
+        ).sql()
+
+        async def create():
+            aconn = await psycopg.AsyncConnection.connect(f"service={pg_service}")
+            async with aconn:
+                definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+                mi = MultipleInheritance(
+                    definition=definition, connection=aconn, create_joins=True
+                )
+                self.assertTrue(await mi.acreate(commit=False))
+                async with aconn.cursor() as cur:
+                    await cur.execute(
+                        "INSERT INTO pirogue_test.vw_merge_animal (animal_type, name, year, fk_cat_breed) "
+                        "VALUES ('cat', 'felix', 1985, 2);"
+                    )
+                    await cur.execute(
+                        "SELECT count(*) FROM pirogue_test.vw_cat WHERE name = 'felix';"
+                    )
+                    self.assertEqual((await cur.fetchone())[0], 1)
+                await aconn.rollback()
+                return mi.sql()
+
+        self.assertEqual(asyncio.run(create()), mi_sql)
+
+
+if __name__ == "__main__":
+    unittest.main()
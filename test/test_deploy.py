@@ -0,0 +1,145 @@
+#! /usr/bin/env python
+
+import unittest
+
+import psycopg
+import yaml
+
+from pirogue import MultipleInheritance, SimpleJoins
+from pirogue.deploy import ViewChange, deploy, plan
+from pirogue.instrumentation import STATEMENT, Profile
+
+pg_service = "pirogue_test"
+
+
+class TestDeploy(unittest.TestCase):
+    def setUp(self):
+        self.conn = psycopg.connect(f"service={pg_service}")
+
+        sql = open("test/demo_data.sql").read()
+        cur = self.conn.cursor()
+        cur.execute(sql)
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+
+    def __generators(self, **definition):
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        yaml_definition.update(definition)
+        return [
+            MultipleInheritance(
+                definition=yaml_definition, connection=self.conn, create_joins=True, drop=True
+            )
+        ]
+
+    def __actions(self, changes):
+        return {f"{c.view_schema}.{c.view_name}": c.action for c in changes}
+
+    def test_deploy(self):
+        changes = deploy(self.conn, self.__generators())
+        self.assertEqual(len(changes), 5)
+        self.assertEqual({c.action for c in changes}, {ViewChange.CREATE})
+
+        # nothing is run if nothing changed
+        self.assertEqual({c.action for c in plan(self.conn, self.__generators())}, {"unchanged"})
+        with Profile() as profile:
+            deploy(self.conn, self.__generators())
+        self.assertEqual(profile.count(STATEMENT), 0)
+
+        # only the update trigger of the merge view changes
+        changes = plan(self.conn, self.__generators(allow_type_change=False))
+        actions = self.__actions(changes)
+        self.assertEqual(actions.pop("pirogue_test.vw_merge_animal"), ViewChange.UPDATE)
+        self.assertEqual(set(actions.values()), {ViewChange.UNCHANGED})
+        self.assertEqual(changes[0].parts, ["update_trigger"])
+        self.assertEqual(
+            str(changes[0]), "update     pirogue_test.vw_merge_animal (update_trigger)"
+        )
+        deploy(self.conn, self.__generators(allow_type_change=False))
+        self.assertEqual(
+            {c.action for c in plan(self.conn, self.__generators(allow_type_change=False))},
+            {ViewChange.UNCHANGED},
+        )
+
+        # the view changes, it is dropped and recreated with its type
+        changes = plan(
+            self.conn, self.__generators(additional_columns={"upper_name": "upper(animal.name)"})
+        )
+        self.assertEqual(changes[0].action, ViewChange.RECREATE)
+        self.assertEqual(changes[0].parts[0], "drops")
+        deploy(
+            self.conn, self.__generators(additional_columns={"upper_name": "upper(animal.name)"})
+        )
+        self.conn.execute(
+            "INSERT INTO pirogue_test.vw_merge_animal (animal_type, name) VALUES ('cat', 'felix')"
+        )
+        self.assertEqual(
+            self.conn.execute("SELECT upper_name FROM pirogue_test.vw_merge_animal").fetchone()[0],
+            "FELIX",
+        )
+
+    def test_deploy_new_subtype(self):
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        del yaml_definition["joins"]["eagle"]
+        deploy(self.conn, [MultipleInheritance(definition=yaml_definition, connection=self.conn)])
+
+        # the type is evolved, the view and triggers are replaced in place
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        generator = MultipleInheritance(definition=yaml_definition, connection=self.conn)
+        changes = deploy(self.conn, [generator])
+        self.assertEqual(changes[0].action, ViewChange.UPDATE)
+        self.assertNotIn("type", changes[0].parts)
+        self.conn.execute(
+            "INSERT INTO pirogue_test.vw_merge_animal (animal_type, name, ea_eid) "
+            "VALUES ('eagle', 'edgar', 1)"
+        )
+
+    def test_plan_simple_joins(self):
+        yaml_definition = yaml.safe_load(open("test/simple_joins.yaml"))
+        simple_joins = SimpleJoins(yaml_definition, connection=self.conn)
+        self.assertEqual([c.action for c in plan(self.conn, [simple_joins])], ["create"])
+        # create stores the hashes as well
+        simple_joins.create()
+        self.assertEqual([c.action for c in plan(self.conn, [simple_joins])], ["unchanged"])
+        self.conn.execute("COMMENT ON VIEW pirogue_test.vw_cat IS NULL")
+        # deployed without any hash
+        self.assertEqual([c.action for c in plan(self.conn, [simple_joins])], ["update"])
+        deploy(self.conn, [simple_joins])
+        self.assertEqual([c.action for c in plan(self.conn, [simple_joins])], ["unchanged"])
+
+    def test_plan_after_create(self):
+        deploy(self.conn, self.__generators())
+        upper_name = {"additional_columns": {"upper_name": "upper(animal.name)"}}
+        self.__generators(**upper_name)[0].create()
+        self.assertEqual(
+            {c.action for c in plan(self.conn, self.__generators(**upper_name))},
+            {ViewChange.UNCHANGED},
+        )
+
+        # back to the deployed definition, the view created in between is replaced
+        changes = plan(self.conn, self.__generators())
+        self.assertEqual(changes[0].action, ViewChange.RECREATE)
+        deploy(self.conn, self.__generators())
+        self.assertNotIn(
+            "upper_name",
+            [
+                c.name
+                for c in self.conn.execute(
+                    "SELECT * FROM pirogue_test.vw_merge_animal"
+                ).description
+            ],
+        )
+
+        # the same with a swap
+        generator = self.__generators(**upper_name)[0]
+        generator.create_with_swap()
+        self.assertEqual(
+            {c.action for c in plan(self.conn, self.__generators(**upper_name))},
+            {ViewChange.UNCHANGED},
+        )
+        self.assertEqual(plan(self.conn, self.__generators())[0].action, ViewChange.RECREATE)
+
+
+if __name__ == "__main__":
+    unittest.main()
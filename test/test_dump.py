@@ -0,0 +1,124 @@
+#! /usr/bin/env python
+
+import os
+import tempfile
+import unittest
+
+import psycopg
+import yaml
+
+from pirogue import MultipleInheritance
+from pirogue.dump import dump
+from pirogue.multiple_inheritance import COPY_BUFFER_SIZE
+
+pg_service = "pirogue_test"
+
+SELECT = "SELECT * FROM pirogue_test.vw_merge_animal ORDER BY aid"
+
+TRUNCATE = (
+    "TRUNCATE pirogue_test.aardvark, pirogue_test.cat, pirogue_test.dog, pirogue_test.eagle, "
+    "pirogue_test.animal"
+)
+
+
+class TestDump(unittest.TestCase):
+    def setUp(self):
+        self.conn = psycopg.connect(f"service={pg_service}")
+
+        sql = open("test/demo_data.sql").read()
+        cur = self.conn.cursor()
+        cur.execute(sql)
+        self.conn.commit()
+
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        self.multiple_inheritance = MultipleInheritance(
+            definition=yaml_definition, connection=self.conn
+        )
+        self.multiple_inheritance.create()
+        cur.execute(
+            "INSERT INTO pirogue_test.vw_merge_animal (animal_type, name, year) VALUES "
+            "('cat', 'felix', 1985), ('dog', 'rex', NULL), ('animal', 'nemo', 2003)"
+        )
+        cur.execute(
+            "INSERT INTO pirogue_test.vw_merge_animal (animal_type, name, ea_eid, ea_weight) "
+            "VALUES ('eagle', 'edgar', 1, 4.5)"
+        )
+        self.conn.commit()
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+        self.conn.close()
+
+    def test_subtype_queries(self):
+        queries = self.multiple_inheritance.subtype_queries()
+        self.assertEqual(list(queries), ["animal", "cat", "dog", "aardvark", "eagle"])
+        cur = self.conn.cursor()
+        for subtype, query in queries.items():
+            cur.execute(query)
+            rows = cur.fetchall()
+            self.assertEqual({row[0] for row in rows}, {subtype} if rows else set())
+            cur.execute(
+                "SELECT * FROM pirogue_test.vw_merge_animal WHERE animal_type = %s", (subtype,)
+            )
+            self.assertCountEqual(cur.fetchall(), rows)
+
+    def test_dump_load(self):
+        rows = self.conn.execute(SELECT).fetchall()
+        path = os.path.join(self.directory.name, "animal.bin")
+        results = dump(self.multiple_inheritance, f"service={pg_service}", path, jobs=2)
+        self.assertEqual(
+            [(result.subtype, result.rows) for result in results],
+            [("animal", 1), ("cat", 1), ("dog", 1), ("aardvark", 0), ("eagle", 1)],
+        )
+
+        # the merged binary file is loaded back
+        self.conn.execute(TRUNCATE)
+        with open(path, "rb") as f:
+            self.assertEqual(self.multiple_inheritance.copy_from(f, commit=False), 4)
+        self.assertEqual(self.conn.execute(SELECT).fetchall(), rows)
+        self.conn.rollback()
+
+    def test_dump_load_chunks(self):
+        # each type has more rows than fit in a chunk, the chunks of the workers interleave
+        self.conn.execute(
+            "INSERT INTO pirogue_test.vw_merge_animal (animal_type, name, year) "
+            "SELECT (ARRAY['cat', 'dog', 'animal'])[mod(i, 3) + 1]::pirogue_test.animal_type, "
+            "repeat('x', 100) || i, mod(i, 100) FROM generate_series(1, 6000) i"
+        )
+        self.conn.commit()
+        rows = self.conn.execute(SELECT).fetchall()
+        path = os.path.join(self.directory.name, "animal.bin")
+        dump(self.multiple_inheritance, f"service={pg_service}", path, jobs=3)
+        self.assertGreater(os.path.getsize(path), 3 * COPY_BUFFER_SIZE)
+
+        self.conn.execute(TRUNCATE)
+        with open(path, "rb") as f:
+            self.assertEqual(self.multiple_inheritance.copy_from(f, commit=False), len(rows))
+        self.assertEqual(self.conn.execute(SELECT).fetchall(), rows)
+        self.conn.rollback()
+
+    def test_dump_split(self):
+        rows = self.conn.execute(SELECT).fetchall()
+        dump(
+            self.multiple_inheritance,
+            f"service={pg_service}",
+            self.directory.name,
+            format="csv",
+            split=True,
+        )
+        self.assertEqual(
+            sorted(os.listdir(self.directory.name)),
+            ["aardvark.csv", "animal.csv", "cat.csv", "dog.csv", "eagle.csv"],
+        )
+
+        self.conn.execute(TRUNCATE)
+        for file_name in os.listdir(self.directory.name):
+            with open(os.path.join(self.directory.name, file_name), "rb") as f:
+                self.multiple_inheritance.copy_from(f, format="csv", commit=False)
+        self.assertEqual(self.conn.execute(SELECT).fetchall(), rows)
+        self.conn.rollback()
+
+
+if __name__ == "__main__":
+    unittest.main()
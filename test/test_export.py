@@ -0,0 +1,88 @@
+#! /usr/bin/env python
+
+import io
+import unittest
+
+import psycopg
+import yaml
+
+from pirogue import MultipleInheritance, SimpleJoins
+from pirogue.catalog import SchemaCatalog
+from pirogue.deploy import ViewChange, plan
+from pirogue.export import script_body, verify_script, write_script
+from pirogue.part_hashes import hashes_comment, part_hash
+
+pg_service = "pirogue_test"
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        self.conn = psycopg.connect(f"service={pg_service}")
+
+        sql = open("test/demo_data.sql").read()
+        cur = self.conn.cursor()
+        cur.execute(sql)
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+
+    def __generators(self, catalog):
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        return [
+            MultipleInheritance(
+                definition=yaml_definition,
+                catalog=catalog,
+                connection=self.conn,
+                create_joins=True,
+            )
+        ]
+
+    def test_export(self):
+        catalog = SchemaCatalog(self.conn)
+        output = io.StringIO()
+        checksum = write_script(output, self.__generators(catalog), ["mi.yaml"])
+        script = output.getvalue()
+        self.assertTrue(script.startswith("-- generated by pirogue export\n"))
+        self.assertIn("-- definition: mi.yaml\n", script)
+        self.assertIn(f"-- sha256: {checksum}\n", script)
+        self.assertTrue(verify_script(script))
+        self.assertFalse(verify_script(script.replace("vw_merge_animal", "vw_other_animal")))
+        self.assertIn("CREATE OR REPLACE VIEW pirogue_test.vw_cat", script)
+
+        # the same definitions give the same script
+        output = io.StringIO()
+        self.assertEqual(write_script(output, self.__generators(catalog), ["mi.yaml"]), checksum)
+        self.assertEqual(output.getvalue(), script)
+
+        # the script runs in one go
+        self.conn.execute(script)
+        self.conn.execute(
+            "INSERT INTO pirogue_test.vw_merge_animal (animal_type, name, year) "
+            "VALUES ('cat', 'felix', 1919)"
+        )
+        self.assertEqual(
+            self.conn.execute("SELECT count(*) FROM pirogue_test.vw_cat").fetchone()[0], 1
+        )
+        # the hashes of the parts are stored by the script
+        self.assertEqual(
+            {c.action for c in plan(self.conn, self.__generators(catalog))},
+            {ViewChange.UNCHANGED},
+        )
+        self.conn.rollback()
+
+    def test_script_body(self):
+        yaml_definition = yaml.safe_load(open("test/simple_joins.yaml"))
+        simple_joins = SimpleJoins(yaml_definition, connection=self.conn)
+        body = script_body([simple_joins])
+        self.assertEqual(
+            body,
+            simple_joins.sql()
+            + "\n"
+            + hashes_comment("pirogue_test", "vw_cat", {"view": part_hash(simple_joins.sql())})
+            + "\n",
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
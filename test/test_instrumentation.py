@@ -0,0 +1,95 @@
+#! /usr/bin/env python
+
+import unittest
+
+import psycopg
+import yaml
+
+from pirogue import MultipleInheritance, SimpleJoins
+from pirogue.information_schema import primary_key
+from pirogue.instrumentation import (
+    CATALOG_QUERY,
+    PHASE,
+    STATEMENT,
+    Profile,
+    add_hook,
+    remove_hook,
+)
+
+pg_service = "pirogue_test"
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.conn = psycopg.connect(f"service={pg_service}")
+
+        sql = open("test/demo_data.sql").read()
+        cur = self.conn.cursor()
+        cur.execute(sql)
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_catalog_query_count(self):
+        # the metadata of all tables must be loaded in a fixed number of queries,
+        # whatever the number of joins and columns
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        with Profile() as profile:
+            MultipleInheritance(
+                definition=yaml_definition, connection=self.conn, create_joins=True
+            ).create(commit=False, batch=False)
+        # the tables metadata, and the values of the existing type
+        self.assertEqual(profile.count(CATALOG_QUERY), 3)
+        self.assertEqual(profile.count(PHASE, "MultipleInheritance.view"), 1)
+        self.assertEqual(profile.count(PHASE, "SingleInheritance.view"), 4)
+        self.assertEqual(profile.count(STATEMENT, "pirogue_test.vw_merge_animal.view"), 1)
+        self.assertEqual(profile.count(STATEMENT), 5 + 4 * 4)
+        self.conn.rollback()
+
+        # in a single round trip
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        with Profile() as profile:
+            MultipleInheritance(
+                definition=yaml_definition, connection=self.conn, create_joins=True
+            ).create(commit=False)
+        self.assertEqual(profile.count(STATEMENT), 1)
+        self.assertEqual(profile.count(STATEMENT, "pirogue_test.vw_merge_animal.batch"), 1)
+        self.conn.rollback()
+
+        yaml_definition = yaml.safe_load(open("test/simple_joins.yaml"))
+        with Profile() as profile:
+            SimpleJoins(yaml_definition, connection=self.conn).create(commit=False)
+        self.assertEqual(profile.count(CATALOG_QUERY), 2)
+        self.conn.rollback()
+
+    def test_merge_columns_query_count(self):
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        yaml_definition["joins"]["dog"].pop("skip_columns")
+        yaml_definition["merge_columns"] = ["eye_color"]
+        with Profile() as profile:
+            sql = MultipleInheritance(definition=yaml_definition, connection=self.conn).sql()
+        self.assertEqual(profile.count(CATALOG_QUERY), 2)
+        self.assertIn("WHEN dog.did IS NOT NULL THEN dog.eye_color", sql)
+
+    def test_hooks(self):
+        events = []
+
+        def hook(kind, name, duration):
+            events.append((kind, name))
+
+        add_hook(hook)
+        primary_key(self.conn, "pirogue_test", "animal")
+        remove_hook(hook)
+        primary_key(self.conn, "pirogue_test", "animal")
+        self.assertEqual(events, [(CATALOG_QUERY, "primary_key")])
+
+        with Profile() as profile:
+            primary_key(self.conn, "pirogue_test", "animal")
+            primary_key(self.conn, "pirogue_test", "eagle")
+        self.assertEqual(profile.count(CATALOG_QUERY, "primary_key"), 2)
+        self.assertIn("primary_key", profile.report())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+#! /usr/bin/env python
+
+import io
+import threading
+import unittest
+from contextlib import redirect_stdout
+
+import psycopg
+import yaml
+
+from pirogue import MultipleInheritance
+from pirogue.batch import LockRetry, execute_batch
+from pirogue.instrumentation import LOCK_WAIT, Profile
+
+pg_service = "pirogue_test"
+
+
+class TestLockRetry(unittest.TestCase):
+    def setUp(self):
+        self.conn = psycopg.connect(f"service={pg_service}")
+
+        sql = open("test/demo_data.sql").read()
+        cur = self.conn.cursor()
+        cur.execute(sql)
+        self.conn.commit()
+
+        MultipleInheritance(
+            definition=yaml.safe_load(open("test/multiple_inheritance.yaml")),
+            connection=self.conn,
+        ).create()
+
+        # an editing session holding a lock on the view
+        self.session = psycopg.connect(f"service={pg_service}")
+        self.session.execute("LOCK TABLE pirogue_test.vw_merge_animal IN ACCESS SHARE MODE")
+
+    def tearDown(self):
+        self.session.close()
+        self.conn.close()
+
+    def __create(self, lock_retry):
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        yaml_definition["allow_type_change"] = False
+        MultipleInheritance(definition=yaml_definition, connection=self.conn, drop=True).create(
+            lock_retry=lock_retry
+        )
+
+    def test_retry(self):
+        lock_retry = LockRetry(lock_timeout=0.1, budget=10, base_delay=0.1, max_delay=0.2)
+        threading.Timer(0.3, self.session.rollback).start()
+        output = io.StringIO()
+        with Profile() as profile, redirect_stdout(output):
+            self.__create(lock_retry)
+        self.assertGreaterEqual(len(lock_retry.waits), 1)
+        self.assertEqual(profile.count(LOCK_WAIT), len(lock_retry.waits))
+        self.assertIn("*** Lock timeout on pirogue_test.vw_merge_animal.batch", output.getvalue())
+        # the lock timeout is not kept
+        self.assertEqual(self.conn.execute("SHOW lock_timeout").fetchone()[0], "0")
+
+    def test_budget(self):
+        lock_retry = LockRetry(lock_timeout=0.1, budget=0.5, base_delay=0.1, max_delay=0.2)
+        output = io.StringIO()
+        with redirect_stdout(output), self.assertRaises(psycopg.errors.LockNotAvailable):
+            self.__create(lock_retry)
+        self.assertIn("giving up", output.getvalue())
+        self.conn.rollback()
+
+    def test_replay(self):
+        # after an error, the statements are replayed with the lock timeout
+        lock_retry = LockRetry(lock_timeout=0.1)
+        statements = [
+            "DO $$ BEGIN IF current_setting('lock_timeout') <> '100ms' THEN "
+            "RAISE 'no lock timeout'; END IF; END $$;",
+            "SELECT 1 / 0;",
+        ]
+        output = io.StringIO()
+        with redirect_stdout(output), self.assertRaises(psycopg.errors.DivisionByZero):
+            execute_batch(self.conn, statements, "replay", lock_retry)
+        self.assertIn("SELECT 1 / 0", output.getvalue())
+        self.conn.rollback()
+
+    def test_session_lock_timeout(self):
+        # the lock timeout of the session is restored after the batch
+        self.conn.execute("SET lock_timeout = '5s'")
+        execute_batch(self.conn, ["SELECT 1;"], "session", LockRetry(lock_timeout=0.1))
+        self.assertEqual(self.conn.execute("SHOW lock_timeout").fetchone()[0], "5s")
+        self.conn.rollback()
+
+    def test_retry_savepoint(self):
+        lock_retry = LockRetry(lock_timeout=0.1, budget=10, base_delay=0.1, max_delay=0.2)
+        threading.Timer(0.3, self.session.rollback).start()
+        with redirect_stdout(io.StringIO()):
+            execute_batch(
+                self.conn,
+                ["LOCK TABLE pirogue_test.vw_merge_animal IN ACCESS EXCLUSIVE MODE;"],
+                "lock",
+                lock_retry,
+            )
+        self.assertGreaterEqual(len(lock_retry.waits), 1)
+        # the savepoints of the failed attempts are released
+        with self.assertRaises(psycopg.errors.InvalidSavepointSpecification):
+            self.conn.execute("RELEASE SAVEPOINT pirogue_batch")
+        self.conn.rollback()
+
+    def test_no_batch(self):
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        with self.assertRaises(ValueError):
+            MultipleInheritance(definition=yaml_definition, connection=self.conn).create(
+                batch=False, lock_retry=LockRetry()
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+#! /usr/bin/env python
+
+import io
+import unittest
+from contextlib import redirect_stdout
+
+import psycopg
+
+from pirogue.exceptions import InvalidDefinition
+from pirogue.manifest import DeploymentResult, Manifest, ManifestEntry, deploy_manifest
+
+pg_service = "pirogue_test"
+
+
+class TestManifest(unittest.TestCase):
+    def setUp(self):
+        self.conn = psycopg.connect(f"service={pg_service}")
+
+        sql = open("test/demo_data.sql").read()
+        cur = self.conn.cursor()
+        cur.execute(sql)
+        self.conn.commit()
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_dependencies(self):
+        manifest = Manifest.from_file("test/manifest.yaml")
+        based_on_view, merge_view, simple_joins = manifest.entries
+        self.assertEqual(based_on_view.dependencies, [merge_view])
+        self.assertEqual(merge_view.dependencies, [])
+        self.assertEqual(manifest.ordered(), [merge_view, simple_joins, based_on_view])
+        self.assertNotIn(("pirogue_test", "vw_merge_animal"), manifest.external_tables())
+
+    def test_circular_dependency(self):
+        definition_a = {"table": "s.vw_b", "view_name": "vw_a", "joins": {}}
+        definition_b = {"table": "s.vw_a", "view_name": "vw_b", "joins": {}}
+        with self.assertRaises(InvalidDefinition):
+            Manifest(
+                [
+                    ManifestEntry("simple_joins", "a.yaml", definition_a),
+                    ManifestEntry("simple_joins", "b.yaml", definition_b),
+                ]
+            )
+
+    def test_deploy(self):
+        results = deploy_manifest(
+            Manifest.from_file("test/manifest.yaml"), f"service={pg_service}", jobs=2
+        )
+        self.assertEqual({r.status for r in results}, {DeploymentResult.DEPLOYED})
+        self.assertTrue(all(r.duration > 0 for r in results))
+        self.conn.execute("SELECT * FROM pirogue_test.vw_vw_merge_animal")
+        self.conn.execute("SELECT * FROM pirogue_test.vw_cat")
+
+    def test_failure(self):
+        # the merge view cannot be created, the view based on it is skipped
+        self.conn.execute("CREATE TABLE pirogue_test.vw_merge_animal (id int)")
+        self.conn.commit()
+        with redirect_stdout(io.StringIO()):
+            results = deploy_manifest(
+                Manifest.from_file("test/manifest.yaml"), f"service={pg_service}", jobs=2
+            )
+        self.assertEqual(
+            [r.status for r in results],
+            [DeploymentResult.SKIPPED, DeploymentResult.FAILED, DeploymentResult.DEPLOYED],
+        )
+        self.assertIsInstance(results[1].error, psycopg.errors.WrongObjectType)
+
+
+if __name__ == "__main__":
+    unittest.main()
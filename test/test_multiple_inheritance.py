@@ -1,12 +1,19 @@
 #! /usr/bin/env python
 
+import io
 import unittest
+from contextlib import redirect_stdout
 
 import psycopg
 import yaml
 
-from pirogue import MultipleInheritance
-from pirogue.exceptions import InvalidDefinition
+from pirogue import MultipleInheritance, SimpleJoins
+from pirogue.exceptions import (
+    DependentViewsError,
+    InvalidDefinition,
+    TypeEvolutionError,
+)
+from pirogue.instrumentation import STATEMENT, Profile
 from pirogue.utils import default_value
 
 pg_service = "pirogue_test"
@@ -56,6 +63,325 @@ class TestMultipleInheritance(unittest.TestCase):
         cur.execute("SELECT * FROM pirogue_test.vw_merge_animal WHERE name = 'felix';")
         self.assertIsNone(cur.fetchone())
 
+    def test_skip_unchanged_updates(self):
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        yaml_definition["skip_unchanged_updates"] = True
+        MultipleInheritance(
+            definition=yaml_definition, connection=self.conn, create_joins=True
+        ).create()
+
+        cur = self.conn.cursor()
+        cur.execute(
+            "INSERT INTO pirogue_test.vw_merge_animal (animal_type, name, year, eye_color) "
+            "VALUES ('cat', 'felix', 1985, 'black') RETURNING aid"
+        )
+        aid = cur.fetchone()[0]
+
+        def ctids():
+            cur.execute(
+                "SELECT (SELECT ctid FROM pirogue_test.animal WHERE aid = %(aid)s), "
+                "(SELECT ctid FROM pirogue_test.cat WHERE cid = %(aid)s)",
+                {"aid": aid},
+            )
+            return cur.fetchone()
+
+        # only the child table is written
+        before = ctids()
+        cur.execute(
+            "UPDATE pirogue_test.vw_merge_animal SET eye_color = 'green' WHERE aid = %s", (aid,)
+        )
+        after = ctids()
+        self.assertEqual(after[0], before[0])
+        self.assertNotEqual(after[1], before[1])
+
+        # only the master table is written
+        cur.execute("UPDATE pirogue_test.vw_merge_animal SET year = 1986 WHERE aid = %s", (aid,))
+        self.assertNotEqual(ctids()[0], after[0])
+        self.assertEqual(ctids()[1], after[1])
+
+        # nothing is written, through the single inheritance view as well
+        before = ctids()
+        cur.execute("UPDATE pirogue_test.vw_merge_animal SET year = 1986 WHERE aid = %s", (aid,))
+        cur.execute("UPDATE pirogue_test.vw_cat SET name = 'felix' WHERE cid = %s", (aid,))
+        self.assertEqual(ctids(), before)
+        cur.execute("UPDATE pirogue_test.vw_cat SET name = 'tom' WHERE cid = %s", (aid,))
+        cur.execute("SELECT name FROM pirogue_test.vw_merge_animal WHERE aid = %s", (aid,))
+        self.assertEqual(cur.fetchone()[0], "tom")
+        self.assertEqual(ctids()[1], before[1])
+
+    def test_bulk_insert(self):
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        yaml_definition["bulk_insert"] = True
+        MultipleInheritance(definition=yaml_definition, connection=self.conn).create()
+
+        rows = [
+            {"animal_type": "cat", "name": "felix", "year": 1985, "fk_cat_breed": 2},
+            {"animal_type": "dog", "name": "rex", "fk_dog_breed": 1},
+            {"animal_type": "animal", "name": "nemo"},
+            {"animal_type": "eagle", "name": "edgar", "ea_eid": 1, "ea_weight": 4.5},
+        ]
+        cur = self.conn.cursor()
+        cur.execute(
+            "SELECT aid, animal_type, name FROM pirogue_test.fn_vw_merge_animal_bulk_insert("
+            "ARRAY(SELECT jsonb_populate_recordset(NULL::pirogue_test.vw_merge_animal, %s)))",
+            (psycopg.types.json.Jsonb(rows),),
+        )
+        inserted = cur.fetchall()
+        # the rows are returned in order, with their primary key
+        self.assertEqual(
+            [row[1:] for row in inserted], [(r["animal_type"], r["name"]) for r in rows]
+        )
+        self.assertTrue(all(row[0] is not None for row in inserted))
+
+        cur.execute(
+            "SELECT aid, animal_type, name, year, fk_cat_breed, fk_dog_breed, ea_weight "
+            "FROM pirogue_test.vw_merge_animal WHERE aid = ANY(%s) ORDER BY aid",
+            ([row[0] for row in inserted],),
+        )
+        self.assertEqual(
+            cur.fetchall(),
+            [
+                (inserted[0][0], "cat", "felix", 1985, 2, None, None),
+                (inserted[1][0], "dog", "rex", None, None, 1, None),
+                (inserted[2][0], "animal", "nemo", None, None, None, None),
+                (inserted[3][0], "eagle", "edgar", None, None, None, 4.5),
+            ],
+        )
+        cur.execute("SELECT fk_animal FROM pirogue_test.eagle WHERE eid = 1")
+        self.assertEqual(cur.fetchone()[0], inserted[3][0])
+
+        # the function is replaced with the view
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        yaml_definition["bulk_insert"] = True
+        MultipleInheritance(
+            definition=yaml_definition, connection=self.conn, drop=True
+        ).create_with_swap()
+        cur.execute(
+            "SELECT to_regprocedure('pirogue_test.fn_vw_merge_animal_bulk_insert(pirogue_test.vw_merge_animal[])')"
+        )
+        self.assertIsNotNone(cur.fetchone()[0])
+
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        yaml_definition["bulk_insert"] = True
+        yaml_definition["insert_trigger"] = {"pre": "NEW.name := upper(NEW.name);"}
+        with self.assertRaises(InvalidDefinition):
+            MultipleInheritance(definition=yaml_definition, connection=self.conn)
+
+    def test_bulk_update(self):
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        yaml_definition["bulk_update"] = True
+        MultipleInheritance(definition=yaml_definition, connection=self.conn).create()
+
+        cur = self.conn.cursor()
+        aids = []
+        for animal_type, name in (("cat", "felix"), ("dog", "rex")):
+            cur.execute(
+                "INSERT INTO pirogue_test.vw_merge_animal (animal_type, name, eye_color) "
+                "VALUES (%s, %s, 'black') RETURNING aid",
+                (animal_type, name),
+            )
+            aids.append(cur.fetchone()[0])
+
+        def bulk_update(rows, upsert):
+            cur.execute(
+                "SELECT aid, name FROM pirogue_test.fn_vw_merge_animal_bulk_update("
+                "ARRAY(SELECT jsonb_populate_recordset(NULL::pirogue_test.vw_merge_animal, %s)),"
+                " %s)",
+                (psycopg.types.json.Jsonb(rows), upsert),
+            )
+            return cur.fetchall()
+
+        rows = [
+            {"aid": aids[0], "animal_type": "cat", "name": "tom", "eye_color": "green"},
+            # the type changes
+            {"aid": aids[1], "animal_type": "cat", "name": "garfield", "fk_cat_breed": 1},
+            {"animal_type": "dog", "name": "snoopy"},
+        ]
+        # the missing row is not inserted
+        self.assertEqual(
+            sorted(bulk_update(rows, False)), [(aids[0], "tom"), (aids[1], "garfield")]
+        )
+        cur.execute("SELECT count(*) FROM pirogue_test.vw_merge_animal WHERE name = 'snoopy'")
+        self.assertEqual(cur.fetchone()[0], 0)
+        cur.execute(
+            "SELECT aid, animal_type, name, eye_color, fk_cat_breed "
+            "FROM pirogue_test.vw_merge_animal WHERE aid = ANY(%s) ORDER BY aid",
+            (aids,),
+        )
+        self.assertEqual(
+            cur.fetchall(),
+            [(aids[0], "cat", "tom", "green", None), (aids[1], "cat", "garfield", None, 1)],
+        )
+        cur.execute("SELECT count(*) FROM pirogue_test.dog WHERE did = %s", (aids[1],))
+        self.assertEqual(cur.fetchone()[0], 0)
+
+        # upsert
+        updated = bulk_update(rows, True)
+        self.assertEqual(len(updated), 3)
+        self.assertEqual(updated[2][1], "snoopy")
+        cur.execute(
+            "SELECT animal_type FROM pirogue_test.vw_merge_animal WHERE aid = %s", (updated[2][0],)
+        )
+        self.assertEqual(cur.fetchone()[0], "dog")
+        self.conn.commit()
+
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        yaml_definition["bulk_update"] = True
+        yaml_definition["allow_type_change"] = False
+        MultipleInheritance(definition=yaml_definition, connection=self.conn).create()
+        with self.assertRaises(psycopg.errors.RaiseException):
+            bulk_update([{"aid": aids[0], "animal_type": "dog", "name": "tom"}], False)
+        self.conn.rollback()
+
+    def test_drop_delete_many(self):
+        # a function deployed when the primary key had another type
+        self.conn.execute(
+            "CREATE FUNCTION pirogue_test.fn_vw_merge_animal_delete_many(ids bigint[]) "
+            "RETURNS bigint LANGUAGE sql AS 'SELECT 0::bigint'"
+        )
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        yaml_definition["bulk_delete"] = True
+        MultipleInheritance(definition=yaml_definition, connection=self.conn, drop=True).create()
+        cur = self.conn.cursor()
+        cur.execute(
+            "SELECT pg_get_function_identity_arguments(oid) FROM pg_proc "
+            "WHERE proname = 'fn_vw_merge_animal_delete_many'"
+        )
+        self.assertEqual(cur.fetchall(), [("ids integer[]",)])
+
+    def test_bulk_delete(self):
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        yaml_definition["bulk_delete"] = True
+        MultipleInheritance(definition=yaml_definition, connection=self.conn).create()
+
+        cur = self.conn.cursor()
+
+        def animals():
+            cur.execute("SELECT name FROM pirogue_test.vw_merge_animal WHERE name IS NOT NULL")
+            return sorted(row[0] for row in cur.fetchall())
+
+        cur.execute(
+            "INSERT INTO pirogue_test.vw_merge_animal (animal_type, name) VALUES "
+            "('cat', 'felix'), ('cat', 'tom'), ('dog', 'rex'), ('animal', 'nemo') RETURNING aid"
+        )
+        aids = [row[0] for row in cur.fetchall()]
+        self.assertEqual(animals(), ["felix", "nemo", "rex", "tom"])
+
+        cur.execute("SELECT pirogue_test.fn_vw_merge_animal_delete_many(%s)", (aids[1:3],))
+        self.assertEqual(cur.fetchone()[0], 2)
+        self.assertEqual(animals(), ["felix", "nemo"])
+        cur.execute("SELECT count(*) FROM pirogue_test.dog WHERE did = %s", (aids[2],))
+        self.assertEqual(cur.fetchone()[0], 0)
+
+        cur.execute(
+            "INSERT INTO pirogue_test.vw_merge_animal (animal_type, name) VALUES ('dog', 'rex')"
+        )
+        cur.execute("SELECT pirogue_test.fn_vw_merge_animal_purge('cat')")
+        self.assertEqual(animals(), ["nemo", "rex"])
+        cur.execute("SELECT pirogue_test.fn_vw_merge_animal_purge('animal')")
+        self.assertEqual(animals(), ["rex"])
+        cur.execute("SELECT pirogue_test.fn_vw_merge_animal_purge()")
+        cur.execute("SELECT count(*) FROM pirogue_test.vw_merge_animal")
+        self.assertEqual(cur.fetchone()[0], 0)
+        self.conn.rollback()
+
+    def test_delete_cascade(self):
+        cur = self.conn.cursor()
+
+        def cascade(table: str, column: str):
+            cur.execute(
+                f"ALTER TABLE pirogue_test.{table} DROP CONSTRAINT {table}_{column}_fkey, "
+                f"ADD CONSTRAINT {table}_{column}_fkey FOREIGN KEY ({column}) "
+                "REFERENCES pirogue_test.animal (aid) ON DELETE CASCADE"
+            )
+
+        def delete_function() -> str:
+            cur.execute("SELECT prosrc FROM pg_proc WHERE proname = 'ft_vw_merge_animal_delete'")
+            return cur.fetchone()[0]
+
+        def count(table: str) -> int:
+            cur.execute(f"SELECT count(*) FROM pirogue_test.{table}")
+            return cur.fetchone()[0]
+
+        # the cats and dogs are deleted by the cascade only
+        cascade("cat", "cid")
+        cascade("dog", "did")
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        MultipleInheritance(definition=yaml_definition, connection=self.conn).create()
+        self.assertNotIn("pirogue_test.cat", delete_function())
+        self.assertIn("pirogue_test.aardvark", delete_function())
+        cur.execute(
+            "INSERT INTO pirogue_test.vw_merge_animal (animal_type, name) VALUES "
+            "('cat', 'felix'), ('dog', 'rex'), ('aardvark', 'arthur')"
+        )
+        cur.execute("DELETE FROM pirogue_test.vw_merge_animal WHERE name IN ('felix', 'arthur')")
+        self.assertEqual((count("cat"), count("dog"), count("aardvark")), (0, 1, 0))
+        self.conn.commit()
+
+        # all subtypes cascade, a single statement deletes the rows of any type
+        cascade("aardvark", "aid")
+        cascade("eagle", "fk_animal")
+        self.conn.commit()
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        MultipleInheritance(definition=yaml_definition, connection=self.conn).create()
+        self.assertNotIn("CASE", delete_function())
+        cur.execute(
+            "INSERT INTO pirogue_test.vw_merge_animal (animal_type, name, ea_eid) VALUES "
+            "('eagle', 'edgar', 1), ('animal', 'nemo', NULL)"
+        )
+        cur.execute("DELETE FROM pirogue_test.vw_merge_animal")
+        self.assertEqual((count("animal"), count("dog"), count("eagle")), (0, 0, 0))
+        self.conn.rollback()
+
+    def test_copy_from(self):
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        multiple_inheritance = MultipleInheritance(
+            definition=yaml_definition, connection=self.conn
+        )
+        multiple_inheritance.create()
+        columns = ["animal_type", "name", "year", "fk_cat_breed", "ea_eid", "ea_weight"]
+
+        # rows, the values of the type of the view are given as text
+        rows = [
+            ("cat", "felix", 1985, 2, None, None),
+            ("animal", "nemo", None, None, None, None),
+            ("eagle", "edgar", None, None, 1, 4.5),
+        ]
+        count = multiple_inheritance.copy_from(iter(rows), columns=columns)
+        self.assertEqual(count, 3)
+        cur = self.conn.cursor()
+        cur.execute(
+            f"SELECT {', '.join(columns)} FROM pirogue_test.vw_merge_animal "
+            "WHERE name IS NOT NULL ORDER BY aid"
+        )
+        self.assertEqual(cur.fetchall(), rows)
+        cur.execute("SELECT fk_animal FROM pirogue_test.eagle WHERE eid = 1")
+        self.assertIsNotNone(cur.fetchone()[0])
+
+        # a file in binary format, written with COPY TO
+        data = io.BytesIO()
+        with cur.copy(
+            "COPY (SELECT * FROM pirogue_test.vw_merge_animal WHERE animal_type = 'cat') "
+            "TO STDOUT (FORMAT binary)"
+        ) as copy:
+            for chunk in copy:
+                data.write(chunk)
+        cur.execute("DELETE FROM pirogue_test.vw_merge_animal WHERE animal_type = 'cat'")
+        data.seek(0)
+        self.assertEqual(multiple_inheritance.copy_from(data), 1)
+
+        # a CSV file
+        data = io.BytesIO(b"animal_type,name\ndog,rex\n")
+        count = multiple_inheritance.copy_from(
+            data, columns=["animal_type", "name"], format="csv", header=True
+        )
+        self.assertEqual(count, 1)
+        cur.execute(
+            "SELECT animal_type, name, year FROM pirogue_test.vw_merge_animal "
+            "WHERE animal_type IN ('cat', 'dog') ORDER BY name"
+        )
+        self.assertEqual(cur.fetchall(), [("cat", "felix", 1985), ("dog", "rex", None)])
+
     def test_type_change_not_allowed(self):
         yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
         yaml_definition["view_name"] = "vw_animal_no_type_change"
@@ -96,6 +422,153 @@ class TestMultipleInheritance(unittest.TestCase):
         yaml_definition["joins"]["aardvark"]["skip_columns"] = ["aid", "father"]
         MultipleInheritance(definition=yaml_definition, connection=self.conn).create()
 
+    def test_iter_statements(self):
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        mi = MultipleInheritance(
+            definition=yaml_definition, connection=self.conn, create_joins=True
+        )
+        views = list(mi.iter_statements(parts=("view",)))
+        self.assertEqual(len(views), 1 + 4)
+        for view in views:
+            self.assertIn("CREATE OR REPLACE VIEW", view)
+            self.assertNotIn("CREATE TRIGGER", view)
+        self.assertEqual("\n".join(mi.iter_statements()), mi.sql())
+        with self.assertRaises(ValueError):
+            list(mi.iter_statements(parts=("not_a_part",)))
+
+    def test_batch_error(self):
+        # the statements are sent at once, but the failing one is still reported
+        self.conn.execute("CREATE TABLE pirogue_test.vw_dog (id int)")
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        output = io.StringIO()
+        with redirect_stdout(output), self.assertRaises(psycopg.errors.WrongObjectType):
+            MultipleInheritance(
+                definition=yaml_definition, connection=self.conn, create_joins=True
+            ).create()
+        self.assertTrue(output.getvalue().startswith("*** Failing:\n"))
+        self.assertIn("CREATE OR REPLACE VIEW pirogue_test.vw_dog AS SELECT", output.getvalue())
+        self.conn.rollback()
+
+    def test_create_with_swap(self):
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        MultipleInheritance(definition=yaml_definition, connection=self.conn).create()
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        yaml_definition["additional_columns"] = {"upper_name": "upper(animal.name)"}
+        MultipleInheritance(definition=yaml_definition, connection=self.conn).create_with_swap()
+
+        cur = self.conn.cursor()
+        cur.execute(
+            "INSERT INTO pirogue_test.vw_merge_animal (animal_type, name) VALUES ('cat', 'felix')"
+        )
+        cur.execute("SELECT animal_type, upper_name FROM pirogue_test.vw_merge_animal")
+        self.assertEqual(cur.fetchone(), ("cat", "FELIX"))
+        cur.execute("SELECT to_regnamespace('pirogue_shadow_vw_merge_animal')")
+        self.assertIsNone(cur.fetchone()[0])
+        cur.execute(
+            "SELECT count(*) FROM pg_trigger WHERE tgrelid = 'pirogue_test.vw_merge_animal'::regclass"
+        )
+        self.assertEqual(cur.fetchone()[0], 3)
+
+    def test_create_with_swap_joins(self):
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        generator = MultipleInheritance(
+            definition=yaml_definition, connection=self.conn, create_joins=True
+        )
+        generator.create()
+        # the join views are replaced after the swap, in their own batch
+        with Profile() as profile:
+            generator.create_with_swap()
+        self.assertEqual(profile.count(STATEMENT, "pirogue_test.vw_merge_animal.swap"), 1)
+        self.assertEqual(profile.count(STATEMENT, "pirogue_test.vw_merge_animal.joins"), 1)
+        self.conn.execute(
+            "INSERT INTO pirogue_test.vw_cat (name, eye_color) VALUES ('felix', 'green')"
+        )
+        self.assertEqual(
+            self.conn.execute("SELECT animal_type FROM pirogue_test.vw_merge_animal").fetchone(),
+            ("cat",),
+        )
+
+    def test_create_with_swap_dependent_views(self):
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        generator = MultipleInheritance(definition=yaml_definition, connection=self.conn)
+        generator.create()
+        SimpleJoins(
+            yaml.safe_load(open("test/simple_joins_based_on_view.yaml")), connection=self.conn
+        ).create()
+        with self.assertRaises(DependentViewsError) as context:
+            generator.create_with_swap()
+        self.assertIn("pirogue_test.vw_vw_merge_animal", str(context.exception))
+        # nothing was built
+        self.assertIsNone(
+            self.conn.execute(
+                "SELECT to_regnamespace('pirogue_shadow_vw_merge_animal')"
+            ).fetchone()[0]
+        )
+
+    def test_create_with_swap_invalid(self):
+        # the live view is untouched if the new one cannot be built
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        MultipleInheritance(definition=yaml_definition, connection=self.conn).create()
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        yaml_definition["additional_columns"] = {"bad": "animal.no_such_column"}
+        output = io.StringIO()
+        with redirect_stdout(output), self.assertRaises(psycopg.errors.UndefinedColumn):
+            MultipleInheritance(
+                definition=yaml_definition, connection=self.conn
+            ).create_with_swap()
+        self.conn.rollback()
+        self.conn.execute("SELECT name FROM pirogue_test.vw_merge_animal")
+
+    def test_evolve_type(self):
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        del yaml_definition["joins"]["eagle"]
+        MultipleInheritance(definition=yaml_definition, connection=self.conn).create()
+
+        # a new subtype is added to the existing type, without drop
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        with self.assertRaises(TypeEvolutionError):
+            MultipleInheritance(definition=yaml_definition, connection=self.conn).create(
+                commit=False
+            )
+        self.conn.rollback()
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        MultipleInheritance(definition=yaml_definition, connection=self.conn).create()
+        cur = self.conn.cursor()
+        cur.execute("SELECT enum_range(NULL::pirogue_test.animal_type)::text")
+        self.assertEqual(cur.fetchone()[0], "{animal,cat,dog,aardvark,eagle}")
+        cur.execute(
+            "INSERT INTO pirogue_test.vw_merge_animal (animal_type, name, ea_eid, ea_weight) "
+            "VALUES ('eagle', 'edgar', 1, 4.5)"
+        )
+        cur.execute("SELECT animal_type FROM pirogue_test.vw_merge_animal WHERE name = 'edgar'")
+        self.assertEqual(cur.fetchone()[0], "eagle")
+        self.conn.commit()
+
+        # the columns of a removed subtype cannot be dropped from the view in place
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        del yaml_definition["joins"]["dog"]
+        output = io.StringIO()
+        with redirect_stdout(output), self.assertRaises(TypeEvolutionError):
+            MultipleInheritance(definition=yaml_definition, connection=self.conn).create()
+        self.assertIn("['dog'] of pirogue_test.animal_type", output.getvalue())
+        self.conn.rollback()
+        cur.execute("SELECT enum_range(NULL::pirogue_test.animal_type)::text")
+        self.assertEqual(cur.fetchone()[0], "{animal,cat,dog,aardvark,eagle}")
+
+    def test_evolve_type_inserted_columns(self):
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        del yaml_definition["joins"]["cat"]
+        MultipleInheritance(definition=yaml_definition, connection=self.conn, drop=True).create()
+
+        # the columns of the cat are inserted before the ones of the dog: the type is unchanged
+        yaml_definition = yaml.safe_load(open("test/multiple_inheritance.yaml"))
+        with self.assertRaises(TypeEvolutionError):
+            MultipleInheritance(definition=yaml_definition, connection=self.conn).create()
+        self.conn.rollback()
+        cur = self.conn.cursor()
+        cur.execute("SELECT enum_range(NULL::pirogue_test.animal_type)::text")
+        self.assertEqual(cur.fetchone()[0], "{animal,dog,aardvark,eagle}")
+
 
 if __name__ == "__main__":
     unittest.main()